@@ -0,0 +1,125 @@
+"""
+Hot reload of the reference data (NAFDAC registry, keyword risk map, symptom table).
+
+A background thread polls the source files; when one changes (or an admin asks), the
+affected data is rebuilt on that thread and swapped in as a whole new object. Request
+handlers take one reference to the current object per request, so in-flight requests
+finish on the old data and new ones see the complete new data, never a mix.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.core import ml, symptom_matcher
+from app.core.drug_registry import DATA_FILE, reload_registry
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the data files; 0 turns the watcher off (the admin trigger still works)
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "30"))
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DataReloader:
+    def __init__(self, interval: float = DATA_RELOAD_INTERVAL):
+        self.interval = interval
+        self.sources = {
+            "registry": Path(DATA_FILE),
+            "risk_map": Path(ml.RISK_DATA_PATH),
+            "symptoms": Path(symptom_matcher.DATA_PATH),
+        }
+        self.signatures = {name: file_signature(path) for name, path in self.sources.items()}
+        self.lock = threading.Lock()  # one reload at a time
+        self._thread = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload = None
+        self.last_reloaded = []
+        self.last_duration_ms = None
+        self.last_error = None
+
+    def changed(self) -> set:
+        return {name for name, path in self.sources.items() if file_signature(path) != self.signatures[name]}
+
+    def reload(self, force: bool = False) -> list:
+        """Rebuild whatever changed on disk (everything with force=True); returns what was reloaded."""
+        with self.lock:
+            changed = set(self.sources) if force else self.changed()
+            if not changed:
+                return []
+            signatures = {name: file_signature(self.sources[name]) for name in changed}
+            start = time.perf_counter()
+            reloaded = []
+            try:
+                if "registry" in changed:
+                    reload_registry()  # its listeners rebuild the risk data against the new registry
+                    reloaded += ["registry", "risk_map"]
+                elif "risk_map" in changed:
+                    ml.reload_risk_data()
+                    reloaded.append("risk_map")
+                if "symptoms" in changed:
+                    symptom_matcher.reload_symptom_table()
+                    reloaded.append("symptoms")
+            except Exception as e:
+                # Keep serving the current data; the next check retries
+                self.failures += 1
+                self.last_error = str(e)
+                logger.exception("Reloading %s failed", ", ".join(sorted(changed)))
+                raise
+            self.signatures.update(signatures)
+            self.reloads += 1
+            self.last_reload = time.time()
+            self.last_reloaded = reloaded
+            self.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.last_error = None
+            return reloaded
+
+    # === Watcher ===
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except Exception:
+                pass  # logged in reload
+
+    def start(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval,
+            "reloads": self.reloads,
+            "failed_reloads": self.failures,
+            "last_reload": self.last_reload,
+            "last_reloaded": self.last_reloaded,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+            "risk_data_generation": list(ml.risk_data.generation),
+        }
+
+
+data_reloader = DataReloader()
@@ -1,35 +1,134 @@
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import base64
+from app.core.report_queue import ReportQueue, REPORT_QUEUE_PATH
 
 load_dotenv()
 
-# Load the base64-encoded key from environment variable
-firebase_key_b64 = os.getenv("FIREBASE_KEY")
 
-if not firebase_key_b64:
-    raise ValueError("FIREBASE_KEY is not set in environment variables.")
+# === Firebase ===
+# firebase_admin and the Firestore client take a large share of startup time, so they are
+# imported and initialized on first use rather than when the app is imported.
 
-# Decode from base64 to JSON string
-try:
-    firebase_key_json_str = base64.b64decode(firebase_key_b64).decode('utf-8')
-except Exception as e:
-    raise ValueError(f"Failed to decode FIREBASE_KEY from base64: {e}")
+def load_firebase_credentials() -> dict:
+    # Load the base64-encoded key from environment variable
+    firebase_key_b64 = os.getenv("FIREBASE_KEY")
 
-# Parse JSON string into dictionary
-try:
-    firebase_key_json = json.loads(firebase_key_json_str)
-except json.JSONDecodeError:
-    raise ValueError("Decoded FIREBASE_KEY is not valid JSON.")
+    if not firebase_key_b64:
+        raise ValueError("FIREBASE_KEY is not set in environment variables.")
 
-# Initialize Firebase app if not already initialized
-if not firebase_admin._apps:
-    cred = credentials.Certificate(firebase_key_json)
-    firebase_admin.initialize_app(cred)
+    # Decode from base64 to JSON string
+    try:
+        firebase_key_json_str = base64.b64decode(firebase_key_b64).decode('utf-8')
+    except Exception as e:
+        raise ValueError(f"Failed to decode FIREBASE_KEY from base64: {e}")
 
-# Create Firestore client
-db = firestore.client()
-reports_collection = db.collection("reports")
+    # Parse JSON string into dictionary
+    try:
+        return json.loads(firebase_key_json_str)
+    except json.JSONDecodeError:
+        raise ValueError("Decoded FIREBASE_KEY is not valid JSON.")
+
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    """The Firestore client, initializing Firebase on first call."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                # Initialize Firebase app if not already initialized
+                if not firebase_admin._apps:
+                    cred = credentials.Certificate(load_firebase_credentials())
+                    firebase_admin.initialize_app(cred)
+
+                # Create Firestore client
+                _db = firestore.client()
+    return _db
+
+
+class LazyCollection:
+    """Stands in for a Firestore CollectionReference that is only created when first used."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._ref = None
+
+    @property
+    def ref(self):
+        if self._ref is None:
+            self._ref = get_db().collection(self._name)
+        return self._ref
+
+    def __getattr__(self, attr):
+        return getattr(self.ref, attr)
+
+
+reports_collection = LazyCollection("reports")
+
+
+# === Async access ===
+# The routers are async, but the Firestore client used here is synchronous (and the
+# snapshot listener needs it). Calls are offloaded to a bounded thread pool so a slow
+# round trip or a full collection stream only occupies a pool thread, never the event
+# loop. Functions look up reports_collection at call time, so it can be swapped out.
+
+FIRESTORE_MAX_WORKERS = int(os.getenv("FIRESTORE_MAX_WORKERS", "8"))
+firestore_executor = ThreadPoolExecutor(max_workers=FIRESTORE_MAX_WORKERS, thread_name_prefix="firestore")
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking Firestore call on the Firestore thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(firestore_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def add_report(report_data: dict):
+    """Add a report document; returns (update_time, document_reference) like collection.add."""
+    return await run_db(reports_collection.add, report_data)
+
+
+async def stream_reports() -> list:
+    """Every report document, read in full on a pool thread."""
+    return await run_db(lambda: list(reports_collection.stream()))
+
+
+async def stream_pharmacy_reports(pharmacy_key: str) -> list:
+    """Report documents for one pharmacy (pharmacy_name is stored lowercased), via an equality query."""
+    return await run_db(lambda: list(reports_collection.where("pharmacy_name", "==", pharmacy_key).stream()))
+
+
+def commit_reports(items):
+    """Write (doc_id, report) pairs as one Firestore WriteBatch (at most 500 writes)."""
+    batch = get_db().batch()
+    for doc_id, report_data in items:
+        batch.set(reports_collection.document(doc_id), report_data)
+    batch.commit()
+
+
+# === Write-behind ===
+# Submitted reports go to a local durable log and are group-committed by a background
+# flusher (see app.core.report_queue). REPORT_WRITE_BEHIND=0 writes each report directly.
+
+REPORT_WRITE_BEHIND = os.getenv("REPORT_WRITE_BEHIND", "1") == "1"
+report_queue = ReportQueue(REPORT_QUEUE_PATH, commit=lambda items: commit_reports(items))
+
+
+async def save_report(report_data: dict) -> str:
+    """Persist a report and return its document id. Raises ReportQueueFull when the backlog is full."""
+    if REPORT_WRITE_BEHIND:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, report_queue.enqueue, report_data)
+    _, doc_ref = await add_report(report_data)
+    return doc_ref.id
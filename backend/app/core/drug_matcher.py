@@ -1,5 +1,4 @@
-import json
-import os
+from app.core.drug_registry import get_registry
 
 # Basic ingredient-to-use-case mapping (extendable)
 INGREDIENT_USE_CASES = {
@@ -26,15 +25,12 @@ INGREDIENT_USE_CASES = {
     "Cetirizine": "Antihistamine for allergies"
 }
 
-# Load NAFDAC drug database
-with open(os.path.join("app", "data", "verified_drugs.json")) as f:
-    DRUGS = json.load(f)
-
 def suggest_drugs(text: str):
     text = text.lower()
     suggestions = []
 
-    for drug in DRUGS:
+    # NAFDAC drug database (shared registry, read per call so reloads are picked up)
+    for drug in get_registry().drugs:
         use_cases = []
         for ingredient in drug.get("ingredients", []):
             for key in INGREDIENT_USE_CASES:
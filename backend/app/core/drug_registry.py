@@ -0,0 +1,452 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from functools import cached_property
+from pathlib import Path
+from typing import Optional
+
+from rapidfuzz import fuzz
+
+from app.core.ngram_index import NgramIndex
+
+DATA_FILE = Path(__file__).parent.parent / "data" / "verified_drugs.json"
+# Prebuilt columnar copy of DATA_FILE; rebuild with `python -m app.core.drug_registry`
+SNAPSHOT_FILE = DATA_FILE.with_suffix(".snapshot")
+
+
+def normalize_key(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a product name or NAFDAC reg number for exact lookups.
+    Returns None if input is None or empty after trimming.
+    """
+    if value is None:
+        return None
+    value = value.strip().lower()
+    return value or None
+
+
+def normalize_name(value: Optional[str]) -> str:
+    """Lowercase a product name and fold punctuation and repeated spaces ("Artheget-EZ" -> "artheget ez")."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", value.lower()).split()) if value else ""
+
+
+def normalize_reg_no(value: Optional[str]) -> str:
+    """Keep only the letters and digits of a NAFDAC reg number ("A4 6238" -> "a46238")."""
+    return re.sub(r"[^0-9a-z]+", "", value.lower()) if value else ""
+
+
+def drug_ingredients(drug: dict) -> list:
+    """Ingredient list of a record (one NAFDAC record spells the key "i ngredients")."""
+    return drug.get("ingredients") or drug.get("i ngredients") or []
+
+
+class DrugRecord:
+    """
+    One NAFDAC registry entry.
+
+    Slotted, with interned strings and (shared) tuples for the list fields, so the
+    ~9.6k records cost a fraction of the equivalent JSON dicts. Supports the
+    dict-style drug["product_name"] / drug.get("ingredients") access used by the routers.
+    """
+
+    __slots__ = ("product_name", "dosage_form", "ingredients", "strengths", "nafdac_reg_no", "status")
+
+    def __init__(self, product_name, dosage_form, ingredients, strengths, nafdac_reg_no, status):
+        self.product_name = product_name
+        self.dosage_form = dosage_form
+        self.ingredients = ingredients
+        self.strengths = strengths
+        self.nafdac_reg_no = nafdac_reg_no
+        self.status = status
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_dict(self) -> dict:
+        return {
+            "product_name": self.product_name,
+            "dosage_form": self.dosage_form,
+            "ingredients": list(self.ingredients),
+            "strengths": list(self.strengths),
+            "nafdac_reg_no": self.nafdac_reg_no,
+            "status": self.status,
+        }
+
+
+class _Interner:
+    """Deduplicates strings and string tuples while records are being built."""
+
+    def __init__(self):
+        self.tuples = {}
+
+    def string(self, value):
+        return sys.intern(value) if isinstance(value, str) else value
+
+    def strings(self, values):
+        values = tuple(self.string(v) for v in values or ())
+        return self.tuples.setdefault(values, values)
+
+    def record(self, data: dict) -> DrugRecord:
+        return DrugRecord(
+            product_name=self.string(data.get("product_name")),
+            dosage_form=self.string(data.get("dosage_form")),
+            ingredients=self.strings(drug_ingredients(data)),
+            strengths=self.strings(data.get("strengths")),
+            nafdac_reg_no=self.string(data.get("nafdac_reg_no")),
+            status=self.string(data.get("status")),
+        )
+
+
+class IngredientIndex:
+    """
+    Inverted index from normalized ingredient names to the products containing them.
+
+    Substring queries ("artemether" -> every product with an ingredient containing it)
+    go through a trigram index over the distinct ingredient names, so their cost
+    depends on the number of matching ingredients rather than on the registry size.
+    """
+
+    def __init__(self, drugs: list):
+        products = {}
+        for drug in drugs:
+            for ingredient in drug_ingredients(drug):
+                products.setdefault(ingredient.strip().lower(), []).append(drug["product_name"])
+
+        self.ingredients = list(products)
+        self.products = list(products.values())
+        self.ngrams = NgramIndex(self.ingredients)
+
+    def __len__(self):
+        return len(self.ingredients)
+
+    def has_ingredient_containing(self, substring: str) -> bool:
+        return bool(self.ngrams.containing(substring))
+
+    def products_containing(self, substring: str) -> set:
+        """Product names with at least one ingredient containing substring."""
+        names = set()
+        for position in self.ngrams.containing(substring):
+            names.update(self.products[position])
+        return names
+
+
+class DrugRegistry:
+    """
+    NAFDAC drug records with hash indexes built once at load time.
+
+    Each index maps a normalized key to the first record carrying it, so lookups
+    return the same record the old linear scans over the list did.
+    """
+
+    def __init__(self, drugs: list):
+        self.drugs = drugs
+        self.digest = None  # SHA-256 of the JSON source, when loaded through load_registry
+        self.by_name = {}
+        self.by_reg_no = {}
+        self.by_name_and_reg_no = {}
+
+        for drug in drugs:
+            name = normalize_key(drug.product_name)
+            reg_no = normalize_key(drug.nafdac_reg_no)
+            if name:
+                self.by_name.setdefault(name, drug)
+            if reg_no:
+                self.by_reg_no.setdefault(reg_no, drug)
+            if name and reg_no:
+                self.by_name_and_reg_no.setdefault((name, reg_no), drug)
+
+    @classmethod
+    def from_dicts(cls, drugs: list) -> "DrugRegistry":
+        interner = _Interner()
+        return cls([interner.record(drug) for drug in drugs])
+
+    @classmethod
+    def from_json(cls, path: Path = DATA_FILE) -> "DrugRegistry":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dicts(json.load(f))
+
+    def __len__(self):
+        return len(self.drugs)
+
+    @cached_property
+    def ingredient_index(self) -> "IngredientIndex":
+        return IngredientIndex(self.drugs)
+
+    def find_by_name(self, name: Optional[str]) -> Optional[DrugRecord]:
+        key = normalize_key(name)
+        return self.by_name.get(key) if key else None
+
+    def find_by_reg_no(self, reg_no: Optional[str]) -> Optional[DrugRecord]:
+        key = normalize_key(reg_no)
+        return self.by_reg_no.get(key) if key else None
+
+    def find_exact(self, name: Optional[str], reg_no: Optional[str]) -> Optional[DrugRecord]:
+        name_key, reg_key = normalize_key(name), normalize_key(reg_no)
+        if not (name_key and reg_key):
+            return None
+        return self.by_name_and_reg_no.get((name_key, reg_key))
+
+    @cached_property
+    def _fuzzy_indexes(self):
+        """Trigram indexes over normalized names and reg numbers, built on first fuzzy search."""
+        keys = [
+            (normalize_name(drug.get("product_name")), normalize_reg_no(drug.get("nafdac_reg_no")))
+            for drug in self.drugs
+        ]
+        names, reg_nos = {}, {}
+        for position, (name, reg_no) in enumerate(keys):
+            if name:
+                names.setdefault(name, []).append(position)
+            if reg_no:
+                reg_nos.setdefault(reg_no, []).append(position)
+        return (
+            keys,
+            NgramIndex(names), list(names.values()),
+            NgramIndex(reg_nos), list(reg_nos.values()),
+        )
+
+    def search(self, name: Optional[str] = None, reg_no: Optional[str] = None,
+               limit: int = 5, min_score: int = 60, shortlist: int = 20):
+        """
+        Typo-tolerant lookup by product name and/or reg number.
+
+        Candidates are shortlisted from the trigram indexes and only those are rescored
+        with RapidFuzz. Returns up to limit (drug, score) pairs, best first; when both
+        fields are given the score is the mean of the name and reg number scores.
+        """
+        name_query, reg_query = normalize_name(name), normalize_reg_no(reg_no)
+        if not (name_query or reg_query):
+            return []
+
+        keys, name_index, name_groups, reg_index, reg_groups = self._fuzzy_indexes
+        if name_query and reg_query:
+            # Records that match on both fields surface in either shortlist, so each can be shorter
+            shortlist = max(limit, shortlist // 2)
+        name_scores, reg_scores, candidates = {}, {}, {}
+        for query, index, groups, scores, scorer in (
+            (name_query, name_index, name_groups, name_scores, fuzz.WRatio),
+            (reg_query, reg_index, reg_groups, reg_scores, fuzz.ratio),
+        ):
+            if not query:
+                continue
+            for position in index.candidates(query, shortlist):
+                text = index.texts[position]
+                scores[text] = scorer(query, text)
+                candidates.update(dict.fromkeys(groups[position]))
+
+        scored = []
+        for position in candidates:
+            candidate_name, candidate_reg_no = keys[position]
+            scores = []
+            if name_query:
+                score = name_scores.get(candidate_name)
+                scores.append(fuzz.WRatio(name_query, candidate_name) if score is None else score)
+            if reg_query:
+                score = reg_scores.get(candidate_reg_no)
+                scores.append(fuzz.ratio(reg_query, candidate_reg_no) if score is None else score)
+            score = round(sum(scores) / len(scores))
+            if score >= min_score:
+                scored.append((self.drugs[position], score))
+
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:limit]
+
+
+# === Binary snapshot ===
+# Built offline with `python -m app.core.drug_registry` (and rebuilt at startup only when
+# the JSON it was built from has changed). The header records the source's SHA-256 and
+# its size and mtime, so an unchanged source is recognized from a stat() without hashing.
+# Layout (little-endian): header, then a uint32 record table (8 columns per record:
+# name, dosage form, reg no, status string ids and ingredient/strength ranges into the
+# pool), a uint32 pool of string ids, and the NUL-separated UTF-8 string table.
+# String id 0 stands for None; id n is the n-th entry of the string table.
+SNAPSHOT_MAGIC = b"NXREG\x00\x00\x02"
+SNAPSHOT_HEADER = struct.Struct("<8s32sQqIII")
+RECORD_COLUMNS = 8
+
+
+def source_digest(path: Path = DATA_FILE) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def source_stamp(path: Path = DATA_FILE) -> tuple:
+    """(size, mtime_ns) of the source JSON."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_snapshot(registry: DrugRegistry, digest: bytes, path: Path = SNAPSHOT_FILE, stamp: tuple = (0, 0)):
+    string_ids = {}
+
+    def string_id(value):
+        if value is None:
+            return 0
+        return string_ids.setdefault(value, len(string_ids) + 1)
+
+    records, pool = array("I"), array("I")
+    for drug in registry.drugs:
+        columns = [string_id(drug.product_name), string_id(drug.dosage_form),
+                   string_id(drug.nafdac_reg_no), string_id(drug.status)]
+        for values in (drug.ingredients, drug.strengths):
+            start = len(pool)
+            pool.extend(string_id(v) for v in values)
+            columns += [start, len(pool)]
+        records.extend(columns)
+
+    if sys.byteorder != "little":
+        records.byteswap()
+        pool.byteswap()
+    strings = "\x00".join(string_ids).encode("utf-8")
+
+    # A temp file of our own, then an atomic rename: other workers rebuilding at the same
+    # time never write into the same file, and readers see either snapshot in full
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False) as f:
+        try:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, digest, *stamp, len(registry.drugs), len(pool), len(string_ids)))
+            f.write(records.tobytes())
+            f.write(pool.tobytes())
+            f.write(strings)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def snapshot_source(path: Path = SNAPSHOT_FILE) -> Optional[tuple]:
+    """(digest, (size, mtime_ns)) of the source a snapshot was built from, or None if there is no usable snapshot."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < SNAPSHOT_HEADER.size:
+        return None
+    magic, digest, size, mtime_ns, *_ = SNAPSHOT_HEADER.unpack(header)
+    return (digest, (size, mtime_ns)) if magic == SNAPSHOT_MAGIC else None
+
+
+def read_snapshot(path: Path = SNAPSHOT_FILE, digest: Optional[bytes] = None) -> Optional[DrugRegistry]:
+    """
+    Load a registry from a snapshot by memory-mapping it and reading the columns in place.
+    Returns None if the file is missing, from another format version, or (when digest
+    is given) was built from a different source JSON.
+    """
+    if sys.byteorder != "little" or not path.exists():
+        return None
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, snapshot_digest, _, _, record_count, pool_size, string_count = SNAPSHOT_HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC or (digest is not None and snapshot_digest != digest):
+            return None
+
+        view = memoryview(mm)
+        try:
+            offset = SNAPSHOT_HEADER.size
+            records = view[offset:offset + record_count * RECORD_COLUMNS * 4].cast("I")
+            offset += record_count * RECORD_COLUMNS * 4
+            pool = view[offset:offset + pool_size * 4].cast("I")
+            offset += pool_size * 4
+            strings = [None]
+            if string_count:
+                strings += map(sys.intern, str(view[offset:], "utf-8").split("\x00"))
+
+            columns, pool_ids = records.tolist(), pool.tolist()
+            tuples = {}
+            drugs = []
+            for name, form, reg_no, status, ing_start, ing_end, str_start, str_end in zip(*[iter(columns)] * RECORD_COLUMNS):
+                ingredients = tuple([strings[j] for j in pool_ids[ing_start:ing_end]])
+                strengths = tuple([strings[j] for j in pool_ids[str_start:str_end]])
+                drugs.append(DrugRecord(
+                    strings[name], strings[form],
+                    tuples.setdefault(ingredients, ingredients), tuples.setdefault(strengths, strengths),
+                    strings[reg_no], strings[status],
+                ))
+            records.release()
+            pool.release()
+        finally:
+            view.release()
+
+    return DrugRegistry(drugs)
+
+
+def load_registry(json_path: Path = DATA_FILE, snapshot_path: Path = SNAPSHOT_FILE) -> DrugRegistry:
+    """
+    Load from the snapshot when it matches the JSON source; otherwise parse the JSON
+    and refresh the snapshot (best effort - a read-only deploy just keeps using JSON).
+    The source is only hashed when its size or mtime differ from the snapshot's record.
+    """
+    stamp = source_stamp(json_path)
+    source = snapshot_source(snapshot_path)
+    if source is not None and source[1] == stamp:
+        digest = source[0]
+    else:
+        digest = source_digest(json_path)
+    registry = read_snapshot(snapshot_path, digest)
+    if registry is None:
+        registry = DrugRegistry.from_json(json_path)
+        try:
+            write_snapshot(registry, digest, snapshot_path, stamp)
+        except OSError:
+            pass
+    registry.digest = digest
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> DrugRegistry:
+    """The process-wide registry shared by every router and core module."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_registry()
+    return _registry
+
+
+_reload_listeners = []
+
+
+def on_registry_reload(callback):
+    """Call callback(registry) whenever reload_registry swaps in a new registry."""
+    _reload_listeners.append(callback)
+    return callback
+
+
+def reload_registry(json_path: Path = DATA_FILE, snapshot_path: Path = SNAPSHOT_FILE) -> DrugRegistry:
+    """
+    Load the registry again (e.g. after a new NAFDAC dump) and swap it in. The new registry
+    and its lazy indexes are fully built before the swap, so readers holding the old one
+    finish with it and new lookups never see a partly built index.
+    """
+    global _registry
+    registry = load_registry(json_path, snapshot_path)
+    registry.ingredient_index
+    registry._fuzzy_indexes
+    with _registry_lock:
+        _registry = registry
+    for callback in _reload_listeners:
+        callback(registry)
+    return registry
+
+
+if __name__ == "__main__":
+    registry = DrugRegistry.from_json(DATA_FILE)
+    write_snapshot(registry, source_digest(DATA_FILE), SNAPSHOT_FILE, source_stamp(DATA_FILE))
+    print(f"Wrote {len(registry)} records to {SNAPSHOT_FILE}")
@@ -0,0 +1,172 @@
+import string
+from bisect import bisect_left
+from functools import cached_property, lru_cache
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Minimum partial_ratio for the fuzzy fallback (the threshold /get-flagged has always used)
+FUZZY_THRESHOLD = 70
+
+
+# Punctuation becomes a token separator
+_SEPARATORS = str.maketrans({ch: " " for ch in string.punctuation})
+
+
+# Names recur from one aggregate version to the next, so their normalized forms and
+# tokens are memoized across index rebuilds
+@lru_cache(maxsize=1 << 17)
+def normalize_facet(value: str) -> str:
+    return " ".join((value or "").lower().split())
+
+
+@lru_cache(maxsize=1 << 17)
+def facet_tokens(value: str) -> tuple:
+    return tuple(dict.fromkeys(value.translate(_SEPARATORS).split()))
+
+
+class Facet:
+    """
+    Distinct normalized values of one field, each with the rows holding it.
+
+    match() resolves a query to rows in three steps, stopping at the first that finds
+    something: the exact normalized value, then (for tokenized facets) values with a
+    token starting with every query token, then a vectorized partial_ratio over the
+    distinct values. Scoring distinct values instead of rows keeps the fallback cheap
+    when thousands of pharmacies share a state or drug.
+    """
+
+    def __init__(self, row_values, tokenized: bool = False):
+        value_rows = {}
+        for row, values in enumerate(row_values):
+            for value in values:
+                key = normalize_facet(value)
+                if key:
+                    rows = value_rows.get(key)
+                    if rows is None:
+                        value_rows[key] = [row]
+                    elif rows[-1] != row:  # two spellings of one drug in the same row
+                        rows.append(row)
+
+        # Row lists are ascending and duplicate-free, and index numpy masks directly
+        self.values = list(value_rows)
+        self.value_ids = {value: i for i, value in enumerate(self.values)}
+        self.rows = list(value_rows.values())
+
+        self.tokens = []
+        self.token_values = {}
+        if tokenized:
+            for value_id, value in enumerate(self.values):
+                for token in facet_tokens(value):
+                    value_ids = self.token_values.get(token)
+                    if value_ids is None:
+                        self.token_values[token] = [value_id]
+                    else:
+                        value_ids.append(value_id)
+            self.tokens = sorted(self.token_values)
+
+    def match_values(self, query: str) -> list:
+        query = normalize_facet(query)
+        if self.tokens:
+            value_ids = self._match_token_prefixes(query)
+        else:
+            value_id = self.value_ids.get(query)
+            value_ids = [] if value_id is None else [value_id]
+        if value_ids or not self.values:
+            return value_ids
+
+        # Fuzzy fallback over the distinct values
+        scores = process.cdist(
+            [query], self.values, scorer=fuzz.partial_ratio, score_cutoff=FUZZY_THRESHOLD, dtype=np.uint8
+        )[0]
+        return np.flatnonzero(scores).tolist()
+
+    def _match_token_prefixes(self, query: str) -> list:
+        matched = None
+        for query_token in facet_tokens(query):
+            value_ids = set()
+            i = bisect_left(self.tokens, query_token)
+            while i < len(self.tokens) and self.tokens[i].startswith(query_token):
+                value_ids.update(self.token_values[self.tokens[i]])
+                i += 1
+            matched = value_ids if matched is None else matched & value_ids
+            if not matched:
+                return []
+        return sorted(matched or ())
+
+    def mask(self, query: str, size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        for value_id in self.match_values(query):
+            mask[self.rows[value_id]] = True
+        return mask
+
+
+class FlaggedIndex:
+    """
+    Facet indexes and presorted orderings over one version of the flagged list, so a
+    filtered, sorted page is a few boolean masks and a slice.
+    """
+
+    def __init__(self, flagged: list, previous: "FlaggedIndex" = None):
+        self.flagged = flagged
+        self._orders = {}
+
+        # Most new versions only change report counts and drugs. When the flagged pharmacies
+        # (and their positions) are unchanged, reuse what depends on them alone.
+        self.members = [(item["pharmacy"], item.get("state"), item.get("lga")) for item in flagged]
+        if previous is not None and previous.members == self.members:
+            for name in ("pharmacy", "state", "lga"):
+                if name in previous.__dict__:
+                    self.__dict__[name] = previous.__dict__[name]
+            for key, order in previous._orders.items():
+                if key[0] == "pharmacy":
+                    self._orders[key] = order
+
+    # Facets are built on first use, so a version that is only paged through costs one sort
+
+    @cached_property
+    def pharmacy(self) -> Facet:
+        return Facet(([item["pharmacy"]] for item in self.flagged), tokenized=True)
+
+    @cached_property
+    def state(self) -> Facet:
+        return Facet([item.get("state")] for item in self.flagged)
+
+    @cached_property
+    def lga(self) -> Facet:
+        return Facet([item.get("lga")] for item in self.flagged)
+
+    @cached_property
+    def drug(self) -> Facet:
+        return Facet((item.get("drugs", []) for item in self.flagged), tokenized=True)
+
+    def order(self, sort_by: str, sort_order: str) -> np.ndarray:
+        """Row ids sorted like list.sort(key=..., reverse=...), ties keeping list order."""
+        key = (sort_by, sort_order)
+        order = self._orders.get(key)
+        if order is None:
+            if sort_by == "pharmacy":
+                sort_key = lambda i: self.flagged[i]["pharmacy"].lower()
+            else:
+                sort_key = lambda i: self.flagged[i][sort_by]
+            order = np.array(
+                sorted(range(len(self.flagged)), key=sort_key, reverse=(sort_order == "desc")), dtype=np.int32
+            )
+            self._orders[key] = order
+        return order
+
+    def query(self, pharmacy=None, state=None, lga=None, drug=None,
+              sort_by="report_count", sort_order="desc", start=0, end=None):
+        """(page of flagged items, total matching) for the given filters and ordering."""
+        size = len(self.flagged)
+        mask = None
+        for name, value in (("state", state), ("lga", lga), ("pharmacy", pharmacy), ("drug", drug)):
+            if value:
+                facet_mask = getattr(self, name).mask(value, size)
+                mask = facet_mask if mask is None else mask & facet_mask
+                if not mask.any():
+                    return [], 0
+
+        order = self.order(sort_by, sort_order)
+        if mask is not None:
+            order = order[mask[order]]
+        return [self.flagged[i] for i in order[start:end].tolist()], len(order)
@@ -0,0 +1,86 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_INDEX = {ch: i for i, ch in enumerate(GEOHASH_ALPHABET)}
+
+
+def haversine_m(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distances in meters from (lat, lng) to every point in lats/lngs."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# === Geohash ===
+
+def geohash_cell_size(precision: int):
+    """(height, width) in degrees of a geohash cell at this precision."""
+    bits = 5 * precision
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << ((bits + 1) // 2))
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    cell_h, cell_w = geohash_cell_size(precision)
+    row = min(int((lat + 90.0) / cell_h), int(round(180.0 / cell_h)) - 1)
+    col = min(int((lng + 180.0) / cell_w), int(round(360.0 / cell_w)) - 1)
+    return _geohash_from_cell(row, col, precision)
+
+
+def geohash_encode_many(lats: np.ndarray, lngs: np.ndarray, precision: int) -> list:
+    """Vectorized geohash_encode: cell row/column per point, then interleaved into base32."""
+    cell_h, cell_w = geohash_cell_size(precision)
+    rows = np.clip(((np.asarray(lats, dtype=np.float64) + 90.0) / cell_h).astype(np.int64), 0, int(round(180.0 / cell_h)) - 1)
+    cols = np.clip(((np.asarray(lngs, dtype=np.float64) + 180.0) / cell_w).astype(np.int64), 0, int(round(360.0 / cell_w)) - 1)
+    return [_geohash_from_cell(row, col, precision) for row, col in zip(rows.tolist(), cols.tolist())]
+
+
+def _geohash_from_cell(row: int, col: int, precision: int) -> str:
+    # Geohash interleaves longitude and latitude bits, longitude first
+    bits = 5 * precision
+    lat_bits, lng_bits = bits // 2, (bits + 1) // 2
+    value = 0
+    for i in range(bits):
+        if i % 2 == 0:
+            lng_bits -= 1
+            value = (value << 1) | ((col >> lng_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((row >> lat_bits) & 1)
+    return "".join(GEOHASH_ALPHABET[(value >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def geohash_bbox(geohash: str):
+    """(south, west, north, east) of a geohash cell."""
+    bits = 5 * len(geohash)
+    value = 0
+    for ch in geohash:
+        value = (value << 5) | GEOHASH_INDEX[ch]
+    row = col = 0
+    for i in range(bits):
+        bit = (value >> (bits - 1 - i)) & 1
+        if i % 2 == 0:
+            col = (col << 1) | bit
+        else:
+            row = (row << 1) | bit
+    cell_h, cell_w = geohash_cell_size(len(geohash))
+    south, west = row * cell_h - 90.0, col * cell_w - 180.0
+    return south, west, south + cell_h, west + cell_w
+
+
+def geohash_cover(lat: float, lng: float, radius_m: float, precision: int) -> list:
+    """Geohash cells at `precision` covering the bounding box of a circle."""
+    cell_h, cell_w = geohash_cell_size(precision)
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    west, east = max(lng - dlng, -180.0), min(lng + dlng, 180.0)
+
+    max_row, max_col = int(round(180.0 / cell_h)) - 1, int(round(360.0 / cell_w)) - 1
+    rows = range(int((south + 90.0) / cell_h), min(int((north + 90.0) / cell_h), max_row) + 1)
+    cols = range(int((west + 180.0) / cell_w), min(int((east + 180.0) / cell_w), max_col) + 1)
+    return [_geohash_from_cell(row, col, precision) for row in rows for col in cols]
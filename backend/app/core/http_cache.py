@@ -0,0 +1,239 @@
+"""
+Conditional, pre-compressed JSON responses for endpoints that clients poll.
+
+A response is identified by an ETag derived from a digest of the data it was built
+from plus the request parameters, so every server process hands out the same tag for
+the same data. The tags are weak: two processes holding the same reports may still
+order ties differently, so the bodies are equivalent rather than byte-identical. Bodies are serialized (orjson when it is
+installed) and compressed (brotli when installed, otherwise gzip) once per ETag
+and served from an LRU bounded by total bytes afterwards; a matching If-None-Match
+gets a 304.
+
+A large part shared by many responses (e.g. every report, which /get-flagged
+appends to each page) can be cached once on its own and spliced into the small
+per-parameter bodies at send time; gzip output is spliced from separately
+compressed deflate segments, so the shared part is never compressed again.
+"""
+import gzip
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+# Bodies below this size are sent uncompressed (same threshold as the GZip middleware)
+MIN_COMPRESS_SIZE = 1000
+# Serialized and compressed bytes kept across all cached bodies
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _default(value):
+    # Firestore timestamps and other datetimes, as FastAPI's encoder would render them
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def make_etag(*parts) -> str:
+    """ETag (without quotes or W/) from the data digest and parameters a response depends on."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """
+    The If-None-Match tag (without quotes) matching `etag` or one of its content-coded
+    variants, or None. If-None-Match uses weak comparison.
+    """
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return etag
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == etag or tag.startswith(etag + "-"):
+            return tag
+    return None
+
+
+def accepted_encoding(accept_encoding: str, allow_brotli: bool = True) -> str:
+    accepted = set()
+    for item in (accept_encoding or "").lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if allow_brotli and brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def compress(raw: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(raw, quality=5)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def deflate_segment(raw: bytes) -> bytes:
+    """
+    Raw deflate blocks for `raw`, ending byte-aligned without a final block, so segments
+    compressed independently can be concatenated into one stream (see gzip_join).
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(raw) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+DEFLATE_END = b"\x03\x00"  # empty final block
+
+
+def gzip_join(raws, segments) -> bytes:
+    """One gzip member from the deflate segments of consecutive raw pieces."""
+    crc, length = 0, 0
+    for raw in raws:
+        crc = zlib.crc32(raw, crc)
+        length += len(raw)
+    return b"".join((GZIP_HEADER, *segments, DEFLATE_END, struct.pack("<II", crc, length & 0xFFFFFFFF)))
+
+
+class EncodedBody:
+    __slots__ = ("raw", "encoded", "size", "cached")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self.encoded = {}  # content coding (or deflate segment) -> bytes
+        self.size = len(raw)  # bytes counted against the cache
+        self.cached = False
+
+
+class BodyCache:
+    """LRU of serialized bodies (and their compressed variants) keyed by ETag, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_build(self, etag: str, build) -> EncodedBody:
+        with self.lock:
+            entry = self.entries.get(etag)
+            if entry is not None:
+                self.entries.move_to_end(etag)
+                return entry
+        entry = EncodedBody(dumps(build()))
+        with self.lock:
+            if etag not in self.entries:
+                self.entries[etag] = entry
+                entry.cached = True
+                self.size += entry.size
+                self._evict()
+        return entry
+
+    def variant(self, entry: EncodedBody, name: str, make) -> bytes:
+        """entry's `name` variant, made by make(raw) on first use and counted against the cache."""
+        body = entry.encoded.get(name)
+        if body is not None:
+            return body
+        body = make(entry.raw)
+        with self.lock:
+            if name in entry.encoded:  # another request made it meanwhile
+                return entry.encoded[name]
+            entry.encoded[name] = body
+            entry.size += len(body)
+            if entry.cached:
+                self.size += len(body)
+                self._evict()
+        return body
+
+    def encode(self, entry: EncodedBody, encoding: str) -> bytes:
+        if encoding == "identity":
+            return entry.raw
+        return self.variant(entry, encoding, lambda raw: compress(raw, encoding))
+
+    def _evict(self):
+        # Oldest first; a single body over the limit is served once and not kept
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            evicted.cached = False
+            self.size -= evicted.size
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+body_cache = BodyCache()
+
+
+def cached_json_response(request: Request, etag: str, build, splice=None) -> Response:
+    """
+    304 if the client already has `etag`, otherwise the JSON body of build() (only
+    called on a cache miss) in the best content coding the client accepts.
+
+    splice=(key, part_etag, part_build) adds `key` to build()'s object with the value
+    of part_build(), which is serialized and cached once under part_etag however many
+    responses include it.
+    """
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    matched = etag_matches(request.headers.get("if-none-match"), etag)
+    if matched:
+        headers["ETag"] = f'W/"{matched}"'
+        return Response(status_code=304, headers=headers)
+
+    entry = body_cache.get_or_build(etag, build)
+    if splice is None:
+        encoding = accepted_encoding(request.headers.get("accept-encoding"))
+        if len(entry.raw) < MIN_COMPRESS_SIZE:
+            encoding = "identity"
+        content = body_cache.encode(entry, encoding)
+    else:
+        encoding, content = spliced_body(request, entry, *splice)
+
+    if encoding == "identity":
+        headers["ETag"] = f'W/"{etag}"'
+    else:
+        # Each content coding is a distinct representation, so it gets its own tag
+        headers["ETag"] = f'W/"{etag}-{encoding}"'
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def spliced_body(request: Request, head: EncodedBody, key: str, part_etag: str, part_build):
+    """(encoding, body) of head's JSON object with `key` set to the cached part; gzip or identity."""
+    part = body_cache.get_or_build(part_etag, part_build)
+    prefix = head.raw[:-1] + (b"," if len(head.raw) > 2 else b"") + dumps(key) + b":"
+    pieces = (prefix, part.raw, b"}")
+
+    encoding = accepted_encoding(request.headers.get("accept-encoding"), allow_brotli=False)
+    if encoding == "identity" or sum(map(len, pieces)) < MIN_COMPRESS_SIZE:
+        return "identity", b"".join(pieces)
+    segments = (
+        body_cache.variant(head, f"deflate:{key}", lambda raw: deflate_segment(prefix)),
+        body_cache.variant(part, "deflate", deflate_segment),
+        deflate_segment(b"}"),
+    )
+    return "gzip", gzip_join(pieces, segments)
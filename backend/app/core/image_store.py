@@ -0,0 +1,173 @@
+"""
+Content-addressed storage for report images.
+
+Uploads are streamed to disk in fixed-size chunks while being hashed, so memory per
+upload stays at one chunk whatever the file size, and an upload over the limit is
+abandoned as soon as it crosses it. The file is then stored under the SHA-256 of the
+bytes kept, so identical photos of the same counterfeit pack are stored once.
+
+When Pillow is installed, still images are first re-encoded without metadata (EXIF,
+including GPS) and thumbnailed in a process pool, off the event loop; the stored name is
+then the hash of the stripped image, not of the upload.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: images are stored as uploaded
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+# Still formats that are re-encoded without metadata (animated GIFs are left alone)
+PROCESSED_EXTENSIONS = (".jpg", ".png", ".webp")
+
+# Leading bytes of the image formats we expect, mapped to the stored extension
+MAGIC_EXTENSIONS = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"RIFF", ".webp"),
+]
+
+
+class ImageTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+def sniff_extension(head: bytes, filename: str = None) -> str:
+    for magic, extension in MAGIC_EXTENSIONS:
+        if head.startswith(magic) and (extension != ".webp" or head[8:12] == b"WEBP"):
+            return extension
+    # Unrecognized content keeps a sanitized version of the client's extension
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension[1:].isalnum() and len(extension) <= 6 else ".bin"
+
+
+def image_path(digest: str, extension: str, upload_dir: str = UPLOAD_DIR) -> str:
+    # Two-character fan-out keeps directories small
+    return os.path.join(upload_dir, digest[:2], digest + extension)
+
+
+async def save_upload(upload: UploadFile, upload_dir: str = UPLOAD_DIR, max_bytes: int = MAX_IMAGE_BYTES) -> str:
+    """
+    Stream an upload into content-addressed storage and return its path. Raises
+    ImageTooLarge (leaving nothing behind) when it is bigger than max_bytes.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageTooLarge(f"Images are limited to {max_bytes // (1024 * 1024)} MB.")
+                if len(head) < 16:
+                    head += chunk[:16]
+                digest.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+
+        extension = sniff_extension(head, upload.filename)
+        if Image is not None and extension in PROCESSED_EXTENSIONS:
+            try:
+                return await process_upload(temp_path, extension, upload_dir)
+            except Exception as e:
+                # Not decodable after all (or the pool died): keep the bytes as uploaded
+                logger.warning("Image post-processing failed: %s", e)
+        return store_file(temp_path, digest.hexdigest(), extension, upload_dir)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def store_file(temp_path: str, hex_digest: str, extension: str, upload_dir: str) -> str:
+    """Move temp_path to its content address (hex_digest is the SHA-256 of its bytes) unless already stored."""
+    path = image_path(hex_digest, extension, upload_dir)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(temp_path, path)
+    return path
+
+
+# === Post-processing ===
+
+# Workers are spawned, not forked: by the time the first image arrives the server runs
+# threads (Firestore's pool, the report flusher, the data reloader) whose locks a forked
+# child would inherit in whatever state they happened to be
+_process_pool = None
+
+
+def _process_pool_or_start() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=int(os.getenv("IMAGE_WORKERS", "2")), mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+async def process_upload(temp_path: str, extension: str, upload_dir: str = UPLOAD_DIR) -> str:
+    """Strip and thumbnail an uploaded image in the pool; returns the path it is stored under."""
+    future = _process_pool_or_start().submit(process_image, temp_path, extension, upload_dir)
+    return await asyncio.wrap_future(future)
+
+
+def shutdown_processing():
+    """Finish queued post-processing and stop the worker processes (on app shutdown)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True)
+        _process_pool = None
+
+
+def process_image(temp_path: str, extension: str, upload_dir: str) -> str:
+    """
+    Runs in a worker process: re-encode the upload at temp_path without metadata, store it
+    under the SHA-256 of the result and save a JPEG thumbnail next to the other thumbnails.
+    """
+    with Image.open(temp_path) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)  # keep the visible orientation once EXIF is gone
+        # Only pixels (and transparency) are carried over; EXIF, XMP and text chunks are dropped
+        image.info = {key: value for key, value in image.info.items() if key == "transparency"}
+        fd, stripped = tempfile.mkstemp(dir=upload_dir, prefix=".stripped-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format=image_format)
+            digest = hashlib.sha256()
+            with open(stripped, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            path = store_file(stripped, digest.hexdigest(), extension, upload_dir)
+        finally:
+            if os.path.exists(stripped):
+                os.remove(stripped)
+
+        thumbnail_path = os.path.join(upload_dir, "thumbs", digest.hexdigest() + ".jpg")
+        if not os.path.exists(thumbnail_path):
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            thumbnail = image.convert("RGB")
+            thumbnail.thumbnail(THUMBNAIL_SIZE)
+            thumbnail.save(thumbnail_path, "JPEG", quality=80)
+    return path
@@ -0,0 +1,57 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword vocabulary.
+
+    find_all() makes a single pass over the text and reports every keyword occurring
+    anywhere in it, including overlapping and nested ones ("pain" inside "chest pain"),
+    i.e. exactly the keywords for which `keyword in text` is true.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                state = next_state
+            self.output[state].add(keyword)
+
+        # Breadth-first pass: link each state to its longest proper suffix in the trie
+        # and inherit that suffix's keywords. Depth-1 states keep their link to the root.
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+        self.output = [frozenset(keywords) for keywords in self.output]
+
+    def find_all(self, text: str) -> set:
+        """Set of keywords that occur in text."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set(output[0])
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
@@ -0,0 +1,115 @@
+"""
+In-memory stand-in for the subset of the Firestore collection API the app uses.
+
+Lets the report pipeline and the map aggregation run (and be tested) without a
+Firebase project: documents live in a dict, and on_snapshot listeners receive
+the same (docs, changes, read_time) callbacks the real client delivers.
+"""
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+
+
+class ChangeType(Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class MemoryDocument:
+    def __init__(self, doc_id: str, data: dict):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class MemoryChange:
+    def __init__(self, change_type: ChangeType, document: MemoryDocument):
+        self.type = change_type
+        self.document = document
+
+
+class MemoryDocumentReference:
+    def __init__(self, collection: "InMemoryCollection", doc_id: str):
+        self.collection = collection
+        self.id = doc_id
+
+    def set(self, data: dict):
+        self.collection.set(self.id, data)
+
+    def get(self):
+        return MemoryDocument(self.id, self.collection.documents.get(self.id))
+
+    def delete(self):
+        self.collection.delete(self.id)
+
+
+class MemoryWatch:
+    def __init__(self, collection: "InMemoryCollection", callback):
+        self.collection = collection
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+        with self.collection.lock:
+            if self in self.collection.watches:
+                self.collection.watches.remove(self)
+
+
+class InMemoryCollection:
+    def __init__(self, documents: dict = None):
+        self.lock = threading.RLock()
+        self.documents = dict(documents or {})
+        self.watches = []
+
+    # === Writes ===
+
+    def document(self, doc_id: str = None) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self, doc_id or uuid.uuid4().hex)
+
+    def add(self, data: dict):
+        ref = self.document()
+        ref.set(data)
+        return datetime.now(timezone.utc), ref
+
+    def set(self, doc_id: str, data: dict):
+        with self.lock:
+            change_type = ChangeType.MODIFIED if doc_id in self.documents else ChangeType.ADDED
+            self.documents[doc_id] = copy.deepcopy(data)
+            self._notify([MemoryChange(change_type, MemoryDocument(doc_id, self.documents[doc_id]))])
+
+    def delete(self, doc_id: str):
+        with self.lock:
+            data = self.documents.pop(doc_id, None)
+            if data is not None:
+                self._notify([MemoryChange(ChangeType.REMOVED, MemoryDocument(doc_id, data))])
+
+    # === Reads ===
+
+    def stream(self):
+        with self.lock:
+            docs = [MemoryDocument(doc_id, data) for doc_id, data in self.documents.items()]
+        return iter(docs)
+
+    def on_snapshot(self, callback) -> MemoryWatch:
+        """Call back once with every existing document as ADDED, then on every change."""
+        watch = MemoryWatch(self, callback)
+        with self.lock:
+            self.watches.append(watch)
+            docs = list(self.stream())
+            callback(docs, [MemoryChange(ChangeType.ADDED, doc) for doc in docs], datetime.now(timezone.utc))
+        return watch
+
+    def _notify(self, changes):
+        # Unlike Firestore, later callbacks only carry the changed documents in `docs`,
+        # which keeps writes O(1) for large in-memory collections.
+        docs = [change.document for change in changes]
+        read_time = datetime.now(timezone.utc)
+        for watch in list(self.watches):
+            watch.callback(docs, changes, read_time)
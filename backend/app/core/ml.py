@@ -1,107 +1,250 @@
-import pandas as pd
+import csv
+import hashlib
+import io
+import json
 import os
 import re
-import json
+import string
+import tempfile
 from difflib import get_close_matches
+from functools import lru_cache
 from pathlib import Path
 
-import nltk
-from nltk.stem import PorterStemmer
+from rapidfuzz import fuzz, process
 
-#nltk.download('punkt')  # Only once, to ensure word tokenization works
-stemmer = PorterStemmer()
+from app.core.keyword_matcher import KeywordMatcher
+from app.core.drug_registry import get_registry, on_registry_reload
+from app.core.ttl_cache import TTLCache
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RISK_DATA_PATH = os.path.join(BASE_DIR, "data", "keyword_risk_map.csv")
-VERIFIED_DRUGS_PATH = os.path.join(BASE_DIR, "data", "verified_drugs.json")
 
-# === Load and Normalize Risk Data ===
-risk_df = pd.read_csv(RISK_DATA_PATH)
-risk_df["symptom_keyword"] = risk_df["symptom_keyword"].str.lower().str.strip()
 
-risk_map = {
-    row["symptom_keyword"]: {
-        "risk_weight": row["risk_weight"],
-        "common_drugs": [drug.strip() for drug in row["common_drugs"].split(",")] if pd.notna(row["common_drugs"]) else []
-    }
-    for _, row in risk_df.iterrows()
+def stems_path(risk_path: str) -> str:
+    """Prebuilt stem table next to a risk map CSV; rebuild with `python -m app.core.ml`."""
+    return os.path.splitext(risk_path)[0] + ".stems.json"
+
+
+@lru_cache(maxsize=None)
+def get_stemmer():
+    # nltk is slow to import and only needed for the word-by-word fallback and rebuilding the stem table
+    from nltk.stem import PorterStemmer
+    return PorterStemmer()
+
+
+@lru_cache(maxsize=1 << 16)
+def stem_word(word: str) -> str:
+    return get_stemmer().stem(word)
+
+
+def load_stem_table(keywords, digest: str, path: str) -> dict:
+    """
+    {stem: keyword} for the risk map, from the prebuilt table when it was built from the same
+    CSV; otherwise stemmed now and saved (best effort - a read-only deploy just stems each start).
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+        if table.get("source_digest") == digest:
+            return table["stems"]
+    except (OSError, ValueError):
+        pass
+
+    stems = {stem_word(k): k for k in keywords}
+    temp_path = None
+    try:
+        # Written aside and renamed into place, so a worker reading it never sees half a file
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+            suffix=".tmp", delete=False
+        ) as f:
+            temp_path = f.name
+            json.dump({"source_digest": digest, "stems": stems}, f, ensure_ascii=False, indent=0)
+        os.replace(temp_path, path)
+    except OSError:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+    return stems
+
+
+class RiskData:
+    """
+    Everything calculate_risk reads: the keyword risk map, the lookup structures compiled from
+    it and the verified-drug indexes. Built in full and then swapped in as one object, so a
+    request that took a reference keeps a consistent view while the data is reloaded.
+    """
+
+    def __init__(self, risk_path: str, registry):
+        # === Load and Normalize Risk Data ===
+        with open(risk_path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        self.risk_map = {
+            row["symptom_keyword"].lower().strip(): {
+                "risk_weight": int(row["risk_weight"]),
+                "common_drugs": [drug.strip() for drug in row["common_drugs"].split(",")] if row["common_drugs"] else []
+            }
+            for row in csv.DictReader(io.StringIO(raw.decode("utf-8")))
+        }
+
+        # Compiled once: every keyword found in a single pass over the input, plus the stem lookup table
+        self.keyword_matcher = KeywordMatcher(self.risk_map.keys())
+        self.stemmed_risk_map = load_stem_table(self.risk_map.keys(), digest, stems_path(risk_path))
+        self.risk_keywords = list(self.risk_map)
+
+        # Punctuation that never occurs in a keyword can't affect a match, so it is folded to spaces
+        keyword_punctuation = {ch for key in self.risk_map for ch in key if ch in string.punctuation}
+        self.fold_punctuation = str.maketrans({ch: " " for ch in string.punctuation if ch not in keyword_punctuation})
+
+        # === Verified Drugs Data (shared registry) ===
+        self.drug_registry = registry
+        self.verified_drugs = registry.drugs
+
+        # Lookup structures built once instead of rescanning verified_drugs per request
+        self.ingredient_index = registry.ingredient_index
+        self.verified_ingredients = set(self.ingredient_index.ingredients)
+        self.product_names = {drug["product_name"].lower(): drug for drug in self.verified_drugs}
+
+        # Fingerprint of the risk map and registry; results cached under another one are never served
+        registry_digest = registry.digest.hex()[:16] if registry.digest else str(id(registry))
+        self.generation = (digest[:16], registry_digest)
+
+
+risk_data = RiskData(RISK_DATA_PATH, get_registry())
+
+
+def reload_risk_data(registry=None) -> RiskData:
+    """Rebuild the risk data from disk (and the current registry) and swap it in."""
+    global risk_data
+    data = RiskData(RISK_DATA_PATH, registry or get_registry())
+    risk_data = data  # entries cached under the old generation are no longer served and age out
+    return data
+
+
+on_registry_reload(reload_risk_data)
+
+
+def __getattr__(name):
+    # Module-level views of the current risk data (ml.risk_map, ml.verified_drugs, ...)
+    if name in _RISK_DATA_ATTRIBUTES:
+        return getattr(risk_data, name)
+    if name == "data_generation":
+        return risk_data.generation
+    if name == "stemmer":
+        return get_stemmer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_RISK_DATA_ATTRIBUTES = {
+    "risk_map", "keyword_matcher", "stemmed_risk_map", "risk_keywords", "drug_registry",
+    "verified_drugs", "ingredient_index", "verified_ingredients", "product_names",
 }
 
-# === Load Verified Drugs Data ===
-with open(VERIFIED_DRUGS_PATH, "r", encoding="utf-8") as file:
-    verified_drugs = json.load(file)
 
-# Flatten a set of all verified ingredient names (normalized for comparison)
-verified_ingredients = set()
-for drug in verified_drugs:
-    ingredients = drug.get("ingredients") or drug.get("i ngredients")  # fallback for typo
-    if ingredients:
-        verified_ingredients.update(ing.strip().lower() for ing in ingredients)
+def close_keywords(queries: list, n: int, cutoff: float, data: RiskData = None) -> list:
+    """
+    difflib.get_close_matches(query, risk_keywords, n, cutoff) for every query, with RapidFuzz
+    doing the heavy lifting. Its Indel ratio is never below difflib's ratio (difflib counts a
+    greedy subset of the longest common subsequence), so one cdist over all queries with
+    score_cutoff drops only keywords difflib would reject too; difflib then ranks the few
+    survivors exactly as before.
+    """
+    if not queries:
+        return []
+    risk_keywords = (data or risk_data).risk_keywords
+    scores = process.cdist(queries, risk_keywords, scorer=fuzz.ratio, score_cutoff=cutoff * 100)
+    results = []
+    for query, row in zip(queries, scores):
+        candidates = [risk_keywords[i] for i in row.nonzero()[0]]
+        results.append(get_close_matches(query, candidates, n=n, cutoff=cutoff) if candidates else [])
+    return results
+
+# === Result Cache ===
+# calculate_risk results keyed on the normalized input and the generation of the data they came from
+
+RISK_CACHE_SIZE = int(os.getenv("RISK_CACHE_SIZE", "4096"))
+RISK_CACHE_TTL = float(os.getenv("RISK_CACHE_TTL", "3600"))
+risk_cache = TTLCache(max_entries=RISK_CACHE_SIZE, ttl=RISK_CACHE_TTL)
+
+
+def normalize_input(user_input: str, data: RiskData = None) -> str:
+    """Lowercase, fold punctuation and collapse whitespace: "Fever,  HEADACHE!" -> "fever headache"."""
+    return " ".join(user_input.lower().translate((data or risk_data).fold_punctuation).split())
+
 
 # === Core Functions ===
 
-def extract_keywords(user_input: str, cutoff=0.7):
+def extract_keywords(user_input: str, cutoff=0.7, data: RiskData = None):
     """Extract symptom keywords using exact, fuzzy, and stemmed matches."""
+    data = data or risk_data
     user_input_lower = user_input.lower()
-    matched = set()
-
-    # Stemmed keyword map for better matching
-    stemmed_risk_map = {stemmer.stem(k): k for k in risk_map.keys()}
 
     # Step 1: Exact substring match
-    for symptom in risk_map.keys():
-        if symptom in user_input_lower:
-            matched.add(symptom)
+    matched = data.keyword_matcher.find_all(user_input_lower)
 
     # Step 2: Fuzzy match full input
     if not matched:
-        close_matches = get_close_matches(user_input_lower, risk_map.keys(), n=3, cutoff=0.6)
+        close_matches = close_keywords([user_input_lower], n=3, cutoff=0.6, data=data)[0]
         matched.update(close_matches)
 
-    # Step 3: Word-by-word fuzzy + stem match
+    # Step 3: Word-by-word fuzzy + stem match (all words scored in one call)
     if not matched:
         words = re.findall(r'\b\w+\b', user_input_lower)
-        for word in words:
-            stemmed_word = stemmer.stem(word)
-
+        for word, close in zip(words, close_keywords(words, n=1, cutoff=cutoff, data=data)):
             # Fuzzy match against original keywords
-            close = get_close_matches(word, risk_map.keys(), n=1, cutoff=cutoff)
             if close:
                 matched.add(close[0])
                 continue
 
             # Match against stemmed keys
-            if stemmed_word in stemmed_risk_map:
-                matched.add(stemmed_risk_map[stemmed_word])
+            stemmed_word = stem_word(word)
+            if stemmed_word in data.stemmed_risk_map:
+                matched.add(data.stemmed_risk_map[stemmed_word])
 
     return list(matched)
 
 
 
-def verify_drug_suggestions(drug_names):
+def verify_drug_suggestions(drug_names, data: RiskData = None):
     """Cross-reference recommended drugs with verified product names or ingredients."""
+    data = data or risk_data
     verified_suggestions = []
-    product_names = {drug["product_name"].lower(): drug for drug in verified_drugs}
 
     for drug_name in drug_names:
         normalized = drug_name.lower().strip()
 
         # Check if drug_name matches a product name exactly
-        if normalized in product_names:
-            verified_suggestions.append(product_names[normalized]["product_name"])
+        if normalized in data.product_names:
+            verified_suggestions.append(data.product_names[normalized]["product_name"])
             continue
 
         # Else check if it matches any ingredient substring
-        if any(normalized in ing for ing in verified_ingredients):
+        if data.ingredient_index.has_ingredient_containing(normalized):
             verified_suggestions.append(drug_name)
 
     return verified_suggestions
 
 
 def calculate_risk(user_input: str):
-    """Compute hybrid risk score (out of 100) and suggest drugs based on matched symptoms."""
-    matched_keywords = extract_keywords(user_input)
+    """
+    Compute hybrid risk score (out of 100) and suggest drugs based on matched symptoms.
+    Results are memoized per normalized input; callers must not modify them.
+    """
+    data = risk_data  # one snapshot for the whole request, even if a reload swaps it meanwhile
+    normalized = normalize_input(user_input, data)
+    key = (data.generation, normalized)
+    result = risk_cache.get(key)
+    if result is None:
+        result = _calculate_risk(normalized, data)
+        risk_cache.set(key, result)
+    return result
+
+
+def _calculate_risk(user_input: str, data: RiskData):
+    risk_map = data.risk_map
+    matched_keywords = extract_keywords(user_input, data=data)
 
     if not matched_keywords:
         return {
@@ -147,14 +290,11 @@ def calculate_risk(user_input: str):
             suggested_drugs.update(risk_map[key].get("common_drugs", []))
 
     # Match ingredients from verified drugs
-    for drug in verified_drugs:
-        ingredients = drug.get("ingredients", [])
-        for ing in ingredients:
-            if any(word in ing.lower() for word in matched_keywords):
-                suggested_drugs.add(drug["product_name"])
+    for key in matched_keywords:
+        suggested_drugs.update(data.ingredient_index.products_containing(key))
 
     # Final verification of drug suggestions
-    verified_recommendations = verify_drug_suggestions(suggested_drugs)
+    verified_recommendations = verify_drug_suggestions(suggested_drugs, data)
 
     return {
         "risk_score": capped_risk,
@@ -163,3 +303,13 @@ def calculate_risk(user_input: str):
         "recommended_drugs": sorted(suggested_drugs),
         "verified_recommendations": sorted(verified_recommendations)
     }
+
+
+if __name__ == "__main__":
+    with open(RISK_DATA_PATH, "rb") as f:
+        source_digest = hashlib.sha256(f.read()).hexdigest()
+    path = stems_path(RISK_DATA_PATH)
+    if os.path.exists(path):
+        os.remove(path)
+    stems = load_stem_table(risk_data.risk_map.keys(), source_digest, path)
+    print(f"Wrote {len(stems)} stems to {path}")
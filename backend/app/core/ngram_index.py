@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def ngrams(text: str, n: int = 3):
+    """
+    Character n-grams of text, padded so short strings and word edges still produce grams.
+    """
+    if not text:
+        return []
+    padded = f"{' ' * (n - 1)}{text} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class NgramIndex:
+    """
+    Inverted index from character n-grams to the positions of the texts containing them.
+
+    Used to shortlist fuzzy-match candidates: texts sharing the most n-grams with the
+    query are returned first, so the expensive scorer only runs on a handful of them.
+    """
+
+    def __init__(self, texts, n: int = 3):
+        self.n = n
+        self.texts = list(texts)
+
+        postings = {}
+        for position, text in enumerate(self.texts):
+            for gram in set(ngrams(text, n)):
+                postings.setdefault(gram, []).append(position)
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def overlap_counts(self, query: str):
+        """
+        Number of n-grams each indexed text shares with query (one vectorized pass).
+
+        Very common n-grams (in more than a tenth of the texts) carry little signal and
+        dominate the cost, so they are skipped whenever the query has rarer ones to go on.
+        """
+        arrays = [self.postings[gram] for gram in set(ngrams(query, self.n)) if gram in self.postings]
+        if not arrays:
+            return None
+        selective = [a for a in arrays if len(a) * 10 <= len(self.texts)]
+        if len(selective) >= 2:
+            arrays = selective
+        return np.bincount(np.concatenate(arrays), minlength=len(self.texts))
+
+    def candidates(self, query: str, limit: int = 50):
+        """Positions of up to limit texts sharing the most n-grams with query, best first."""
+        counts = self.overlap_counts(query)
+        if counts is None:
+            return []
+
+        hits = np.flatnonzero(counts)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-counts[hits], limit - 1)[:limit]]
+        return hits[np.argsort(-counts[hits], kind="stable")].tolist()
+
+    def containing(self, query: str):
+        """Positions of indexed texts that contain query as a substring."""
+        if len(query) < self.n:
+            return [position for position, text in enumerate(self.texts) if query in text]
+
+        postings = [self.postings.get(query[i:i + self.n]) for i in range(len(query) - self.n + 1)]
+        if any(p is None for p in postings):
+            return []
+        # Every match appears in the rarest n-gram's postings; confirm each one with a real substring test
+        rarest = min(postings, key=len)
+        return [position for position in rarest.tolist() if query in self.texts[position]]
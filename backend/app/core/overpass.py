@@ -0,0 +1,126 @@
+"""
+Async client for the OpenStreetMap Overpass API.
+
+One pooled httpx.AsyncClient is shared by all requests. Each query goes to the first
+endpoint; if it fails, or has not answered within `hedge_delay`, the next mirror is
+queried in parallel and the first successful response wins.
+"""
+import asyncio
+import os
+import httpx
+
+OVERPASS_URLS = [
+    url.strip() for url in os.getenv(
+        "OVERPASS_URLS",
+        "https://overpass-api.de/api/interpreter,"
+        "https://overpass.kumi.systems/api/interpreter,"
+        "https://maps.mail.ru/osm/tools/overpass/api/interpreter"
+    ).split(",") if url.strip()
+]
+
+# Seconds to wait on an endpoint before also asking the next mirror
+OVERPASS_HEDGE_DELAY = float(os.getenv("OVERPASS_HEDGE_DELAY", "2.0"))
+# Server-side query timeout, and the client timeouts around it
+OVERPASS_QUERY_TIMEOUT = 25
+OVERPASS_TIMEOUT = httpx.Timeout(OVERPASS_QUERY_TIMEOUT + 5, connect=5.0)
+
+
+class OverpassError(Exception):
+    """Raised when no Overpass endpoint returned a usable response."""
+
+
+def amenities_query(lat: float, lng: float, radius: int, amenities) -> str:
+    """Single query for every element tagged with one of `amenities` within radius meters."""
+    pattern = "|".join(amenities)
+    return f"""
+    [out:json][timeout:{OVERPASS_QUERY_TIMEOUT}];
+    nwr["amenity"~"^({pattern})$"](around:{radius},{lat},{lng});
+    out center tags;
+    """
+
+
+def amenities_in_boxes_query(boxes, amenities) -> str:
+    """Single query for every element tagged with one of `amenities` inside any (south, west, north, east) box."""
+    pattern = "|".join(amenities)
+    selectors = "\n".join(
+        f'      nwr["amenity"~"^({pattern})$"]({south},{west},{north},{east});' for south, west, north, east in boxes
+    )
+    return f"""
+    [out:json][timeout:{OVERPASS_QUERY_TIMEOUT}];
+    (
+{selectors}
+    );
+    out center tags;
+    """
+
+
+class OverpassClient:
+    def __init__(self, urls=None, hedge_delay: float = OVERPASS_HEDGE_DELAY, timeout=OVERPASS_TIMEOUT, transport=None):
+        self.urls = list(urls or OVERPASS_URLS)
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.transport = transport  # e.g. httpx.ASGITransport around a fake server in tests
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={"User-Agent": "NexaHealth/1.0"},
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, url: str, query: str) -> dict:
+        response = await self.client.post(url, data={"data": query})
+        response.raise_for_status()
+        return response.json()
+
+    async def query(self, query: str) -> dict:
+        """Run an Overpass QL query, hedging across the configured endpoints."""
+        urls = iter(self.urls)
+        pending = set()
+        errors = []
+
+        def launch_next():
+            url = next(urls, None)
+            if url is not None:
+                pending.add(asyncio.create_task(self._post(url, query)))
+
+        launch_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+                # Nothing usable yet: an endpoint failed or is slow, so bring in the next mirror
+                launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise OverpassError(f"All Overpass endpoints failed: {'; '.join(repr(e) for e in errors)}")
+
+    async def amenities_around(self, lat: float, lng: float, radius: int, amenities) -> list:
+        """OSM elements for the given amenity types around (lat, lng)."""
+        data = await self.query(amenities_query(lat, lng, radius, amenities))
+        return data.get("elements", [])
+
+    async def amenities_in_boxes(self, boxes, amenities) -> list:
+        """OSM elements for the given amenity types inside any of the boxes, in one request."""
+        data = await self.query(amenities_in_boxes_query(boxes, amenities))
+        return data.get("elements", [])
+
+
+# Shared client (and connection pool) for the app
+overpass_client = OverpassClient()
@@ -0,0 +1,217 @@
+"""
+Offline index of pharmacies and hospitals for /get-nearby.
+
+Places are imported once from a local OSM extract (GeoJSON, or PBF when pyosmium is
+installed) or refreshed from Overpass, and saved as Overpass-style elements so the
+router shapes them exactly as it shapes live Overpass results. In memory the points
+are sorted by latitude: a radius query binary-searches the latitude band, filters the
+band by longitude and ranks the survivors with a vectorized haversine, which keeps
+lookups well under a millisecond for a country's worth of places.
+
+    python -m app.core.poi_index geojson path/to/extract.geojson
+    python -m app.core.poi_index pbf path/to/nigeria-latest.osm.pbf
+    python -m app.core.poi_index overpass SOUTH WEST NORTH EAST
+"""
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+from app.core.geo import METERS_PER_DEGREE_LAT, geohash_cell_size, haversine_m
+
+POI_INDEX_PATH = Path(os.getenv("POI_INDEX_PATH", Path(__file__).parent.parent / "data" / "poi_index.npz"))
+DEFAULT_AMENITIES = ("pharmacy", "hospital")
+
+# Upper bound for the k-nearest search radius (half the Earth's circumference)
+MAX_SEARCH_RADIUS_M = 20_000_000
+
+
+class PoiIndex:
+    def __init__(self, elements, shape=None):
+        """
+        `elements` are Overpass-style dicts with lat/lon and tags. `shape` turns one into the
+        record returned by queries (elements it maps to None are left out).
+        """
+        kept = []
+        for element in elements:
+            record = shape(element) if shape else element
+            if record is not None:
+                kept.append((element["lat"], element["lon"], element, record))
+        kept.sort(key=lambda item: item[0])
+
+        self.lats = np.array([item[0] for item in kept], dtype=np.float64)
+        self.lngs = np.array([item[1] for item in kept], dtype=np.float64)
+        self.elements = [item[2] for item in kept]
+        self.records = [item[3] for item in kept]
+
+    def __len__(self):
+        return len(self.records)
+
+    def within(self, lat: float, lng: float, radius: float, limit: int = None):
+        """(positions, distances in meters) of the places within radius, nearest first."""
+        dlat = radius / METERS_PER_DEGREE_LAT
+        start = np.searchsorted(self.lats, lat - dlat, side="left")
+        end = np.searchsorted(self.lats, lat + dlat, side="right")
+
+        dlng = radius / (METERS_PER_DEGREE_LAT * max(np.cos(np.radians(min(abs(lat) + dlat, 90.0))), 1e-6))
+        band = np.arange(start, end)
+        if dlng < 180:
+            band = band[np.abs(self.lngs[start:end] - lng) <= dlng]
+
+        distances = haversine_m(lat, lng, self.lats[band], self.lngs[band])
+        inside = distances <= radius
+        band, distances = band[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return band[order], distances[order]
+
+    def nearest(self, lat: float, lng: float, k: int):
+        """(positions, distances) of the k nearest places, widening the search radius until k are found."""
+        radius = 2000.0
+        while True:
+            positions, distances = self.within(lat, lng, radius, k)
+            if len(positions) >= min(k, len(self)) or radius >= MAX_SEARCH_RADIUS_M:
+                return positions, distances
+            radius *= 4
+
+    # === Persistence ===
+
+    def save(self, path: Path = POI_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(self.elements, separators=(",", ":")).encode("utf-8")
+        temp = path.with_name(path.name + ".tmp")
+        with open(temp, "wb") as f:
+            np.savez_compressed(f, lats=self.lats, lngs=self.lngs, elements=np.frombuffer(payload, dtype=np.uint8))
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path: Path = POI_INDEX_PATH, shape=None) -> "PoiIndex":
+        with np.load(path) as data:
+            elements = json.loads(data["elements"].tobytes().decode("utf-8"))
+        return cls(elements, shape)
+
+
+# === Import ===
+
+def point_element(lat: float, lng: float, tags: dict) -> dict:
+    return {"type": "node", "lat": float(lat), "lon": float(lng), "tags": tags}
+
+
+def elements_from_geojson(path, amenities=DEFAULT_AMENITIES) -> list:
+    """Points (or the centre of other geometries) of features tagged with one of `amenities`."""
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    elements = []
+    for feature in collection.get("features", []):
+        properties = feature.get("properties") or {}
+        # osmtogeojson nests OSM tags under "tags"; ogr2ogr and most exports flatten them
+        tags = properties.get("tags") if isinstance(properties.get("tags"), dict) else properties
+        if tags.get("amenity") not in amenities:
+            continue
+        coordinates = np.array(_flatten_coordinates((feature.get("geometry") or {}).get("coordinates")), dtype=np.float64)
+        if coordinates.size == 0:
+            continue
+        lng, lat = coordinates.reshape(-1, 2).mean(axis=0)
+        elements.append(point_element(lat, lng, {k: str(v) for k, v in tags.items() if v is not None}))
+    return elements
+
+
+def _flatten_coordinates(coordinates):
+    if not coordinates:
+        return []
+    if isinstance(coordinates[0], (int, float)):
+        return [coordinates[:2]]
+    return [pair for part in coordinates for pair in _flatten_coordinates(part)]
+
+
+def elements_from_pbf(path, amenities=DEFAULT_AMENITIES) -> list:
+    """Nodes and ways tagged with one of `amenities` from an OSM PBF extract (needs pyosmium)."""
+    try:
+        import osmium
+    except ImportError:
+        raise SystemExit("Reading PBF extracts needs pyosmium (pip install osmium), or convert the extract to GeoJSON.")
+
+    elements = []
+
+    class AmenityHandler(osmium.SimpleHandler):
+        def node(self, node):
+            if node.tags.get("amenity") in amenities and node.location.valid():
+                elements.append(point_element(node.location.lat, node.location.lon, dict(node.tags)))
+
+        def way(self, way):
+            if way.tags.get("amenity") in amenities:
+                points = [(n.lat, n.lon) for n in way.nodes if n.location.valid()]
+                if points:
+                    lat, lng = np.mean(points, axis=0)
+                    elements.append(point_element(lat, lng, dict(way.tags)))
+
+    AmenityHandler().apply_file(str(path), locations=True)
+    return elements
+
+
+def elements_from_overpass(south, west, north, east, amenities=DEFAULT_AMENITIES) -> list:
+    """Refresh from Overpass, one query per 1-degree tile of the box."""
+    from app.core.overpass import OverpassClient
+
+    async def fetch():
+        client = OverpassClient()
+        try:
+            elements = []
+            for tile_south in np.arange(south, north, 1.0):
+                for tile_west in np.arange(west, east, 1.0):
+                    box = (tile_south, tile_west, min(tile_south + 1, north), min(tile_west + 1, east))
+                    elements += await client.amenities_in_boxes([box], amenities)
+            return elements
+        finally:
+            await client.aclose()
+
+    elements = []
+    for element in asyncio.run(fetch()):
+        location = element.get("center") if element.get("type") in ("way", "relation") else element
+        if location and location.get("lat") is not None and location.get("lon") is not None:
+            elements.append(point_element(location["lat"], location["lon"], element.get("tags", {})))
+    return elements
+
+
+def dedupe(elements) -> list:
+    """Drop repeats of the same named place at (almost) the same spot, e.g. from overlapping tiles."""
+    cell_h, cell_w = geohash_cell_size(8)
+    seen = set()
+    unique = []
+    for element in elements:
+        key = (int(element["lat"] / cell_h), int(element["lon"] / cell_w),
+               element["tags"].get("amenity"), element["tags"].get("name"))
+        if key not in seen:
+            seen.add(key)
+            unique.append(element)
+    return unique
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.core.poi_index", description="Build the offline POI index for /get-nearby.")
+    parser.add_argument("--out", default=str(POI_INDEX_PATH), help="index file to write")
+    sources = parser.add_subparsers(dest="source", required=True)
+    sources.add_parser("geojson").add_argument("path")
+    sources.add_parser("pbf").add_argument("path")
+    overpass = sources.add_parser("overpass")
+    for name in ("south", "west", "north", "east"):
+        overpass.add_argument(name, type=float)
+    args = parser.parse_args(argv)
+
+    if args.source == "geojson":
+        elements = elements_from_geojson(args.path)
+    elif args.source == "pbf":
+        elements = elements_from_pbf(args.path)
+    else:
+        elements = elements_from_overpass(args.south, args.west, args.north, args.east)
+
+    index = PoiIndex(dedupe(elements))
+    index.save(args.out)
+    print(f"Wrote {len(index)} places to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
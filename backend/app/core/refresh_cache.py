@@ -0,0 +1,119 @@
+"""
+Freshness tracking for data that is rebuilt by an expensive async refresh (e.g. re-streaming
+the reports collection).
+
+Within `ttl` seconds of the last refresh the data is served as is. For a further
+`stale_ttl` seconds it is still served, but a refresh is started in the background
+(stale-while-revalidate). Past that, or before the first refresh, callers wait for one.
+Refreshes are single-flight: concurrent callers share the one in progress instead of
+each starting their own.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshCache:
+    def __init__(self, refresh, ttl: float, stale_ttl: float = 0.0):
+        """`refresh` is an async callable that rebuilds the data and raises on failure."""
+        self.refresh = refresh
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refreshed_at = None  # time.monotonic() when the last successful refresh started
+        self._inflight = None
+
+        # Metrics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.refresh_seconds = deque(maxlen=256)
+
+    @property
+    def age(self):
+        return None if self.refreshed_at is None else time.monotonic() - self.refreshed_at
+
+    async def ensure(self, current: bool = False):
+        """
+        Make sure the data is fresh enough to serve. `current` means the caller knows it is
+        up to date by other means (e.g. a live snapshot listener).
+        """
+        age = self.age
+        if current or (age is not None and age < self.ttl):
+            self.hits += 1
+        elif age is not None and age < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            if self._start() is not None:
+                self.background_refreshes += 1
+        else:
+            self.misses += 1
+            await asyncio.shield(self._start(join=True))
+
+    def invalidate(self):
+        self.refreshed_at = None
+
+    def _start(self, join: bool = False):
+        """
+        The refresh task for the running loop, starting one if none is in flight. With
+        join=False an existing refresh is left alone and None is returned.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._inflight
+        # A task from another (e.g. already closed) event loop can never be awaited here
+        if task is not None and not task.done() and task.get_loop() is loop:
+            if not join:
+                return None
+            self.coalesced += 1
+            return task
+        task = self._inflight = loop.create_task(self._run())
+        task.add_done_callback(self._done)
+        return task
+
+    async def _run(self):
+        started = time.monotonic()
+        self.refreshes += 1
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(getattr(e, "detail", e))
+            raise
+        self.refreshed_at = started  # data is as old as the moment the read began
+        self.refresh_seconds.append(time.monotonic() - started)
+
+    def _done(self, task):
+        if self._inflight is task:
+            self._inflight = None
+        # Background refreshes have no awaiting caller; log their failures here
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh failed: %s", self.last_error)
+
+    def stats(self) -> dict:
+        durations = sorted(self.refresh_seconds)
+        lookups = self.hits + self.stale_hits + self.misses
+        age = self.age
+        return {
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "coalesced_waits": self.coalesced,
+            "failed_refreshes": self.failures,
+            "last_error": self.last_error,
+            "refresh_ms": {
+                "p50": round(durations[len(durations) // 2] * 1000, 2) if durations else None,
+                "max": round(durations[-1] * 1000, 2) if durations else None,
+            },
+        }
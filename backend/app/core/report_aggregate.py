@@ -0,0 +1,393 @@
+import hashlib
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from app.core.geo import geohash_bbox, geohash_encode
+from app.core.report_trends import ReportTrends
+
+logger = logging.getLogger(__name__)
+
+# A pharmacy is flagged once it has this many reports
+FLAG_THRESHOLD = 3
+
+# Geohash precisions kept for the map heatmap (~156 km down to ~1.2 km cells)
+HEATMAP_PRECISIONS = (3, 4, 5, 6)
+
+# Report digests are summed modulo this, so the total does not depend on insertion order
+DIGEST_MODULUS = 1 << 128
+
+
+def feed_key(doc_id: str, report: dict) -> tuple:
+    """(timestamp, doc_id) that orders the report feed; the same in every process."""
+    timestamp = report.get("timestamp") or ""
+    if not isinstance(timestamp, str):
+        timestamp = timestamp.isoformat()
+    return timestamp, doc_id
+
+
+def report_digest(doc_id: str, report: dict) -> int:
+    body = json.dumps([doc_id, report], sort_keys=True, separators=(",", ":"), default=str)
+    return int.from_bytes(hashlib.blake2b(body.encode("utf-8"), digest_size=16).digest(), "big")
+
+
+class PharmacyStats:
+    """Running totals for one pharmacy (keyed by its lowercased name)."""
+
+    __slots__ = ("pharmacy", "state", "lga", "street_address", "report_count", "drugs", "doc_ids")
+
+    def __init__(self, report: dict):
+        self.pharmacy = (report.get("pharmacy_name") or "").strip()
+        self.state = report.get("state")
+        self.lga = report.get("lga")
+        self.street_address = report.get("street_address")
+        self.report_count = 0
+        self.drugs = Counter()
+        self.doc_ids = {}  # this pharmacy's reports, in insertion order
+
+    def to_flagged(self) -> dict:
+        return {
+            "pharmacy": self.pharmacy,
+            "state": self.state,
+            "lga": self.lga,
+            "street_address": self.street_address,
+            "report_count": self.report_count,
+            "drugs": list(self.drugs),
+        }
+
+
+class ReportAggregate:
+    """
+    Materialized per-pharmacy view of the reports collection, updated one report at a time.
+
+    Reports are keyed by document id, so re-applying a report (from the write path and
+    again from a snapshot listener) is idempotent, and an unchanged one is not even a new
+    version. Every change bumps `version`. Readers get the flagged list and summary at
+    most once per version, re-rendering only the pharmacies that changed, and the full
+    report list is only built when it is read.
+
+    `digest` is a hash of every (doc_id, report) pair, kept as a running sum, so any
+    process holding the same reports has the same digest; response ETags are built from
+    it rather than from the process-local version. The report feed is ordered by
+    (timestamp, doc_id), which is just as stable, and its cursor is the last such key.
+
+    Report counts per state, per (state, LGA) and per geohash cell are kept alongside,
+    so the map heatmap never has to walk the reports, as are rolling 24h/7d/30d counts
+    (see app.core.report_trends).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reports = {}
+        self.digests = {}
+        self.digest_sum = 0
+        self._order = []  # sorted feed keys, rebuilt lazily after a reset
+        self.pharmacies = {}
+        self.drug_counts = Counter()
+        self.state_counts = Counter()
+        self.lga_counts = Counter()
+        self.cell_counts = {precision: Counter() for precision in HEATMAP_PRECISIONS}
+        self.trends = ReportTrends()
+        self.version = 0
+        self.loaded = False  # holds a full copy of the collection
+        self._live = False  # a snapshot listener has delivered the collection
+        self._flagged = {}  # pharmacy key -> to_flagged() of each flagged pharmacy
+        self._dirty = set()  # pharmacies changed since _flagged was brought up to date
+        self._flagged_list = []
+        self._snapshot = None
+        self._report_list = None
+        self._heatmaps = {}
+        self._watch = None
+
+    # === Updates ===
+
+    def upsert(self, doc_id: str, report: dict):
+        digest = report_digest(doc_id, report)
+        with self.lock:
+            if doc_id in self.reports:
+                if self.digests[doc_id] == digest:
+                    return  # e.g. the listener echoing a write already applied
+                self._remove(doc_id)
+            self._add(doc_id, report, digest)
+            self.version += 1
+
+    def remove(self, doc_id: str):
+        with self.lock:
+            if doc_id in self.reports:
+                self._remove(doc_id)
+                self.version += 1
+
+    def reset(self, items):
+        """Replace the contents with (doc_id, report) pairs from a full read of the collection."""
+        with self.lock:
+            self.reports = {}
+            self.digests = {}
+            self.digest_sum = 0
+            self._order = None
+            self._flagged = None
+            self._dirty = set()
+            self.pharmacies = {}
+            self.drug_counts = Counter()
+            self.state_counts = Counter()
+            self.lga_counts = Counter()
+            self.cell_counts = {precision: Counter() for precision in HEATMAP_PRECISIONS}
+            self.trends = ReportTrends(clock=self.trends.clock)
+            for doc_id, report in items:
+                if report:
+                    self._add(doc_id, report)
+            self.loaded = True
+            self.version += 1
+
+    def apply_changes(self, changes):
+        """Apply Firestore DocumentChange objects (ADDED / MODIFIED / REMOVED)."""
+        with self.lock:
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    self.remove(change.document.id)
+                else:
+                    report = change.document.to_dict()
+                    if report:
+                        self.upsert(change.document.id, report)
+
+    def _add(self, doc_id: str, report: dict, digest: int = None):
+        self.reports[doc_id] = report
+        if digest is None:
+            digest = report_digest(doc_id, report)
+        self.digests[doc_id] = digest
+        self.digest_sum = (self.digest_sum + digest) % DIGEST_MODULUS
+        if self._order is not None:
+            insort(self._order, feed_key(doc_id, report))
+
+        drug = report.get("drug_name")
+        if drug:
+            self.drug_counts[drug.lower()] += 1
+        for counter, key in self._heatmap_keys(report):
+            counter[key] += 1
+        self.trends.add(report)
+
+        key = (report.get("pharmacy_name") or "").strip().lower()
+        if not key:
+            return
+        self._dirty.add(key)
+        stats = self.pharmacies.get(key)
+        if stats is None:
+            stats = self.pharmacies[key] = PharmacyStats(report)
+        stats.report_count += 1
+        stats.doc_ids[doc_id] = None
+        if drug:
+            stats.drugs[drug] += 1
+
+    def _remove(self, doc_id: str):
+        report = self.reports.pop(doc_id)
+        self.digest_sum = (self.digest_sum - self.digests.pop(doc_id)) % DIGEST_MODULUS
+        if self._order is not None:
+            del self._order[bisect_left(self._order, feed_key(doc_id, report))]
+
+        drug = report.get("drug_name")
+        if drug:
+            self.drug_counts[drug.lower()] -= 1
+            if self.drug_counts[drug.lower()] <= 0:
+                del self.drug_counts[drug.lower()]
+        for counter, key in self._heatmap_keys(report):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        self.trends.remove(report)
+
+        key = (report.get("pharmacy_name") or "").strip().lower()
+        stats = self.pharmacies.get(key)
+        if stats is None:
+            return
+        self._dirty.add(key)
+        stats.report_count -= 1
+        stats.doc_ids.pop(doc_id, None)
+        if drug:
+            stats.drugs[drug] -= 1
+            if stats.drugs[drug] <= 0:
+                del stats.drugs[drug]
+        if stats.report_count <= 0:
+            del self.pharmacies[key]
+
+    def _heatmap_keys(self, report: dict):
+        """(counter, key) pairs a report counts towards in the heatmap."""
+        state = (report.get("state") or "").strip().lower()
+        if state:
+            yield self.state_counts, state
+            lga = (report.get("lga") or "").strip().lower()
+            if lga:
+                yield self.lga_counts, (state, lga)
+
+        lat, lng = report.get("latitude"), report.get("longitude")
+        if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+            return
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return
+        # Coarser cells are prefixes of the finest one
+        cell = geohash_encode(lat, lng, max(HEATMAP_PRECISIONS))
+        for precision in HEATMAP_PRECISIONS:
+            yield self.cell_counts[precision], cell[:precision]
+
+    # === Listener ===
+
+    def attach(self, collection):
+        """
+        Follow the collection with on_snapshot. The first callback delivers every existing
+        document, after which the aggregate is complete and marked live.
+        """
+        def on_snapshot(docs, changes, read_time):
+            with self.lock:
+                try:
+                    self.apply_changes(changes)
+                except Exception:
+                    # Missed changes: fall back to re-reading the collection
+                    logger.exception("Could not apply report changes from the listener")
+                    self._live = False
+                    raise
+                self.loaded = True
+                self._live = True
+
+        self._watch = collection.on_snapshot(on_snapshot)
+        return self._watch
+
+    def detach(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        self._live = False
+
+    @property
+    def live(self) -> bool:
+        """
+        Whether a snapshot listener keeps the aggregate current. The client library has no
+        error callback: a listener whose stream failed for good just stops being active.
+        """
+        if self._live and not getattr(self._watch, "is_active", True):
+            logger.warning("Report listener stopped; re-reading the collection instead")
+            self._live = False
+        return self._live
+
+    # === Reads ===
+
+    @property
+    def digest(self) -> str:
+        """Hex digest of the current reports, equal in every process that holds the same ones."""
+        return f"{self.digest_sum:032x}"
+
+    def snapshot(self):
+        """(flagged, summary, reports) for the current version."""
+        with self.lock:
+            return (*self._materialize()[2:4], self.report_list()[1])
+
+    def versioned_snapshot(self):
+        """(digest, flagged, summary), taken atomically."""
+        return self._materialize()[1:4]
+
+    def report_list(self):
+        """(digest, every report in feed order), built on the first read after a change."""
+        with self.lock:
+            if self._report_list is None or self._report_list[0] != self.version:
+                reports = [self.reports[doc_id] for _, doc_id in self._feed_order()]
+                self._report_list = (self.version, self.digest, reports)
+            return self._report_list[1:]
+
+    def _feed_order(self) -> list:
+        if self._order is None:
+            self._order = sorted(feed_key(doc_id, report) for doc_id, report in self.reports.items())
+        return self._order
+
+    def feed(self, cursor: tuple = None, limit: int = 100):
+        """
+        Reports after the (timestamp, doc_id) `cursor`, oldest first: (reports, next_cursor, has_more).
+        New reports are timestamped when submitted, so polling with next_cursor picks them up.
+        """
+        with self.lock:
+            order = self._feed_order()
+            start = bisect_right(order, cursor) if cursor else 0
+            keys = order[start:start + limit]
+            next_cursor = keys[-1] if keys else cursor
+            return [self.reports[doc_id] for _, doc_id in keys], next_cursor, start + len(keys) < len(order)
+
+    def pharmacy_reports(self, pharmacy: str) -> list:
+        """(doc_id, report) pairs for one pharmacy, matched on its lowercased name."""
+        with self.lock:
+            stats = self.pharmacies.get(pharmacy.strip().lower())
+            return [(doc_id, self.reports[doc_id]) for doc_id in stats.doc_ids] if stats else []
+
+    def heatmap(self, level: str, precision: int = None):
+        """
+        (version, bins) for the map: report counts per state, per LGA or per geohash cell at
+        `precision`. Built from the maintained counters at most once per version.
+        """
+        with self.lock:
+            key = (level, precision)
+            cached = self._heatmaps.get(key)
+            if cached is not None and cached[0] == self.version:
+                return cached
+
+            if level == "state":
+                flagged = Counter(
+                    (stats.state or "").strip().lower()
+                    for stats in self.pharmacies.values() if stats.report_count >= FLAG_THRESHOLD
+                )
+                bins = [
+                    {"state": state, "reports": count, "flagged_pharmacies": flagged[state]}
+                    for state, count in self.state_counts.most_common()
+                ]
+            elif level == "lga":
+                bins = [
+                    {"state": state, "lga": lga, "reports": count}
+                    for (state, lga), count in self.lga_counts.most_common()
+                ]
+            else:
+                bins = []
+                for cell, count in self.cell_counts[precision].most_common():
+                    south, west, north, east = geohash_bbox(cell)
+                    bins.append({
+                        "geohash": cell,
+                        "lat": round((south + north) / 2, 6),
+                        "lng": round((west + east) / 2, 6),
+                        "reports": count,
+                    })
+
+            self._heatmaps[key] = (self.version, bins)
+            return self._heatmaps[key]
+
+    def _flagged_pharmacies(self) -> list:
+        """The flagged list, re-rendering only pharmacies touched since the last call."""
+        if self._flagged is None:  # after a reset
+            self._flagged = {
+                key: stats.to_flagged()
+                for key, stats in self.pharmacies.items() if stats.report_count >= FLAG_THRESHOLD
+            }
+            self._dirty.clear()
+            self._flagged_list = None
+        for key in self._dirty:
+            stats = self.pharmacies.get(key)
+            if stats is not None and stats.report_count >= FLAG_THRESHOLD:
+                self._flagged[key] = stats.to_flagged()
+                self._flagged_list = None
+            elif self._flagged.pop(key, None) is not None:
+                self._flagged_list = None
+        self._dirty.clear()
+        if self._flagged_list is None:
+            self._flagged_list = list(self._flagged.values())
+        return self._flagged_list
+
+    def _materialize(self):
+        with self.lock:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                flagged = self._flagged_pharmacies()
+                summary = {
+                    "total_flagged_pharmacies": len(flagged),
+                    "total_reports": len(self.reports),
+                    "top_drugs": [
+                        {"drug_name": drug, "count": count} for drug, count in self.drug_counts.most_common(5)
+                    ],
+                }
+                self._snapshot = (self.version, self.digest, flagged, summary)
+            return self._snapshot
+
+
+# Process-wide aggregate behind the map endpoints
+report_aggregate = ReportAggregate()
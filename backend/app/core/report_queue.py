@@ -0,0 +1,293 @@
+"""
+Write-behind ingestion for submitted reports.
+
+A report is appended to a local SQLite log (WAL mode) and acknowledged as soon as that
+transaction commits. A background flusher then group-commits the oldest pending reports
+to Firestore in WriteBatches of up to 500, retrying with exponential backoff, and only
+deletes them from the log once Firestore has accepted the batch. Document ids are
+assigned at enqueue time, so a retried batch overwrites rather than duplicates.
+
+Several server processes may share the log: a flusher claims the rows it is about to
+commit with a lease, so other processes skip them until it has finished (or died and the
+lease has run out). A batch that keeps failing is retried one report at a time, and a
+report that still fails on its own is moved to a dead-letter table instead of blocking
+everything queued behind it.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+
+# Firestore's limit on writes per batch
+MAX_BATCH_SIZE = 500
+
+# Kept with the backend's data, not wherever the server was started from
+REPORT_QUEUE_PATH = os.getenv("REPORT_QUEUE_PATH", str(Path(__file__).parent.parent / "data" / "report_queue.sqlite3"))
+REPORT_QUEUE_MAX_DEPTH = int(os.getenv("REPORT_QUEUE_MAX_DEPTH", "20000"))
+# Failed commits before a report is retried alone, and dead-lettered if it fails alone too
+REPORT_QUEUE_MAX_ATTEMPTS = int(os.getenv("REPORT_QUEUE_MAX_ATTEMPTS", "8"))
+# Seconds a claimed batch stays reserved for the process committing it
+CLAIM_LEASE_SECONDS = 120.0
+
+
+class ReportQueueFull(Exception):
+    """Raised by enqueue when the pending backlog has reached max_depth."""
+
+
+class ReportQueue:
+    def __init__(self, path: str, commit, batch_size: int = MAX_BATCH_SIZE, max_depth: int = REPORT_QUEUE_MAX_DEPTH,
+                 linger: float = 0.05, max_retry_delay: float = 30.0, max_attempts: int = REPORT_QUEUE_MAX_ATTEMPTS):
+        """
+        `commit` writes a list of (doc_id, report) pairs to Firestore as one batch and raises on failure.
+        `linger` is how long the flusher waits for a partial batch to fill up.
+        """
+        self.path = path
+        self.commit = commit
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.max_depth = max_depth
+        self.linger = linger
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"  # claims rows in a log shared between processes
+
+        self.lock = threading.Lock()  # guards the SQLite connection
+        self.flush_lock = threading.Lock()  # one batch in flight at a time
+        self._open_lock = threading.Lock()
+        self._conn = None
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self.retry_delay = 0.0
+
+        # Metrics
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+        self.last_error = None
+        self.flush_seconds = deque(maxlen=256)
+
+    # === Log ===
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app never touches the disk
+        if self._conn is None:
+            with self._open_lock:
+                if self._conn is None:
+                    self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT NOT NULL, data TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, "
+            "claimed_by TEXT, claimed_until REAL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pending)")}
+        for column, kind in (("claimed_by", "TEXT"), ("claimed_until", "REAL")):
+            if column not in columns:  # a log written before claims existed
+                conn.execute(f"ALTER TABLE pending ADD COLUMN {column} {kind}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            "seq INTEGER PRIMARY KEY, doc_id TEXT NOT NULL, data TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL, created REAL NOT NULL, failed REAL NOT NULL, error TEXT)"
+        )
+        return conn
+
+    def _count(self, table: str = "pending") -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    @property
+    def depth(self) -> int:
+        """Reports logged but not yet written to Firestore, by every process sharing the log."""
+        with self.lock:
+            return self._count()
+
+    def enqueue(self, report: dict) -> str:
+        """Durably log a report and return the Firestore document id it will be written under."""
+        with self.lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                depth = self._count()
+                if depth >= self.max_depth:
+                    self.rejected += 1
+                    raise ReportQueueFull(f"{depth} reports are waiting to be written.")
+                doc_id = uuid.uuid4().hex[:20]
+                conn.execute(
+                    "INSERT INTO pending (doc_id, data, created) VALUES (?, ?, ?)",
+                    (doc_id, json.dumps(report), time.time()),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.enqueued += 1
+
+        self.start()
+        self._wakeup.set()
+        return doc_id
+
+    # === Flushing ===
+
+    def _claim(self) -> list:
+        """Reserve the oldest unclaimed reports for this process; a report that keeps failing is claimed alone."""
+        now = time.time()
+        with self.lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT seq, doc_id, data, attempts FROM pending "
+                    "WHERE claimed_until IS NULL OR claimed_until < ? ORDER BY seq LIMIT ?",
+                    (now, self.batch_size),
+                ).fetchall()
+                if rows and rows[0][3] >= self.max_attempts:
+                    rows = rows[:1]  # isolates the report that makes its batches fail
+                conn.executemany(
+                    "UPDATE pending SET claimed_by = ?, claimed_until = ? WHERE seq = ?",
+                    [(self.owner, now + CLAIM_LEASE_SECONDS, row[0]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def flush_batch(self) -> int:
+        """Commit the oldest pending reports as one batch; returns how many were written."""
+        with self.flush_lock:
+            rows = self._claim()
+            if not rows:
+                return 0
+            seqs = [(row[0],) for row in rows]
+
+            start = time.perf_counter()
+            try:
+                self.commit([(doc_id, json.loads(data)) for _, doc_id, data, _ in rows])
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                with self.lock:
+                    if len(rows) == 1 and rows[0][3] >= self.max_attempts:
+                        self._dead_letter(rows[0], str(e))
+                    else:
+                        self.conn.executemany(
+                            "UPDATE pending SET attempts = attempts + 1, claimed_by = NULL, claimed_until = NULL "
+                            "WHERE seq = ?", seqs,
+                        )
+                raise
+            self.flush_seconds.append(time.perf_counter() - start)
+
+            with self.lock:
+                self.conn.executemany("DELETE FROM pending WHERE seq = ?", seqs)
+            self.flushed += len(rows)
+            self.batches += 1
+            return len(rows)
+
+    def _dead_letter(self, row, error: str):
+        seq, doc_id, data, attempts = row
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO dead_letter (seq, doc_id, data, attempts, created, failed, error) "
+                "SELECT seq, doc_id, data, attempts + 1, created, ?, ? FROM pending WHERE seq = ?",
+                (time.time(), error, seq),
+            )
+            conn.execute("DELETE FROM pending WHERE seq = ?", (seq,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.dead_lettered += 1
+
+    def drain(self, timeout: float = 10.0) -> int:
+        """Flush until the log is empty or `timeout` seconds have passed; returns reports still pending."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if not self.flush_batch():
+                    break  # empty, or what is left is claimed by another process
+            except Exception:
+                time.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+        return self.depth
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.depth:
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+            if self.depth < self.batch_size:
+                self._stop.wait(self.linger)  # let a group commit build up
+            try:
+                if not self.flush_batch():
+                    # Everything pending is claimed by another process
+                    self._wakeup.wait(1.0)
+                    self._wakeup.clear()
+                self.retry_delay = 0.0
+            except Exception:
+                self.retry_delay = min(self.max_retry_delay, max(0.5, self.retry_delay * 2))
+                self._stop.wait(self.retry_delay)
+
+    def start(self):
+        """Start the background flusher (also picks up reports left in the log by a previous run)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self.lock:
+            self.conn
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="report-queue-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher and try to write out what is left; anything unflushed stays in the log."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._conn is not None:
+            self.drain(timeout)
+
+    # === Metrics ===
+
+    def stats(self) -> dict:
+        durations = sorted(self.flush_seconds)
+
+        def pct(p):
+            return round(durations[min(len(durations) - 1, int(len(durations) * p / 100))] * 1000, 2) if durations else None
+
+        with self.lock:
+            dead_letters = self._count("dead_letter")
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed_flushes": self.failures,
+            "rejected": self.rejected,
+            "dead_letters": dead_letters,
+            "retry_delay_seconds": self.retry_delay,
+            "last_error": self.last_error,
+            "flush_ms": {"p50": pct(50), "p95": pct(95), "max": pct(100)},
+        }
@@ -0,0 +1,198 @@
+"""
+Rolling-window report counts per drug, pharmacy, state and LGA, with surge detection.
+
+Reports are counted in hourly buckets. For every span of hours a window (or a window
+plus its baseline) covers, a running total per key is kept: adding or removing a report
+touches one bucket and the totals it falls in, and when the clock moves on, only the
+buckets that slide out of a span are subtracted. Each report is therefore counted and
+expired once, never rescanned.
+
+A key is surging in a window when it has at least SURGE_MIN_REPORTS reports there and
+at least SURGE_FACTOR times what its rate over the preceding baseline period predicts.
+"""
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+HOUR = 3600
+
+# name -> (window hours, baseline hours immediately before the window)
+WINDOWS = {
+    "24h": (24, 7 * 24),
+    "7d": (7 * 24, 28 * 24),
+    "30d": (30 * 24, 90 * 24),
+}
+DIMENSIONS = ("drug", "pharmacy", "state", "lga")
+
+SURGE_FACTOR = float(os.getenv("SURGE_FACTOR", "3.0"))
+SURGE_MIN_REPORTS = int(os.getenv("SURGE_MIN_REPORTS", "3"))
+
+
+def report_hour(report: dict):
+    """Hour index (hours since the epoch, UTC) of a report's timestamp, or None if it has none."""
+    timestamp = report.get("timestamp")
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(timestamp, datetime):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)  # reports store naive UTC
+    return int(timestamp.timestamp() // HOUR)
+
+
+def report_keys(report: dict):
+    """(dimension, key) pairs a report counts towards."""
+    drug = (report.get("drug_name") or "").strip().lower()
+    if drug:
+        yield "drug", drug
+    pharmacy = (report.get("pharmacy_name") or "").strip().lower()
+    if pharmacy:
+        yield "pharmacy", pharmacy
+    state = (report.get("state") or "").strip().lower()
+    if state:
+        yield "state", state
+        lga = (report.get("lga") or "").strip().lower()
+        if lga:
+            yield "lga", (state, lga)
+
+
+class RollingCounter:
+    """Per-key counts over several trailing spans of hours, maintained incrementally."""
+
+    def __init__(self, spans, now_hour: int):
+        self.spans = sorted(set(spans))
+        self.horizon = self.spans[-1]
+        self.now_hour = now_hour
+        self.buckets = defaultdict(Counter)  # hour -> key -> count
+        self.totals = {span: Counter() for span in self.spans}  # span -> key -> count in the last `span` hours
+        # Reports dated after the clock are counted in the then-current hour; (key, report hour) ->
+        # bucket hour -> count remembers where, so removing one later finds the same bucket
+        self.clamped = defaultdict(Counter)
+
+    def advance(self, now_hour: int):
+        """Move the clock forward, expiring buckets that slide out of each span."""
+        if now_hour <= self.now_hour:
+            return
+        for span in self.spans:
+            totals = self.totals[span]
+            # Hours in (old_now - span, new_now - span] have just left this span
+            for hour in range(self.now_hour - span + 1, now_hour - span + 1):
+                for key, count in self.buckets.get(hour, {}).items():
+                    totals[key] -= count
+                    if totals[key] <= 0:
+                        del totals[key]
+        for hour in [hour for hour in self.buckets if hour <= now_hour - self.horizon]:
+            del self.buckets[hour]
+        for placed_key, placed in list(self.clamped.items()):
+            for hour in [hour for hour in placed if hour <= now_hour - self.horizon]:
+                del placed[hour]
+            if not placed:
+                del self.clamped[placed_key]
+        self.now_hour = now_hour
+
+    def add(self, key, hour: int):
+        if hour > self.now_hour:
+            # Clock skew: a report from the future counts as now
+            self.clamped[(key, hour)][self.now_hour] += 1
+            hour = self.now_hour
+        self._apply(key, hour, 1)
+
+    def remove(self, key, hour: int):
+        placed = self.clamped.get((key, hour))
+        if placed:
+            bucket_hour = max(placed)
+            placed[bucket_hour] -= 1
+            if not placed[bucket_hour]:
+                del placed[bucket_hour]
+            if not placed:
+                del self.clamped[(key, hour)]
+            hour = bucket_hour
+        if self.buckets.get(hour, {}).get(key):
+            self._apply(key, hour, -1)
+
+    def _apply(self, key, hour: int, count: int):
+        if hour <= self.now_hour - self.horizon:
+            return
+        bucket = self.buckets[hour]
+        bucket[key] += count
+        if bucket[key] <= 0:
+            del bucket[key]
+            if not bucket:
+                del self.buckets[hour]
+        for span in self.spans:
+            if hour > self.now_hour - span:
+                totals = self.totals[span]
+                totals[key] += count
+                if totals[key] <= 0:
+                    del totals[key]
+
+    def count(self, key, span: int) -> int:
+        return self.totals[span][key]
+
+
+class ReportTrends:
+    """Rolling counters for every dimension, shared clock and windows."""
+
+    def __init__(self, windows=WINDOWS, clock=time.time):
+        self.windows = windows
+        self.clock = clock
+        spans = [hours for hours, _ in windows.values()] + [hours + baseline for hours, baseline in windows.values()]
+        now_hour = self._now_hour()
+        self.counters = {dimension: RollingCounter(spans, now_hour) for dimension in DIMENSIONS}
+
+    def _now_hour(self) -> int:
+        return int(self.clock() // HOUR)
+
+    def tick(self) -> int:
+        now_hour = self._now_hour()
+        for counter in self.counters.values():
+            counter.advance(now_hour)
+        return now_hour
+
+    def add(self, report: dict):
+        hour = report_hour(report)
+        if hour is None:
+            return
+        self.tick()
+        for dimension, key in report_keys(report):
+            self.counters[dimension].add(key, hour)
+
+    def remove(self, report: dict):
+        hour = report_hour(report)
+        if hour is None:
+            return
+        self.tick()
+        for dimension, key in report_keys(report):
+            self.counters[dimension].remove(key, hour)
+
+    def entry(self, dimension: str, key, window: str) -> dict:
+        """Count in the window against its baseline, and whether that is a surge."""
+        hours, baseline_hours = self.windows[window]
+        counter = self.counters[dimension]
+        count = counter.count(key, hours)
+        baseline = counter.count(key, hours + baseline_hours) - count
+        expected = baseline * hours / baseline_hours
+        surge = count >= SURGE_MIN_REPORTS and count >= SURGE_FACTOR * expected
+        item = {"state": key[0], "lga": key[1]} if dimension == "lga" else {dimension: key}
+        item.update({
+            "count": count,
+            "baseline_count": baseline,
+            "expected": round(expected, 2),
+            "ratio": round(count / expected, 2) if expected else None,
+            "surge": surge,
+        })
+        return item
+
+    def top(self, dimension: str, window: str, limit: int = 10):
+        """(top keys by count in the window, every surging key in it)."""
+        self.tick()
+        hours, _ = self.windows[window]
+        totals = self.counters[dimension].totals[hours]
+        items = [self.entry(dimension, key, window) for key in totals]
+        items.sort(key=lambda item: item["count"], reverse=True)
+        surges = sorted((item for item in items if item["surge"]), key=lambda item: item["ratio"] or float("inf"), reverse=True)
+        return items[:limit], surges
@@ -1,42 +1,92 @@
-import pandas as pd
-from rapidfuzz import fuzz, process
+import csv
+import numpy as np
+from rapidfuzz import fuzz, process, utils
 from pathlib import Path
 
-# Load symptom CSV once on import
-DATA_PATH = Path(__file__).parent.parent / "data" / "symptom_data.csv"
-df_symptoms = pd.read_csv(DATA_PATH)
+# Load symptom CSV once on import (the keyword risk map has the same columns and is used when
+# no dedicated symptom table is shipped)
+DATA_DIR = Path(__file__).parent.parent / "data"
+DATA_PATH = DATA_DIR / "symptom_data.csv"
+if not DATA_PATH.exists():
+    DATA_PATH = DATA_DIR / "keyword_risk_map.csv"
 
-symptom_list = df_symptoms['symptom_keyword'].tolist()
 
-def match_symptom(user_input: str, threshold=60):
+class SymptomTable:
+    """The symptom CSV indexed into plain records; the first row wins for a repeated keyword."""
+
+    def __init__(self, path: Path):
+        self.records = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                keyword = (record["symptom_keyword"] or "").strip().lower()
+                if keyword and keyword not in self.records:
+                    self.records[keyword] = {
+                        "symptom_keyword": keyword,
+                        "risk_weight": int(record["risk_weight"]),
+                        "common_drugs": record["common_drugs"] or "",
+                    }
+        self.keywords = list(self.records)
+
+
+symptom_table = SymptomTable(DATA_PATH)
+
+
+def reload_symptom_table() -> SymptomTable:
+    """Re-read the symptom CSV and swap the new table in whole."""
+    global symptom_table
+    symptom_table = SymptomTable(DATA_PATH)
+    return symptom_table
+
+
+MATCH_THRESHOLD = 60
+
+
+def match_symptoms(symptoms: list, threshold=MATCH_THRESHOLD) -> list:
+    """
+    Fuzzy match every user symptom against the known symptoms in one cdist call.
+    Returns the matched record (or None) for each input, in order.
+    """
+    if not symptoms:
+        return []
+    table = symptom_table  # one table for the whole call, even if a reload swaps it meanwhile
+    # Single-threaded: at most 50 symptoms against a few hundred keywords is quicker to score
+    # than to fan out to a thread per core, which would also compete with the server's threads
+    scores = process.cdist(symptoms, table.keywords, scorer=fuzz.token_sort_ratio, processor=utils.default_process)
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(symptoms)), best]
+    return [
+        table.records[table.keywords[column]] if score >= threshold else None
+        for column, score in zip(best.tolist(), best_scores.tolist())
+    ]
+
+
+def match_symptom(user_input: str, threshold=MATCH_THRESHOLD):
     """
     Fuzzy match a user symptom input to the known symptoms.
-    Returns matched symptom row or None if no good match found.
+    Returns matched symptom record or None if no good match found.
     """
-    match = process.extractOne(user_input, symptom_list, scorer=fuzz.token_sort_ratio)
-    if match and match[1] >= threshold:
-        matched_symptom = match[0]
-        row = df_symptoms[df_symptoms['symptom_keyword'] == matched_symptom].iloc[0]
-        return row
-    return None
+    return match_symptoms([user_input], threshold)[0]
+
 
 def diagnose(symptoms: list):
     """
     Given a list of symptoms (str), returns matched symptoms, total risk, level, and recommendations.
     """
     matched = []
+    unmatched = []
     total_risk = 0
 
-    for symptom in symptoms:
-        res = match_symptom(symptom)
+    for symptom, res in zip(symptoms, match_symptoms(symptoms)):
         if res is not None:
             matched.append({
                 "input": symptom,
                 "matched_symptom": res['symptom_keyword'],
-                "risk_weight": int(res['risk_weight']),
+                "risk_weight": res['risk_weight'],
                 "common_drugs": res['common_drugs']
             })
-            total_risk += int(res['risk_weight'])
+            total_risk += res['risk_weight']
+        else:
+            unmatched.append(symptom)
 
     risk_level = "Low"
     recommendation = "Take over-the-counter drugs and monitor symptoms."
@@ -52,5 +102,6 @@ def diagnose(symptoms: list):
         "total_risk_score": total_risk,
         "risk_level": risk_level,
         "recommendation": recommendation,
-        "matched_symptoms": matched
+        "matched_symptoms": matched,
+        "unmatched_symptoms": unmatched
     }
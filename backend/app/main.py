@@ -1,11 +1,40 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import verify, report, map, risk, nearby
+from fastapi.middleware.gzip import GZipMiddleware
+from app.routers import verify, report, map, risk, nearby, metrics, diagnosis, admin
+from app.core.db import reports_collection, report_queue
+from app.core.report_aggregate import report_aggregate
+from app.core.image_store import MAX_IMAGE_BYTES, shutdown_processing
+from app.core.overpass import overpass_client
+from app.core.data_reload import data_reloader
 from dotenv import load_dotenv
 
 
-app = FastAPI(title="NexaHealth API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the flagged-pharmacy aggregate current from Firestore instead of re-streaming the collection
+    if os.getenv("REPORTS_LISTENER", "1") == "1":
+        report_aggregate.attach(reports_collection)
+    # Flushes reports left in the write-behind log by a previous run, then new ones
+    report_queue.start()
+    # Picks up new registry dumps and risk-map edits without a restart
+    data_reloader.start()
+    yield
+    data_reloader.stop()
+    # Drains what is left with retries for up to 10 s, so off the event loop
+    await asyncio.to_thread(report_queue.stop)
+    report_aggregate.detach()
+    await overpass_client.aclose()
+    # Let queued image post-processing finish, off the event loop
+    await asyncio.to_thread(shutdown_processing)
+
+
+app = FastAPI(title="NexaHealth API", lifespan=lifespan)
 
 # Allow CORS from your frontend
 app.add_middleware(
@@ -14,13 +43,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+# Responses that are already encoded (see app.core.http_cache) pass through untouched
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# Multipart bodies are spooled to disk before the endpoint runs, so refuse oversized
+# report submissions up front rather than after receiving them in full
+MAX_REPORT_BODY_BYTES = MAX_IMAGE_BYTES + 64 * 1024
+
+@app.middleware("http")
+async def limit_report_body_size(request: Request, call_next):
+    if request.url.path == "/submit-report":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_REPORT_BODY_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "Report is too large."})
+    return await call_next(request)
 
 app.include_router(verify.router)
 app.include_router(report.router)
 app.include_router(map.router)
 app.include_router(risk.router)
+app.include_router(diagnosis.router)
+app.include_router(admin.router)
 app.include_router(nearby.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
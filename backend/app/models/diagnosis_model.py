@@ -1,19 +1,25 @@
 # diagnosis_model.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 class SymptomInput(BaseModel):
-    symptoms: str
+    symptoms: List[str] = Field(..., min_length=1, max_length=50)  # one symptom per item
 
 class SuggestedDrug(BaseModel):
     name: str
     dosage_form: str
     use_case: str
 
+class MatchedSymptom(BaseModel):
+    input: str
+    matched_symptom: str
+    risk_weight: int
+
 class DiagnosisResponse(BaseModel):
-    match_symptoms: List[str]
     diagnosis_type: str  # e.g. "risk", "infection", "mental health"
-    result: str          # e.g. "High Risk"
+    result: str          # e.g. "High"
     score: int
-    matched_keywords: List[str]
+    recommendation: str
+    matched_symptoms: List[MatchedSymptom]
+    unmatched_symptoms: List[str]
     suggested_drugs: List[SuggestedDrug]
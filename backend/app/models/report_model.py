@@ -10,6 +10,8 @@ class ReportRequest(BaseModel):
     state: str
     lga: str
     street_address: Optional[str] = None   # Added street_address
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class ReportResponse(BaseModel):
     message: str
@@ -23,5 +25,7 @@ class ReportDBModel(BaseModel):
     state: str
     lga: str
     street_address: Optional[str] = None   # Added street_address
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     image_url: Optional[str] = None
@@ -6,7 +6,7 @@ class DrugVerificationRequest(BaseModel):
     nafdac_reg_no: str | None = None
 
 class DrugVerificationResponse(BaseModel):
-    status: Literal["verified", "flagged", "unknown", "partial_match"]
+    status: Literal["verified", "flagged", "unknown", "partial_match", "conflict_warning"]
     message: str
     product_name: Optional[str] = None
     dosage_form: Optional[str] = None
@@ -15,3 +15,16 @@ class DrugVerificationResponse(BaseModel):
     nafdac_reg_no: Optional[str] = None
     match_score: Optional[int] = None  # out of 100
 
+class DrugCandidate(BaseModel):
+    product_name: Optional[str] = None
+    dosage_form: Optional[str] = None
+    strengths: Optional[List[str]] = None
+    ingredients: Optional[List[str]] = None
+    nafdac_reg_no: Optional[str] = None
+    status: Optional[str] = None
+    match_score: int  # out of 100
+
+class FuzzyVerificationResponse(BaseModel):
+    status: Literal["partial_match", "unknown"]
+    message: str
+    candidates: List[DrugCandidate] = []
@@ -0,0 +1,32 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from app.core.data_reload import data_reloader
+
+router = APIRouter()
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not token or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/admin/reload-data")
+async def reload_data(
+    force: bool = Query(False, description="Reload everything, not only files that changed"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Rebuild the registry, risk map and symptom table from disk and swap them in, off the event loop."""
+    require_admin(x_admin_token)
+    try:
+        reloaded = await run_in_threadpool(data_reloader.reload, force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving the previous data: {e}")
+    return {"reloaded": reloaded, **data_reloader.stats()}
@@ -1,23 +1,30 @@
 # diagnosis.py
 from fastapi import APIRouter
-from app.core.ml import calculate_risk, verified_drugs
-from app.models.diagnosis_model import SymptomInput, SuggestedDrug, DiagnosisResponse
+from app.core.symptom_matcher import diagnose as diagnose_symptoms
+from app.core.drug_registry import drug_ingredients, get_registry
+from app.models.diagnosis_model import SymptomInput, SuggestedDrug, MatchedSymptom, DiagnosisResponse
 
 router = APIRouter()
 
 @router.post("/diagnose", response_model=DiagnosisResponse)
 async def diagnose(request: SymptomInput):
-    result = calculate_risk(request.symptoms)
+    symptoms = [s.strip() for s in request.symptoms if s and s.strip()]
+    result = diagnose_symptoms(symptoms)
 
+    # Common drugs of every matched symptom, first mention first
+    drug_names = {}
+    for matched in result["matched_symptoms"]:
+        for drug_name in matched["common_drugs"].split(","):
+            if drug_name.strip():
+                drug_names.setdefault(drug_name.strip().lower(), drug_name.strip())
+
+    drug_registry = get_registry()  # current registry, also after a reload
     suggested_drugs = []
 
-    for drug_name in result["recommended_drugs"]:
-        match = next(
-            (drug for drug in verified_drugs if drug["product_name"].lower() == drug_name.lower()),
-            None
-        )
+    for drug_name in drug_names.values():
+        match = drug_registry.find_by_name(drug_name)
         if match:
-            use_case = f"Used for treatment involving: {', '.join(match.get('ingredients', []))}"
+            use_case = f"Used for treatment involving: {', '.join(drug_ingredients(match))}"
             suggested_drugs.append(SuggestedDrug(
                 name=match.get("product_name", drug_name),
                 dosage_form=match.get("dosage_form", "N/A"),
@@ -33,7 +40,9 @@ async def diagnose(request: SymptomInput):
     return DiagnosisResponse(
         diagnosis_type="risk",
         result=result["risk_level"],
-        score=result["risk_score"],
-        matched_keywords=result["matched_keywords"],
+        score=result["total_risk_score"],
+        recommendation=result["recommendation"],
+        matched_symptoms=[MatchedSymptom(**m) for m in result["matched_symptoms"]],
+        unmatched_symptoms=result["unmatched_symptoms"],
         suggested_drugs=suggested_drugs
     )
@@ -1,158 +1,264 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, Request, HTTPException
 from typing import Optional
-from app.core.db import reports_collection  # assumed Firestore collection reference
-from datetime import datetime
-from rapidfuzz import fuzz
+from bisect import bisect_left
+from datetime import datetime, timezone
+from app.core.db import stream_pharmacy_reports, stream_reports
+from app.core.report_aggregate import HEATMAP_PRECISIONS, feed_key, report_aggregate
+from app.core.http_cache import cached_json_response, make_etag
+from app.core.flagged_index import FlaggedIndex
+from app.core.refresh_cache import RefreshCache
+import os
 
 router = APIRouter()
 
 # Simple in-memory cache
 cache = {
-    "flagged_data": None,
-    "timestamp": None,
-    "ttl_seconds": 60  # Cache time-to-live
+    "flagged_index": None  # facet index over the aggregate's current flagged list
 }
 
-def fetch_flagged_data():
+# Without a snapshot listener the aggregate is re-synced from Firestore: fresh for
+# FLAGGED_CACHE_TTL seconds, then served stale for up to FLAGGED_CACHE_STALE_TTL more
+# while a background refresh runs
+FLAGGED_CACHE_TTL = float(os.getenv("FLAGGED_CACHE_TTL", "60"))
+FLAGGED_CACHE_STALE_TTL = float(os.getenv("FLAGGED_CACHE_STALE_TTL", "240"))
+
+async def fetch_flagged_data():
+    """Re-read the whole reports collection into the aggregate (used when no listener keeps it current)."""
     try:
-        docs = reports_collection.stream()
-        reports = []
-        for doc in docs:
-            data = doc.to_dict()
-            if data:
-                reports.append(data)
-
-        # Aggregate by pharmacy (case-insensitive key)
-        pharmacy_reports = {}
-        for r in reports:
-            pharmacy = r.get("pharmacy_name", "").strip().lower()
-            if not pharmacy:
-                continue
-            if pharmacy not in pharmacy_reports:
-                pharmacy_reports[pharmacy] = {
-                    "pharmacy": r.get("pharmacy_name", "").strip(),
-                    "state": r.get("state"),
-                    "lga": r.get("lga"),
-                    "street_address": r.get("street_address"),
-                    "report_count": 0,
-                    "drugs": set()
-                }
-            pharmacy_reports[pharmacy]["report_count"] += 1
-            drug = r.get("drug_name")
-            if drug:
-                pharmacy_reports[pharmacy]["drugs"].add(drug)
-
-        # Only flag if 3 or more reports
-        flagged = [
-            {
-                "pharmacy": v["pharmacy"],
-                "state": v["state"],
-                "lga": v["lga"],
-                "street_address": v["street_address"],
-                "report_count": v["report_count"],
-                "drugs": list(v["drugs"])
-            }
-            for v in pharmacy_reports.values() if v["report_count"] >= 3
-        ]
-
-        # Summary data
-        summary = {
-            "total_flagged_pharmacies": len(flagged),
-            "total_reports": len(reports),
-            "top_drugs": []
-        }
+        docs = await stream_reports()
+        report_aggregate.reset(
+            (getattr(doc, "id", None) or f"doc-{i}", doc.to_dict()) for i, doc in enumerate(docs)
+        )
+        return report_aggregate.versioned_snapshot()  # digest, flagged, summary
 
-        drug_counts = {}
-        for r in reports:
-            drug = r.get("drug_name")
-            if drug:
-                drug_counts[drug.lower()] = drug_counts.get(drug.lower(), 0) + 1
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        sorted_drugs = sorted(drug_counts.items(), key=lambda x: x[1], reverse=True)
-        summary["top_drugs"] = [{"drug_name": d[0], "count": d[1]} for d in sorted_drugs[:5]]
 
-        return flagged, summary, reports  # return raw reports
+flagged_cache = RefreshCache(fetch_flagged_data, ttl=FLAGGED_CACHE_TTL, stale_ttl=FLAGGED_CACHE_STALE_TTL)
 
-    except Exception as e:
-        cache["flagged_data"] = None
-        cache["timestamp"] = None
-        raise HTTPException(status_code=500, detail=str(e))
+
+async def refresh_flagged_data():
+    """
+    Bring the aggregate up to date. With a live snapshot listener it already is; otherwise it is
+    re-synced from Firestore through flagged_cache (single-flight, stale-while-revalidate).
+    """
+    await flagged_cache.ensure(current=report_aggregate.live)
+
+
+async def load_flagged_data():
+    """Flagged pharmacies and summary, plus the digest of the reports they were built from."""
+    await refresh_flagged_data()
+    return report_aggregate.versioned_snapshot()
 
 
 @router.get("/get-flagged")
 async def get_flagged_pharmacies(
+    request: Request,
     pharmacy: Optional[str] = Query(None),
     state: Optional[str] = Query(None),
     lga: Optional[str] = Query(None),
     drug: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    sort_by: str = Query("report_count", regex="^(report_count|pharmacy)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$")
+    sort_by: str = Query("report_count", pattern="^(report_count|pharmacy)$"),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$"),
+    include_reports: bool = Query(True, description="Set to false for a lean page without all_reports; use /get-flagged/reports for the reports feed")
 ):
-    now = datetime.utcnow()
-    if cache["flagged_data"] and cache["timestamp"] and (now - cache["timestamp"]).total_seconds() < cache["ttl_seconds"]:
-        flagged, summary, all_reports = cache["flagged_data"]
-    else:
-        flagged, summary, all_reports = fetch_flagged_data()
-        cache["flagged_data"] = (flagged, summary, all_reports)
-        cache["timestamp"] = now
-
-    # Fuzzy matching helper
-    def fuzzy_match(query: str, target: str, threshold=70):
-        return fuzz.partial_ratio(query.lower(), target.lower()) >= threshold
-
-    # Filter flagged pharmacies
-    def matches_filter(item):
-        if pharmacy and not fuzzy_match(pharmacy, item["pharmacy"]):
-            return False
-        if state and not fuzzy_match(state, item.get("state") or ""):
-            return False
-        if lga and not fuzzy_match(lga, item.get("lga") or ""):
-            return False
-        if drug and not any(fuzzy_match(drug, d) for d in item.get("drugs", [])):
-            return False
-        return True
-
-    filtered = list(filter(matches_filter, flagged))
-
-    # Sorting
-    reverse = (sort_order == "desc")
-    filtered.sort(key=lambda x: x[sort_by].lower() if sort_by == "pharmacy" else x[sort_by], reverse=reverse)
-
-    # Pagination
-    start = (page - 1) * limit
-    end = start + limit
-    paginated = filtered[start:end]
+    digest, flagged, summary = await load_flagged_data()
 
-    return {
-        "flagged_pharmacies": paginated,
-        "all_reports": all_reports,  # 🔥 included here
-        "summary": summary,
-        "page": page,
-        "limit": limit,
-        "total_filtered": len(filtered)
-    }
+    params = (pharmacy, state, lga, drug, page, limit, sort_by, sort_order, include_reports)
+    etag = make_etag("get-flagged", digest, params)
 
+    def build():
+        # Only runs when this digest/parameter combination is not already cached
+        start = (page - 1) * limit
+        paginated, total_filtered = get_flagged_index(flagged).query(
+            pharmacy, state, lga, drug, sort_by, sort_order, start, start + limit
+        )
 
-@router.get("/get-flagged/{pharmacy}/reports")
-async def get_pharmacy_reports(pharmacy: str):
+        return {
+            "flagged_pharmacies": paginated,
+            "summary": summary,
+            "page": page,
+            "limit": limit,
+            "total_filtered": total_filtered
+        }
+
+    # all_reports is the same for every page and filter, so it is serialized and cached once
+    # per digest and spliced into the (small) cached page rather than stored with each one
+    splice = None
+    if include_reports:
+        reports_digest, all_reports = report_aggregate.report_list()
+        splice = ("all_reports", make_etag("all-reports", reports_digest), lambda: all_reports)
+    return cached_json_response(request, etag, build, splice=splice)
+
+
+def get_flagged_index(flagged) -> FlaggedIndex:
+    """Facet index over the current flagged list, rebuilt only when the aggregate produces a new one."""
+    index = cache["flagged_index"]
+    if index is None or index.flagged is not flagged:
+        index = cache["flagged_index"] = FlaggedIndex(flagged, previous=index)
+    return index
+
+
+@router.get("/get-flagged/reports")
+async def get_reports_feed(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; omit to start from the oldest report"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Cursor-paginated feed of raw reports, oldest first by timestamp. New reports come
+    after every earlier cursor, so polling with the last next_cursor picks up only what
+    was submitted since.
+    """
+    # Cursors are "<timestamp>~<doc_id>" of the last report, valid on any worker; a bad one restarts the feed
+    after = None
+    if cursor and "~" in cursor:
+        timestamp, _, doc_id = cursor.rpartition("~")
+        after = (timestamp, doc_id)
+
+    await refresh_flagged_data()
+    with report_aggregate.lock:  # the listener thread may apply changes meanwhile
+        reports, next_key, has_more = report_aggregate.feed(after, limit)
+        digest = report_aggregate.digest
+    etag = make_etag("get-flagged/reports", digest, after, limit)
+
+    return cached_json_response(request, etag, lambda: {
+        "reports": reports,
+        "next_cursor": "~".join(next_key) if next_key else None,
+        "has_more": has_more,
+        "count": len(reports)
+    })
+
+
+@router.get("/get-flagged/heatmap")
+async def get_heatmap(
+    request: Request,
+    level: str = Query("state", pattern="^(state|lga|geohash)$"),
+    precision: int = Query(5, ge=min(HEATMAP_PRECISIONS), le=max(HEATMAP_PRECISIONS),
+                           description="Geohash length for level=geohash; larger is finer")
+):
+    """
+    Report counts binned per state, per LGA or per geohash cell, precomputed by the aggregate.
+    Geohash bins only cover reports submitted with a latitude and longitude.
+    """
+    await refresh_flagged_data()
+    if level != "geohash":
+        precision = None
+    with report_aggregate.lock:
+        _, bins = report_aggregate.heatmap(level, precision)
+        digest = report_aggregate.digest
+        total_reports = len(report_aggregate.reports)
+        located_reports = sum(report_aggregate.cell_counts[max(HEATMAP_PRECISIONS)].values())
+    etag = make_etag("get-flagged/heatmap", digest, level, precision)
+
+    return cached_json_response(request, etag, lambda: {
+        "level": level,
+        "precision": precision,
+        "bins": bins,
+        "total_reports": total_reports,
+        "located_reports": located_reports
+    })
+
+
+@router.get("/get-flagged/trends")
+async def get_trends(
+    request: Request,
+    dimension: str = Query("drug", pattern="^(drug|pharmacy|state|lga)$"),
+    window: str = Query("24h", pattern="^(24h|7d|30d)$"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Most reported drugs, pharmacies, states or LGAs in a rolling window, each against its
+    baseline rate, plus every key whose reports are surging in that window.
+    """
+    await refresh_flagged_data()
+    with report_aggregate.lock:
+        top, surges = report_aggregate.trends.top(dimension, window, limit)
+        digest = report_aggregate.digest
+        hour = report_aggregate.trends.counters[dimension].now_hour
+    # Counts change with new reports and as the hourly buckets roll over
+    etag = make_etag("get-flagged/trends", digest, hour, dimension, window, limit)
+
+    return cached_json_response(request, etag, lambda: {
+        "dimension": dimension,
+        "window": window,
+        "top": top,
+        "surges": surges
+    })
+
+
+def parse_timestamp(value: Optional[str], name: str) -> Optional[str]:
+    """An ISO 8601 query parameter in the form reports store their timestamp (naive UTC isoformat)."""
+    if value is None:
+        return None
     try:
-        # Get all reports from cache or database
-        _, _, all_reports = cache["flagged_data"] or fetch_flagged_data()
+        moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 timestamp")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat()
 
-        # Filter reports for this specific pharmacy (case-insensitive)
-        pharmacy_lower = pharmacy.lower()
-        pharmacy_reports = [
-            r for r in all_reports
-            if r.get("pharmacy_name", "").lower() == pharmacy_lower
-        ]
 
-        return {
-            "pharmacy": pharmacy,
-            "reports": pharmacy_reports,
-            "count": len(pharmacy_reports)
-        }
+def page_pharmacy_reports(items, since: Optional[str], until: Optional[str], cursor: Optional[str], limit: int):
+    """
+    Newest-first page of (doc_id, report) pairs within [since, until):
+    (reports, total in range, next_cursor). Cursors are "<timestamp>~<doc_id>" of the last report.
+    """
+    keyed = []
+    for doc_id, report in items:
+        key = feed_key(doc_id, report)
+        if (since is None or key[0] >= since) and (until is None or key[0] < until):
+            keyed.append((key, report))
+    keyed.sort(key=lambda item: item[0])
+
+    # Pages are taken from the newest end; a cursor resumes just below the last report returned
+    end = len(keyed)
+    if cursor:
+        timestamp, _, doc_id = cursor.rpartition("~")
+        end = bisect_left([key for key, _ in keyed], (timestamp, doc_id))
+    start = max(0, end - limit)
+    page = keyed[start:end][::-1]
+    next_cursor = "~".join(page[-1][0]) if page and start > 0 else None
+    return [report for _, report in page], len(keyed), next_cursor
+
 
+@router.get("/get-flagged/{pharmacy}/reports")
+async def get_pharmacy_reports(
+    pharmacy: str,
+    since: Optional[str] = Query(None, description="Only reports at or after this ISO 8601 time"),
+    until: Optional[str] = Query(None, description="Only reports before this ISO 8601 time"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    One pharmacy's reports, newest first. Only that pharmacy's documents are read: from the
+    aggregate's per-pharmacy index while a snapshot listener keeps it live, otherwise with an
+    equality query on the (lowercased) pharmacy_name.
+    """
+    since, until = parse_timestamp(since, "since"), parse_timestamp(until, "until")
+    try:
+        if report_aggregate.live:
+            items = report_aggregate.pharmacy_reports(pharmacy)
+        else:
+            docs = await stream_pharmacy_reports(pharmacy.strip().lower())
+            items = [(getattr(doc, "id", None) or f"doc-{i}", doc.to_dict()) for i, doc in enumerate(docs)]
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    items = [(doc_id, report) for doc_id, report in items if report]
+    if not items:
+        raise HTTPException(status_code=404, detail="No reports found for this pharmacy")
+
+    reports, total, next_cursor = page_pharmacy_reports(items, since, until, cursor, limit)
+    return {
+        "pharmacy": pharmacy,
+        "reports": reports,
+        "count": len(reports),
+        "report_count": total,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from app.core.db import report_queue
+from app.core.data_reload import data_reloader
+from app.core.http_cache import body_cache
+from app.core.ml import risk_cache
+from app.routers.map import flagged_cache
+from app.routers.nearby import tile_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Operational counters for the background pipelines and caches."""
+    return {
+        "report_queue": report_queue.stats(),
+        "flagged_cache": flagged_cache.stats(),
+        "nearby_tiles": tile_cache.stats(),
+        "risk_cache": risk_cache.stats(),
+        "response_cache": body_cache.stats(),
+        "data_reload": data_reloader.stats()
+    }
@@ -3,11 +3,17 @@
 from fastapi import APIRouter, Query, HTTPException
 from typing import List, Optional
 from pydantic import BaseModel
-import requests
+import numpy as np
+import os
+from app.core.overpass import overpass_client, OverpassError
+from app.core.geo import geohash_bbox, geohash_cover, geohash_encode_many, haversine_m
+from app.core.ttl_cache import TTLCache
+from app.core.poi_index import PoiIndex, POI_INDEX_PATH
 
 router = APIRouter()
 
-OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+# Amenity types returned by /get-nearby
+AMENITIES = ["pharmacy", "hospital"]
 
 class Location(BaseModel):
     lat: float
@@ -21,25 +27,7 @@ class NearbyPlace(BaseModel):
     phone: Optional[str] = None
     website: Optional[str] = None
     opening_hours: Optional[str] = None
-    distance_meters: Optional[int] = None  # If you calculate distance later
-
-def query_overpass(lat: float, lng: float, radius: int = 3000, amenity_type: str = "pharmacy"):
-    """
-    Query the Overpass API for amenities of the given type around the lat/lng within the radius (meters).
-    """
-    query = f"""
-    [out:json][timeout:25];
-    (
-      node["amenity"="{amenity_type}"](around:{radius},{lat},{lng});
-      way["amenity"="{amenity_type}"](around:{radius},{lat},{lng});
-      relation["amenity"="{amenity_type}"](around:{radius},{lat},{lng});
-    );
-    out center tags;
-    """
-    response = requests.post(OVERPASS_URL, data={"data": query})
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Failed to fetch data from Overpass API")
-    return response.json()
+    distance_meters: Optional[int] = None  # from the search location
 
 def extract_address(tags: dict) -> str:
     """
@@ -60,42 +48,158 @@ def extract_address(tags: dict) -> str:
         parts.append(tags["addr:postcode"])
     return ", ".join(parts) if parts else "Address not available"
 
+def element_to_place(element: dict) -> Optional[NearbyPlace]:
+    """Shape an Overpass element into a NearbyPlace, or None if it lacks a usable location or amenity."""
+    tags = element.get("tags", {})
+    amenity = tags.get("amenity")
+    if amenity not in AMENITIES:
+        return None
+
+    # For ways and relations, location is in 'center'
+    if element.get("type") in ("way", "relation"):
+        loc = element.get("center", {})
+    else:
+        loc = {"lat": element.get("lat"), "lon": element.get("lon")}
+
+    if not loc.get("lat") or not loc.get("lon"):
+        # Skip elements without location data
+        return None
+
+    return NearbyPlace(
+        name=tags.get("name", "Unknown"),
+        type=amenity.capitalize(),
+        location=Location(lat=loc["lat"], lng=loc["lon"]),
+        address=extract_address(tags),
+        phone=tags.get("phone") or tags.get("contact:phone"),
+        website=tags.get("website") or tags.get("contact:website"),
+        opening_hours=tags.get("opening_hours"),
+    )
+
+
+# === Tile cache ===
+# Places are cached per geohash cell, so nearby searches from the same area reuse what
+# earlier ones fetched and only cells not yet cached go to Overpass (in one query).
+
+NEARBY_TILE_TTL = float(os.getenv("NEARBY_TILE_TTL", str(6 * 3600)))
+NEARBY_MAX_TILES = int(os.getenv("NEARBY_MAX_TILES", "5000"))
+# The finest geohash precision whose cover stays within this many cells is used
+MAX_TILES_PER_QUERY = 16
+# Coarsest tile precision (cells of about 39 x 20 km); searches too wide for it are not tiled
+MIN_TILE_PRECISION = 4
+
+tile_cache = TTLCache(NEARBY_MAX_TILES, NEARBY_TILE_TTL)
+
+
+class NearbyTile:
+    __slots__ = ("places", "lats", "lngs")
+
+    def __init__(self, places: List[NearbyPlace]):
+        self.places = places
+        self.lats = np.array([place.location.lat for place in places], dtype=np.float64)
+        self.lngs = np.array([place.location.lng for place in places], dtype=np.float64)
+
+
+def tile_cover(lat: float, lng: float, radius: int) -> Optional[List[str]]:
+    """Cells to load for the search, or None when it needs more than MAX_TILES_PER_QUERY even at MIN_TILE_PRECISION."""
+    for precision in range(6, MIN_TILE_PRECISION - 1, -1):
+        cells = geohash_cover(lat, lng, radius, precision)
+        if len(cells) <= MAX_TILES_PER_QUERY:
+            return cells
+    return None
+
+
+async def load_tiles(cells: List[str]) -> List[NearbyTile]:
+    tiles = {cell: tile_cache.get(cell) for cell in cells}
+    missing = [cell for cell, tile in tiles.items() if tile is None]
+    if missing:
+        elements = await overpass_client.amenities_in_boxes([geohash_bbox(cell) for cell in missing], AMENITIES)
+        places = [place for place in map(element_to_place, elements) if place is not None]
+
+        # Each place belongs to the one cell containing it; box queries can return places just outside
+        grouped = {cell: [] for cell in missing}
+        cell_of = geohash_encode_many(
+            [place.location.lat for place in places], [place.location.lng for place in places], len(missing[0])
+        )
+        for place, cell in zip(places, cell_of):
+            if cell in grouped:
+                grouped[cell].append(place)
+
+        for cell, cell_places in grouped.items():
+            tiles[cell] = NearbyTile(cell_places)
+            tile_cache.set(cell, tiles[cell])
+    return list(tiles.values())
+
+
+# === Offline index ===
+# When an index has been imported (python -m app.core.poi_index ...), nearby searches are
+# answered from it and Overpass is not used. NEARBY_SOURCE=overpass ignores the index.
+
+NEARBY_SOURCE = os.getenv("NEARBY_SOURCE", "auto")
+
+
+def load_offline_index() -> Optional[PoiIndex]:
+    if NEARBY_SOURCE == "overpass" or not os.path.exists(POI_INDEX_PATH):
+        return None
+    return PoiIndex.load(POI_INDEX_PATH, shape=element_to_place)
+
+
+offline_index = load_offline_index()
+
+
+def with_distances(places: List[NearbyPlace], positions, distances) -> List[NearbyPlace]:
+    return [
+        places[i].model_copy(update={"distance_meters": int(round(d))})
+        for i, d in zip(positions.tolist(), distances.tolist())
+    ]
+
+
 @router.get("/get-nearby", response_model=List[NearbyPlace])
-def get_nearby(
-    lat: float = Query(..., description="Latitude of the user's location"),
-    lng: float = Query(..., description="Longitude of the user's location"),
-    radius: int = Query(3000, description="Search radius in meters"),
+async def get_nearby(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the user's location"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the user's location"),
+    radius: int = Query(3000, ge=1, le=50000, description="Search radius in meters"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of places to return"),
 ):
     """
-    Get nearby pharmacies and hospitals around the specified coordinates within the radius.
-    Uses OpenStreetMap Overpass API.
+    Get nearby pharmacies and hospitals around the specified coordinates within the radius,
+    nearest first, with distance_meters filled in.
+    Uses the offline POI index when one is loaded, otherwise OpenStreetMap Overpass API
+    for map areas not already cached.
     """
-    nearby_places = []
-    for amenity in ["pharmacy", "hospital"]:
-        data = query_overpass(lat, lng, radius=radius, amenity_type=amenity)
-        for element in data.get("elements", []):
-            tags = element.get("tags", {})
-            # For ways and relations, location is in 'center'
-            if element.get("type") in ("way", "relation"):
-                loc = element.get("center", {})
-            else:
-                loc = {"lat": element.get("lat"), "lon": element.get("lon")}
-
-            if not loc.get("lat") or not loc.get("lon"):
-                # Skip elements without location data
-                continue
-
-            place = NearbyPlace(
-                name=tags.get("name", "Unknown"),
-                type=amenity.capitalize(),
-                location=Location(lat=loc["lat"], lng=loc["lon"]),
-                address=extract_address(tags),
-                phone=tags.get("phone") or tags.get("contact:phone"),
-                website=tags.get("website") or tags.get("contact:website"),
-                opening_hours=tags.get("opening_hours"),
-            )
-            nearby_places.append(place)
-
-    # Optional: You could sort by proximity if you want here
-
-    return nearby_places
+    if offline_index is not None:
+        positions, distances = offline_index.within(lat, lng, radius, limit)
+        return with_distances(offline_index.records, positions, distances)
+
+    cells = tile_cover(lat, lng, radius)
+    try:
+        if cells is not None:
+            tiles = await load_tiles(cells)
+        else:
+            # Too wide to tile: one radius query, not cached
+            elements = await overpass_client.amenities_around(lat, lng, radius, AMENITIES)
+            tiles = [NearbyTile([place for place in map(element_to_place, elements) if place is not None])]
+    except OverpassError:
+        raise HTTPException(status_code=500, detail="Failed to fetch data from Overpass API")
+
+    places = [place for tile in tiles for place in tile.places]
+    if not places:
+        return []
+
+    distances = haversine_m(lat, lng, np.concatenate([tile.lats for tile in tiles]), np.concatenate([tile.lngs for tile in tiles]))
+    within = np.flatnonzero(distances <= radius)
+    nearest = within[np.argsort(distances[within], kind="stable")][:limit]
+
+    return with_distances(places, nearest, distances[nearest])
+
+
+@router.get("/get-nearby/nearest", response_model=List[NearbyPlace])
+async def get_nearest(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the user's location"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the user's location"),
+    k: int = Query(10, ge=1, le=100, description="Number of places to return"),
+):
+    """The k pharmacies and hospitals closest to the coordinates, however far. Needs the offline POI index."""
+    if offline_index is None:
+        raise HTTPException(status_code=503, detail="Nearest-place search needs the offline POI index.")
+    positions, distances = offline_index.nearest(lat, lng, k)
+    return with_distances(offline_index.records, positions, distances)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from typing import Optional
-from app.core.db import reports_collection
+from app.core.db import save_report
+from app.core.report_queue import ReportQueueFull
+from app.core.image_store import save_upload, ImageTooLarge
+from app.core.report_aggregate import report_aggregate
 from app.models.report_model import ReportResponse
 from datetime import datetime
-import uuid
-import os
 
 router = APIRouter()
 
@@ -29,6 +30,8 @@ async def submit_report(
     state: str = Form(...),
     lga: str = Form(...),
     street_address: Optional[str] = Form(None),
+    latitude: Optional[float] = Form(None, ge=-90, le=90),
+    longitude: Optional[float] = Form(None, ge=-180, le=180),
     image: Optional[UploadFile] = File(None)
 ):
     try:
@@ -42,15 +45,15 @@ async def submit_report(
         }.items():
             if not value or not value.strip():
                 raise HTTPException(status_code=400, detail=f"{field_name} cannot be empty")
+        if (latitude is None) != (longitude is None):
+            raise HTTPException(status_code=400, detail="latitude and longitude must be given together")
 
         image_url = None
-        if image:
-            filename = f"{uuid.uuid4().hex}_{image.filename}"
-            file_location = f"uploads/{filename}"
-            os.makedirs("uploads", exist_ok=True)
-            with open(file_location, "wb") as f:
-                f.write(await image.read())
-            image_url = file_location
+        if image and image.filename:
+            try:
+                image_url = await save_upload(image)
+            except ImageTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
 
         report_data = {
             "drug_name": sanitize_field(drug_name),
@@ -60,11 +63,23 @@ async def submit_report(
             "state": sanitize_field(state),
             "lga": sanitize_field(lga),
             "street_address": sanitize_field(street_address, to_lower=False),
+            "latitude": latitude,  # optional pharmacy location, used for the map heatmap
+            "longitude": longitude,
             "timestamp": datetime.utcnow().isoformat(),
             "image_url": image_url
         }
 
-        reports_collection.add(report_data)
+        try:
+            doc_id = await save_report(report_data)
+        except ReportQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many reports are waiting to be saved. Please try again shortly.",
+                headers={"Retry-After": "5"}
+            )
+
+        # Reflect the report on the map right away; a snapshot listener re-applying it is a no-op
+        report_aggregate.upsert(doc_id, report_data)
 
         return ReportResponse(
             message="Report submitted successfully.",
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
-from app.core.ml import calculate_risk, verified_drugs
+from app.core.ml import calculate_risk
+from app.core.drug_registry import drug_ingredients, get_registry
 from app.models.risk_model import SymptomInput, SuggestedDrug, RiskPredictionResponse
 
 router = APIRouter()
@@ -8,15 +9,13 @@ router = APIRouter()
 async def predict_risk(request: SymptomInput):
     result = calculate_risk(request.symptoms)
 
+    drug_registry = get_registry()  # current registry, also after a reload
     suggested_drugs = []
 
     for drug_name in result["recommended_drugs"]:
-        match = next(
-            (drug for drug in verified_drugs if drug["product_name"].lower() == drug_name.lower()),
-            None
-        )
+        match = drug_registry.find_by_name(drug_name)
         if match:
-            use_case = f"Used for treatment involving: {', '.join(match.get('ingredients', []))}"
+            use_case = f"Used for treatment involving: {', '.join(drug_ingredients(match))}"
             suggested_drugs.append(SuggestedDrug(
                 name=match.get("product_name", drug_name),
                 dosage_form=match.get("dosage_form", "N/A"),
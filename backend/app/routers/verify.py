@@ -1,57 +1,74 @@
-from fastapi import APIRouter
-from app.models.verify_model import DrugVerificationRequest, DrugVerificationResponse
-import json
-from pathlib import Path
+from fastapi import APIRouter, Query, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from typing import List
+from app.models.verify_model import (
+    DrugVerificationRequest, DrugVerificationResponse, DrugCandidate, FuzzyVerificationResponse
+)
+from app.core.drug_registry import drug_ingredients, get_registry, normalize_key, on_registry_reload
 
 router = APIRouter()
 
-DATA_FILE = Path(__file__).parent.parent / "data" / "verified_drugs.json"
+# Shared registry: hash indexes built once, so every lookup below is O(1)
+drug_registry = get_registry()
+drug_db = drug_registry.drugs
 
-with open(DATA_FILE, "r") as f:
-    drug_db = json.load(f)
+
+@on_registry_reload
+def use_registry(registry):
+    # Handlers read drug_registry once per request, so a reload never mixes two registries
+    global drug_registry, drug_db
+    drug_registry, drug_db = registry, registry.drugs
+
+# Upper bounds on items and bytes per /verify-drug/batch call, for either body format,
+# and on one NDJSON line; a request is a couple of hundred bytes
+MAX_BATCH_ITEMS = 10000
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+MAX_NDJSON_LINE_BYTES = 16 * 1024
+batch_adapter = TypeAdapter(List[DrugVerificationRequest])
 
 
 @router.post("/verify-drug", response_model=DrugVerificationResponse)
 def verify_drug(request: DrugVerificationRequest):
     name = request.product_name.strip().lower() if request.product_name else None
     reg_no = request.nafdac_reg_no.strip().lower() if request.nafdac_reg_no else None
+    registry = drug_registry
 
     # Case 1: Full match (name + reg_no)
     if name and reg_no:
-        for drug in drug_db:
-            if (drug["product_name"].lower() == name and
-                drug["nafdac_reg_no"].lower() == reg_no):
-                return handle_match(drug, request)
+        drug = registry.find_exact(name, reg_no)
+        if drug:
+            return handle_match(drug, request)
 
     # Case 2: Only name matches
     if name:
-        for drug in drug_db:
-            if drug["product_name"].lower() == name:
-                return DrugVerificationResponse(
-                    status="partial_match",
-                    message="Product name matches a NAFDAC-verified drug, but the registration number does not. Please check again.",
-                    product_name=drug.get("product_name"),
-                    dosage_form=drug.get("dosage_form"),
-                    strengths=drug.get("strengths"),
-                    ingredients=drug.get("ingredients"),
-                    nafdac_reg_no=drug.get("nafdac_reg_no"),
-                    match_score=70  # partial confidence
-                )
+        drug = registry.find_by_name(name)
+        if drug:
+            return DrugVerificationResponse(
+                status="partial_match",
+                message="Product name matches a NAFDAC-verified drug, but the registration number does not. Please check again.",
+                product_name=drug.get("product_name"),
+                dosage_form=drug.get("dosage_form"),
+                strengths=drug.get("strengths"),
+                ingredients=list(drug_ingredients(drug)),
+                nafdac_reg_no=drug.get("nafdac_reg_no"),
+                match_score=70  # partial confidence
+            )
 
     # Case 3: Only reg no matches
     if reg_no:
-        for drug in drug_db:
-            if drug["nafdac_reg_no"].lower() == reg_no:
-                return DrugVerificationResponse(
-                    status="conflict_warning",
-                    message="NAFDAC registration number is valid, but the product name does not match the official record. This could indicate a counterfeit product.",
-                    product_name=drug.get("product_name"),
-                    dosage_form=drug.get("dosage_form"),
-                    strengths=drug.get("strengths"),
-                    ingredients=drug.get("ingredients"),
-                    nafdac_reg_no=drug.get("nafdac_reg_no"),
-                    match_score=50  # suspicious/conflict
-                )
+        drug = registry.find_by_reg_no(reg_no)
+        if drug:
+            return DrugVerificationResponse(
+                status="conflict_warning",
+                message="NAFDAC registration number is valid, but the product name does not match the official record. This could indicate a counterfeit product.",
+                product_name=drug.get("product_name"),
+                dosage_form=drug.get("dosage_form"),
+                strengths=drug.get("strengths"),
+                ingredients=list(drug_ingredients(drug)),
+                nafdac_reg_no=drug.get("nafdac_reg_no"),
+                match_score=50  # suspicious/conflict
+            )
 
     # Case 4: No match
     return DrugVerificationResponse(
@@ -60,6 +77,147 @@ def verify_drug(request: DrugVerificationRequest):
     )
 
 
+@router.post("/verify-drug/batch")
+async def verify_drug_batch(request: Request):
+    """
+    Verify many drugs in one call, e.g. a pharmacy's whole inventory list.
+
+    The body is either a JSON array of verification requests or an NDJSON stream of them
+    (Content-Type: application/x-ndjson). Results are streamed back as NDJSON, one
+    DrugVerificationResponse per input item and in the same order, computed exactly as
+    POST /verify-drug would.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_BATCH_BYTES:
+        raise batch_too_large()
+
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        items = await read_ndjson_requests(request)
+    else:
+        try:
+            items = batch_adapter.validate_json(await read_capped_body(request))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large: send at most {MAX_BATCH_ITEMS} items per request.")
+
+    return StreamingResponse(stream_verifications(items), media_type="application/x-ndjson")
+
+
+def batch_too_large(detail: str = None) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail or f"Batch too large: send at most {MAX_BATCH_BYTES // (1024 * 1024)} MB per request.")
+
+
+async def read_capped_body(request: Request) -> bytes:
+    """The request body, abandoned with a 413 as soon as it passes MAX_BATCH_BYTES."""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BATCH_BYTES:
+            raise batch_too_large()
+    return bytes(body)
+
+
+async def read_ndjson_requests(request: Request) -> list:
+    """
+    Parse an NDJSON body as it arrives into a DrugVerificationRequest (or a ValueError
+    for a bad line) per non-empty line.
+
+    The body has to be fully read before the response starts streaming, because the
+    streaming response listens on the same ASGI receive channel for client disconnects.
+    """
+    items = []
+    buffer = b""
+    line_no = 0
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_BATCH_BYTES:
+            raise batch_too_large()
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if len(line) > MAX_NDJSON_LINE_BYTES:
+                raise batch_too_large(f"Line {line_no} is longer than {MAX_NDJSON_LINE_BYTES} bytes.")
+            if line.strip():
+                items.append(parse_ndjson_line(line, line_no))
+        if len(buffer) > MAX_NDJSON_LINE_BYTES:
+            raise batch_too_large(f"Line {line_no + 1} is longer than {MAX_NDJSON_LINE_BYTES} bytes.")
+        if len(items) > MAX_BATCH_ITEMS:
+            break
+    if buffer.strip():
+        items.append(parse_ndjson_line(buffer, line_no + 1))
+    return items
+
+
+def parse_ndjson_line(line: bytes, line_no: int):
+    try:
+        return DrugVerificationRequest.model_validate_json(line)
+    except ValidationError:
+        return ValueError(f"Line {line_no} is not a valid drug verification request.")
+
+
+def stream_verifications(items, chunk_size: int = 256):
+    """
+    Resolve each item with verify_drug and yield NDJSON in chunks of chunk_size lines.
+    Repeated (name, reg no) pairs are only resolved and serialized once.
+    """
+    resolved = {}
+    lines = []
+    for item in items:
+        if isinstance(item, ValueError):
+            line = DrugVerificationResponse(status="unknown", message=str(item)).model_dump_json() + "\n"
+        else:
+            key = (normalize_key(item.product_name), normalize_key(item.nafdac_reg_no))
+            line = resolved.get(key)
+            if line is None:
+                line = resolved[key] = verify_drug(item).model_dump_json() + "\n"
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+@router.post("/verify-drug/fuzzy", response_model=FuzzyVerificationResponse)
+def verify_drug_fuzzy(
+    request: DrugVerificationRequest,
+    limit: int = Query(5, ge=1, le=20),
+    min_score: int = Query(60, ge=0, le=100),
+):
+    """
+    Typo-tolerant verification: returns the closest NAFDAC records ranked by match score,
+    so inputs like "Artheget-EZ" or "A4 6238" still find their record.
+    """
+    matches = drug_registry.search(request.product_name, request.nafdac_reg_no, limit=limit, min_score=min_score)
+    if not matches:
+        return FuzzyVerificationResponse(
+            status="unknown",
+            message="No NAFDAC record closely matches the given information."
+        )
+
+    return FuzzyVerificationResponse(
+        status="partial_match",
+        message="Closest NAFDAC records to the given information. Confirm the details before relying on a match.",
+        candidates=[
+            DrugCandidate(
+                product_name=drug.get("product_name"),
+                dosage_form=drug.get("dosage_form"),
+                strengths=drug.get("strengths"),
+                ingredients=list(drug_ingredients(drug)),
+                nafdac_reg_no=drug.get("nafdac_reg_no"),
+                status=drug.get("status"),
+                match_score=score
+            )
+            for drug, score in matches
+        ]
+    )
+
+
 def handle_match(drug: dict, request: DrugVerificationRequest) -> DrugVerificationResponse:
     status = drug.get("status", "unknown")
     score = 100
@@ -93,7 +251,7 @@ def handle_match(drug: dict, request: DrugVerificationRequest) -> DrugVerificati
         product_name=drug.get("product_name"),
         dosage_form=drug.get("dosage_form"),
         strengths=drug.get("strengths"),
-        ingredients=drug.get("ingredients"),
+        ingredients=list(drug_ingredients(drug)),
         nafdac_reg_no=drug.get("nafdac_reg_no"),
         match_score=score
     )
@@ -0,0 +1,90 @@
+"""
+Event-loop responsiveness while Firestore calls are slow: inline (blocking) calls vs. the
+thread-pool offload in app.core.db. Firestore is replaced by an in-memory collection that
+sleeps on every call, and traffic goes through the ASGI app in-process.
+
+    python -m benchmarks.bench_async_db [latency_ms]
+"""
+import asyncio
+import sys
+import time
+import httpx
+from app.core import db
+from app.core.memory_store import InMemoryCollection
+from app.main import app
+from app.routers import map as map_router
+from benchmarks.timing import summarize, print_table
+
+
+class LatencyCollection(InMemoryCollection):
+    """In-memory collection whose reads and writes block for `latency` seconds, like a slow round trip."""
+
+    def __init__(self, latency: float, documents: dict = None):
+        super().__init__(documents)
+        self.latency = latency
+
+    def add(self, data: dict):
+        time.sleep(self.latency)
+        return super().add(data)
+
+    def stream(self):
+        time.sleep(self.latency)
+        return super().stream()
+
+
+async def inline_run_db(fn, *args, **kwargs):
+    """The previous behaviour: call the blocking client straight from the event loop."""
+    return fn(*args, **kwargs)
+
+
+REPORT = {
+    "drug_name": "Paracetamol",
+    "pharmacy_name": "HopeMed Ikeja",
+    "description": "Tablets crumble",
+    "state": "Lagos",
+    "lga": "Ikeja",
+}
+
+
+async def run_load(submits: int, reads: int, pings: int):
+    latencies = {"submit-report": [], "get-flagged": [], "ping /": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def timed(name, call, scheduled=None):
+            start = scheduled or time.perf_counter()
+            response = await call()
+            response.raise_for_status()
+            latencies[name].append((time.perf_counter() - start) * 1_000_000)
+
+        async def ping(i):
+            # Measured from when the ping was due, so time spent waiting on a blocked loop counts
+            scheduled = start + i * 0.005
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await timed("ping /", lambda: client.get("/"), scheduled)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(timed("submit-report", lambda: client.post("/submit-report", data=REPORT)) for _ in range(submits)),
+            *(timed("get-flagged", lambda: client.get("/get-flagged", params={"include_reports": "false"})) for _ in range(reads)),
+            *(ping(i) for i in range(pings)),
+        )
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 50) / 1000
+    db.reports_collection = LatencyCollection(latency)
+    map_router.flagged_cache.ttl = map_router.flagged_cache.stale_ttl = 0  # /get-flagged re-streams (concurrent reads share a stream)
+
+    offloaded_run_db = db.run_db
+    for label, run_db in (("inline (blocking)", inline_run_db), ("thread-pool offload", offloaded_run_db)):
+        db.run_db = run_db
+        latencies, elapsed = asyncio.run(run_load(submits=40, reads=10, pings=50))
+        rows = {name: summarize(samples) for name, samples in latencies.items()}
+        print_table(f"{label}: {latency * 1000:.0f} ms per Firestore call, wall time {elapsed:.2f} s", rows)
+    db.run_db = offloaded_run_db
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+/verify-drug and calculate_risk latency while the reference data is reloaded in the background.
+
+    python -m benchmarks.bench_data_reload
+"""
+import itertools
+import random
+import threading
+import time
+
+from app.core import ml
+from app.core.data_reload import DataReloader
+from app.models.verify_model import DrugVerificationRequest
+from app.routers import verify
+from benchmarks.symptom_corpus import symptom_inputs
+from benchmarks.timing import summarize, print_table
+
+request_ids = itertools.count()
+
+
+def run_requests(seconds: float, reloading: bool):
+    rng = random.Random(1)
+    drugs = verify.drug_db
+    texts = symptom_inputs(ml.risk_map.keys(), count=2000)
+    stop = threading.Event()
+    reloads = []
+
+    def reload_loop():
+        reloader = DataReloader(interval=0)
+        while not stop.is_set():
+            start = time.perf_counter()
+            reloader.reload(force=True)
+            reloads.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=reload_loop) if reloading else None
+    if thread:
+        thread.start()
+
+    samples = {"verify_drug": [], "calculate_risk": []}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        drug = rng.choice(drugs)
+        request = DrugVerificationRequest(product_name=drug["product_name"], nafdac_reg_no=drug["nafdac_reg_no"])
+        start = time.perf_counter()
+        verify.verify_drug(request)
+        samples["verify_drug"].append((time.perf_counter() - start) * 1_000_000)
+
+        start = time.perf_counter()
+        ml.calculate_risk(f"{rng.choice(texts)} {next(request_ids)}")  # unique text: never a cache hit
+        samples["calculate_risk"].append((time.perf_counter() - start) * 1_000_000)
+        time.sleep(0.001)
+
+    stop.set()
+    if thread:
+        thread.join()
+    return samples, reloads
+
+
+def main():
+    run_requests(2.0, reloading=False)  # warm-up: stem cache, risk cache structures
+    rows = {}
+    for label, reloading in (("steady", False), ("reloading", True)):
+        samples, reloads = run_requests(5.0, reloading)
+        for name, values in samples.items():
+            rows[f"{name}, {label}"] = summarize(values)
+        if reloads:
+            print(f"{len(reloads)} full reloads, {sum(reloads) / len(reloads) * 1000:.0f} ms each on average")
+    print_table("request latency with and without background reloads", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+symptom_matcher.diagnose: one extractOne plus a pandas mask per symptom vs. a single cdist
+over all symptoms and the pre-indexed records, for lists of 1 to 50 symptoms.
+
+    python -m benchmarks.bench_diagnose
+"""
+import random
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from app.core import symptom_matcher
+from benchmarks.timing import measure, print_table
+
+LIST_SIZES = (1, 5, 10, 25, 50)
+
+df_symptoms = pd.read_csv(symptom_matcher.DATA_PATH)
+df_symptoms["symptom_keyword"] = df_symptoms["symptom_keyword"].str.strip().str.lower()
+legacy_symptom_list = df_symptoms["symptom_keyword"].tolist()
+
+
+def legacy_diagnose(symptoms):
+    """Matching half of diagnose as it was before the index."""
+    matched = []
+    for symptom in symptoms:
+        match = process.extractOne(symptom.lower(), legacy_symptom_list, scorer=fuzz.token_sort_ratio)
+        if match and match[1] >= symptom_matcher.MATCH_THRESHOLD:
+            row = df_symptoms[df_symptoms["symptom_keyword"] == match[0]].iloc[0]
+            matched.append((symptom, row["symptom_keyword"], int(row["risk_weight"])))
+    return matched
+
+
+def indexed_diagnose(symptoms):
+    return [
+        (m["input"], m["matched_symptom"], m["risk_weight"]) for m in symptom_matcher.diagnose(symptoms)["matched_symptoms"]
+    ]
+
+
+def typo(rng, word):
+    """Drop or double one letter, as users do."""
+    i = rng.randrange(len(word))
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i] + word[i:]
+
+
+def symptom_lists(size: int, count: int, seed: int = 5):
+    rng = random.Random(seed + size)
+    keywords = symptom_matcher.symptom_table.keywords
+    return [
+        [typo(rng, k) if rng.random() < 0.3 else k for k in rng.sample(keywords, size)] for _ in range(count)
+    ]
+
+
+def main():
+    rows = {}
+    mismatches = 0
+    for size in LIST_SIZES:
+        lists = symptom_lists(size, count=max(20, 400 // size))
+        mismatches += sum(1 for symptoms in lists if legacy_diagnose(symptoms) != indexed_diagnose(symptoms))
+        rows[f"legacy, {size} symptoms"] = measure(legacy_diagnose, lists)
+        rows[f"cdist, {size} symptoms"] = measure(indexed_diagnose, lists)
+    print(f"{len(symptom_matcher.symptom_table.keywords)} known symptoms, result mismatches: {mismatches}")
+    print_table("diagnose(symptoms)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+ml.extract_keywords fuzzy fallbacks on misspelled inputs: difflib over every keyword vs. a
+RapidFuzz cdist prefilter with difflib ranking only the survivors.
+
+    python -m benchmarks.bench_extract_fuzzy
+"""
+import random
+import re
+from difflib import get_close_matches
+
+from app.core import ml
+from benchmarks.symptom_corpus import symptom_inputs
+from benchmarks.timing import measure, print_table
+
+
+def misspell(text: str, rng: random.Random) -> str:
+    """Drop, double or swap a letter in most longer words, as on a phone keyboard."""
+    def typo(match):
+        word = match.group(0)
+        if len(word) < 4 or rng.random() < 0.3:
+            return word
+        i = rng.randrange(1, len(word) - 1)
+        edit = rng.random()
+        if edit < 0.4:
+            return word[:i] + word[i + 1:]
+        if edit < 0.7:
+            return word[:i] + word[i] + word[i:]
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return re.sub(r"[A-Za-z]+", typo, text)
+
+
+def misspelled_inputs(count: int = 400, seed: int = 11):
+    rng = random.Random(seed)
+    return [misspell(text, rng) for text in symptom_inputs(ml.risk_map.keys(), count=count, seed=seed)]
+
+
+def legacy_extract_keywords(user_input: str, cutoff=0.7):
+    """extract_keywords as it was: difflib against every keyword, once for the input and once per word."""
+    user_input_lower = user_input.lower()
+    matched = ml.keyword_matcher.find_all(user_input_lower)
+    if not matched:
+        matched.update(get_close_matches(user_input_lower, ml.risk_map.keys(), n=3, cutoff=0.6))
+    if not matched:
+        for word in re.findall(r'\b\w+\b', user_input_lower):
+            stemmed_word = ml.stemmer.stem(word)
+            close = get_close_matches(word, ml.risk_map.keys(), n=1, cutoff=cutoff)
+            if close:
+                matched.add(close[0])
+                continue
+            if stemmed_word in ml.stemmed_risk_map:
+                matched.add(ml.stemmed_risk_map[stemmed_word])
+    return sorted(matched)
+
+
+def new_extract_keywords(user_input: str):
+    return sorted(ml.extract_keywords(user_input))
+
+
+def main():
+    corpus = misspelled_inputs()
+    fallback = [text for text in corpus if not ml.keyword_matcher.find_all(text.lower())]
+    mismatches = sum(1 for text in corpus if legacy_extract_keywords(text) != new_extract_keywords(text))
+    print(f"{len(corpus)} misspelled inputs ({len(fallback)} reach the fuzzy fallback), result mismatches: {mismatches}")
+
+    rows = {
+        "legacy difflib (all)": measure(legacy_extract_keywords, corpus),
+        "rapidfuzz prefilter (all)": measure(new_extract_keywords, corpus),
+        "legacy difflib (fallback)": measure(legacy_extract_keywords, fallback),
+        "rapidfuzz prefilter (fallback)": measure(new_extract_keywords, fallback),
+    }
+    print_table("extract_keywords on misspelled input", rows)
+
+
+if __name__ == "__main__":
+    main()
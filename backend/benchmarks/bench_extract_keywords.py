@@ -0,0 +1,47 @@
+"""
+ml.extract_keywords step 1: per-call stem map + per-keyword substring scan vs. the compiled matcher.
+
+    python -m benchmarks.bench_extract_keywords
+"""
+from app.core import ml
+from benchmarks.symptom_corpus import symptom_inputs
+from benchmarks.timing import measure, print_table
+
+
+def legacy_exact_match(user_input: str):
+    """Step 1 as it was: rebuild the stem map, then one `in` test per keyword."""
+    user_input_lower = user_input.lower()
+    matched = set()
+    stemmed_risk_map = {ml.stemmer.stem(k): k for k in ml.risk_map.keys()}  # noqa: F841 - rebuilt on every call
+    for symptom in ml.risk_map.keys():
+        if symptom in user_input_lower:
+            matched.add(symptom)
+    return matched
+
+
+def legacy_scan_only(user_input: str):
+    """The substring scan alone, without the stem map rebuild."""
+    user_input_lower = user_input.lower()
+    return {symptom for symptom in ml.risk_map.keys() if symptom in user_input_lower}
+
+
+def compiled_exact_match(user_input: str):
+    return ml.keyword_matcher.find_all(user_input.lower())
+
+
+def main():
+    corpus = symptom_inputs(ml.risk_map.keys())
+    mismatches = sum(1 for text in corpus if legacy_scan_only(text) != compiled_exact_match(text))
+    print(f"{len(corpus)} inputs, {len(ml.risk_map)} keywords, result mismatches: {mismatches}")
+
+    rows = {
+        "legacy (stems + scan)": measure(legacy_exact_match, corpus[:200]),
+        "legacy scan only": measure(legacy_scan_only, corpus),
+        "compiled matcher": measure(compiled_exact_match, corpus),
+        "extract_keywords (new)": measure(ml.extract_keywords, corpus),
+    }
+    print_table("extract_keywords step 1", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+/get-flagged filtering: per-row partial_ratio scans + full sort vs. the facet index.
+
+    python -m benchmarks.bench_flagged_filter [pharmacies]
+"""
+import random
+import sys
+from rapidfuzz import fuzz
+from app.core.flagged_index import FlaggedIndex
+from benchmarks.timing import measure, print_table
+
+STATES = ["Lagos", "Abuja", "Kano", "Rivers", "Oyo", "Kaduna", "Enugu", "Ogun", "Delta", "Edo"]
+WORDS = ["Hope", "Care", "Health", "Med", "Life", "Plus", "Well", "Cure", "Family", "Trust", "Prime", "Royal"]
+DRUGS = ["Paracetamol", "Amoxicillin", "Ciprofloxacin", "Metformin", "Artemether", "Ibuprofen",
+         "Lonart", "Coartem", "Ampiclox", "Flagyl", "Augmentin", "Ventolin"]
+
+
+def synthetic_flagged(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    flagged = []
+    for i in range(count):
+        state = rng.choice(STATES)
+        flagged.append({
+            "pharmacy": f"{rng.choice(WORDS)}{rng.choice(WORDS)} Pharmacy {i}",
+            "state": state,
+            "lga": f"{state} LGA {rng.randrange(20)}",
+            "street_address": f"{rng.randrange(200)} Main St",
+            "report_count": rng.randrange(3, 60),
+            "drugs": rng.sample(DRUGS, rng.randrange(1, 4)),
+        })
+    return flagged
+
+
+def legacy_query(flagged, pharmacy=None, state=None, lga=None, drug=None,
+                 sort_by="report_count", sort_order="desc", start=0, end=10):
+    """get_flagged_pharmacies' filtering as it was."""
+    def fuzzy_match(query, target, threshold=70):
+        return fuzz.partial_ratio(query.lower(), target.lower()) >= threshold
+
+    def matches_filter(item):
+        if pharmacy and not fuzzy_match(pharmacy, item["pharmacy"]):
+            return False
+        if state and not fuzzy_match(state, item.get("state") or ""):
+            return False
+        if lga and not fuzzy_match(lga, item.get("lga") or ""):
+            return False
+        if drug and not any(fuzzy_match(drug, d) for d in item.get("drugs", [])):
+            return False
+        return True
+
+    filtered = list(filter(matches_filter, flagged))
+    filtered.sort(key=lambda x: x[sort_by].lower() if sort_by == "pharmacy" else x[sort_by], reverse=(sort_order == "desc"))
+    return filtered[start:end], len(filtered)
+
+
+QUERIES = [
+    {},
+    {"state": "Lagos"},
+    {"state": "Lagso"},  # typo: fuzzy fallback
+    {"state": "Kano", "drug": "metformin"},
+    {"pharmacy": "hopecare"},
+    {"drug": "amox", "sort_by": "pharmacy", "sort_order": "asc"},
+]
+
+
+def build_all_facets(flagged, previous=None):
+    index = FlaggedIndex(flagged, previous)
+    for name in ("pharmacy", "state", "lga", "drug"):
+        getattr(index, name)
+    index.order("report_count", "desc")
+    return index
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    flagged = synthetic_flagged(count)
+
+    index = FlaggedIndex(flagged)
+    for query in QUERIES:
+        _, legacy_total = legacy_query(flagged, **query)
+        _, index_total = index.query(**query, end=10)
+        print(f"{query}: legacy {legacy_total} matches, index {index_total}")
+
+    # A new aggregate version where only report counts changed
+    warm = build_all_facets(flagged)
+    flagged = [{**item, "report_count": item["report_count"] + 1} for item in flagged]
+
+    rows = {
+        "build all facets": measure(build_all_facets, [flagged] * 5),
+        "rebuild, same members": measure(lambda f: build_all_facets(f, previous=warm), [flagged] * 5),
+        "legacy scan + sort": measure(lambda q: legacy_query(flagged, **q), QUERIES),
+        "facet index": measure(lambda q: index.query(**q, end=10), QUERIES, repeat=20),
+    }
+    print_table(f"/get-flagged filtering over {count} flagged pharmacies", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Offline POI index: radius and k-nearest lookups over synthetic places spread across Nigeria.
+
+    python -m benchmarks.bench_poi_index [places]
+"""
+import random
+import sys
+from app.core.poi_index import PoiIndex, point_element
+from app.routers.nearby import element_to_place
+from benchmarks.timing import measure, print_table
+
+
+def synthetic_elements(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    return [
+        point_element(rng.uniform(4.3, 13.9), rng.uniform(2.7, 14.7),
+                      {"amenity": rng.choice(["pharmacy", "hospital"]), "name": f"Place {i}"})
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    index = PoiIndex(synthetic_elements(count), shape=element_to_place)
+    rng = random.Random(3)
+    points = [(rng.uniform(4.5, 13.5), rng.uniform(3.0, 14.0)) for _ in range(500)]
+
+    rows = {
+        "within 3 km, limit 50": measure(lambda p: index.within(p[0], p[1], 3000, 50), points),
+        "within 20 km, limit 50": measure(lambda p: index.within(p[0], p[1], 20000, 50), points),
+        "nearest k=10": measure(lambda p: index.nearest(p[0], p[1], 10), points),
+    }
+    print_table(f"offline POI index over {count} places", rows)
+
+
+if __name__ == "__main__":
+    main()
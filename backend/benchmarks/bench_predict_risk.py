@@ -0,0 +1,67 @@
+"""
+/predict-risk drug suggestion: full-registry ingredient scans vs. the inverted ingredient index.
+
+    python -m benchmarks.bench_predict_risk
+"""
+from app.core import ml
+from benchmarks.symptom_corpus import symptom_inputs
+from benchmarks.timing import measure, print_table
+
+
+def legacy_verify_drug_suggestions(drug_names):
+    verified_suggestions = []
+    product_names = {drug["product_name"].lower(): drug for drug in ml.verified_drugs}
+    for drug_name in drug_names:
+        normalized = drug_name.lower().strip()
+        if normalized in product_names:
+            verified_suggestions.append(product_names[normalized]["product_name"])
+            continue
+        if any(normalized in ing for ing in ml.verified_ingredients):
+            verified_suggestions.append(drug_name)
+    return verified_suggestions
+
+
+def legacy_suggestions(matched_keywords):
+    """Drug suggestion half of calculate_risk as it was before the index (verbatim)."""
+    risk_map, verified_drugs = ml.risk_map, ml.verified_drugs
+    suggested_drugs = set()
+
+    # Add common drugs from matched keywords
+    for key in matched_keywords:
+        if key in risk_map:
+            suggested_drugs.update(risk_map[key].get("common_drugs", []))
+
+    # Match ingredients from verified drugs
+    for drug in verified_drugs:
+        ingredients = drug.get("ingredients", [])
+        for ing in ingredients:
+            if any(word in ing.lower() for word in matched_keywords):
+                suggested_drugs.add(drug["product_name"])
+
+    return sorted(suggested_drugs), sorted(legacy_verify_drug_suggestions(suggested_drugs))
+
+
+def indexed_suggestions(matched_keywords):
+    suggested_drugs = set()
+    for key in matched_keywords:
+        suggested_drugs.update(ml.risk_map[key].get("common_drugs", []))
+        suggested_drugs.update(ml.ingredient_index.products_containing(key))
+    return sorted(suggested_drugs), sorted(ml.verify_drug_suggestions(suggested_drugs))
+
+
+def main():
+    corpus = symptom_inputs(ml.risk_map.keys(), count=300)
+    keyword_sets = [ml.extract_keywords(text) for text in corpus]
+    mismatches = sum(1 for keys in keyword_sets if legacy_suggestions(keys) != indexed_suggestions(keys))
+    print(f"{len(corpus)} inputs, {len(ml.verified_drugs)} registry records, result mismatches: {mismatches}")
+
+    rows = {
+        "legacy suggestions": measure(legacy_suggestions, keyword_sets),
+        "indexed suggestions": measure(indexed_suggestions, keyword_sets),
+        "calculate_risk (new)": measure(ml.calculate_risk, corpus),
+    }
+    print_table("calculate_risk drug suggestion step", rows)
+
+
+if __name__ == "__main__":
+    main()
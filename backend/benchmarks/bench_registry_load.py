@@ -0,0 +1,65 @@
+"""
+Per-worker cost of loading the drug registry: RSS growth and wall time, each variant in a fresh process.
+
+    python -m benchmarks.bench_registry_load
+"""
+import json
+import subprocess
+import sys
+
+VARIANTS = {
+    # What app.main used to do: drug_matcher, ml and the verify router each parsed their own copy
+    "legacy: 3x json.load": """
+import json
+copies = [json.load(open(DATA_FILE, encoding="utf-8")) for _ in range(3)]
+ingredients = {i.strip().lower() for d in copies[1] for i in (d.get("ingredients") or d.get("i ngredients") or [])}
+""",
+    "registry from JSON": """
+from app.core.drug_registry import DrugRegistry
+registry = DrugRegistry.from_json(DATA_FILE)
+registry.ingredient_index
+""",
+    "registry from snapshot": """
+from app.core.drug_registry import read_snapshot, SNAPSHOT_FILE
+registry = read_snapshot(SNAPSHOT_FILE)
+registry.ingredient_index
+""",
+}
+
+PROBE = """
+import gc, json, os, time
+import numpy, rapidfuzz
+from app.core.drug_registry import DATA_FILE
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+gc.collect()
+before = rss_kb()
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+gc.collect()
+print(json.dumps({{"rss_kb": rss_kb() - before, "load_ms": round(elapsed * 1000, 1)}}))
+"""
+
+
+def run(body: str, repeat: int = 5):
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(body=body)], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout))
+    samples.sort(key=lambda s: s["load_ms"])
+    return samples[len(samples) // 2]
+
+
+def main():
+    print(f"{'variant':<28}{'RSS growth (MB)':>18}{'load (ms)':>12}")
+    for label, body in VARIANTS.items():
+        result = run(body)
+        print(f"{label:<28}{result['rss_kb'] / 1024:>18.1f}{result['load_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+POST /submit-report during a burst: one Firestore add per request vs. the write-behind log
+with batched commits. Firestore is an in-memory collection that sleeps per round trip.
+
+    python -m benchmarks.bench_report_queue [latency_ms] [reports]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from app.core import db
+from app.core.report_queue import ReportQueue
+from benchmarks.bench_async_db import LatencyCollection, REPORT, run_load
+from benchmarks.timing import summarize, print_table
+
+
+def main():
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 50) / 1000
+    reports = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    collection = db.reports_collection = LatencyCollection(latency)
+
+    def batch_commit(items):
+        time.sleep(latency)  # one round trip per WriteBatch
+        for doc_id, report in items:
+            collection.documents[doc_id] = report
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.report_queue = ReportQueue(os.path.join(tmp, "queue.sqlite3"), commit=batch_commit)
+
+        for label, write_behind in (("direct add per report", False), ("write-behind log", True)):
+            db.REPORT_WRITE_BEHIND = write_behind
+            collection.documents.clear()
+            latencies, elapsed = asyncio.run(run_load(submits=reports, reads=0, pings=0))
+            start = time.perf_counter()
+            db.report_queue.drain(60)
+            drained = time.perf_counter() - start
+            rows = {"submit-report": summarize(latencies["submit-report"])}
+            print_table(
+                f"{label}: {reports} reports, {latency * 1000:.0f} ms per round trip, "
+                f"acknowledged in {elapsed:.2f} s, stored {len(collection.documents)} (+{drained:.2f} s to drain)",
+                rows,
+            )
+        print("queue:", db.report_queue.stats())
+        db.report_queue.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Cold-start profile: `python -X importtime -c "import app.main"` in a fresh interpreter,
+summarized as the slowest modules by cumulative and by self time.
+
+    python -m benchmarks.bench_startup [runs]
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Dependencies that should only load on first use, never while importing the app
+LAZY_MODULES = ("pandas", "nltk", "firebase_admin", "google.cloud.firestore")
+
+
+def profile_import(module: str = "app.main") -> dict:
+    """Import `module` in a new interpreter; returns {"total_us", "modules": [(name, self_us, cumulative_us)], "loaded_lazy"}."""
+    code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=os.environ.copy(), check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((name, int(self_us), int(cumulative_us)))
+    total = next((cumulative for name, _, cumulative in modules if name == module), 0)
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return {"total_us": total, "modules": modules, "loaded_lazy": loaded}
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    profiles = [profile_import() for _ in range(runs)]
+    best = min(profiles, key=lambda p: p["total_us"])
+
+    all_runs = ", ".join(f"{p['total_us'] / 1000:.0f}" for p in profiles)
+    print(f"import app.main: best {best['total_us'] / 1000:.0f} ms of {runs} runs ({all_runs} ms)")
+    print(f"lazy dependencies loaded at import: {', '.join(best['loaded_lazy']) or 'none'}")
+    for title, column in (("cumulative", 2), ("self", 1)):
+        print(f"\nslowest modules by {title} time")
+        print(f"{'module':<48}{'self (ms)':>12}{'cumulative (ms)':>18}")
+        for name, self_us, cumulative_us in sorted(best["modules"], key=lambda m: m[column], reverse=True)[:15]:
+            print(f"{name.strip():<48}{self_us / 1000:>12.1f}{cumulative_us / 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+/verify-drug lookup latency: legacy linear scans vs. the hash-indexed DrugRegistry.
+
+    python -m benchmarks.bench_verify
+"""
+import random
+
+from app.models.verify_model import DrugVerificationRequest
+from app.routers.verify import drug_db, handle_match, verify_drug
+from benchmarks.timing import measure, print_table
+
+
+def legacy_verify_drug(request: DrugVerificationRequest):
+    """The pre-index implementation: up to three full scans over drug_db."""
+    name = request.product_name.strip().lower() if request.product_name else None
+    reg_no = request.nafdac_reg_no.strip().lower() if request.nafdac_reg_no else None
+
+    if name and reg_no:
+        for drug in drug_db:
+            if drug["product_name"].lower() == name and drug["nafdac_reg_no"].lower() == reg_no:
+                return handle_match(drug, request)
+    if name:
+        for drug in drug_db:
+            if drug["product_name"].lower() == name:
+                return drug
+    if reg_no:
+        for drug in drug_db:
+            if drug["nafdac_reg_no"].lower() == reg_no:
+                return drug
+    return None
+
+
+def build_workload(size: int = 500, seed: int = 7):
+    rng = random.Random(seed)
+    sample = rng.sample(drug_db, size)
+    return {
+        "full match": [
+            DrugVerificationRequest(product_name=d["product_name"], nafdac_reg_no=d["nafdac_reg_no"]) for d in sample
+        ],
+        "name only": [DrugVerificationRequest(product_name=d["product_name"].upper()) for d in sample],
+        "reg no only": [DrugVerificationRequest(nafdac_reg_no=d["nafdac_reg_no"]) for d in sample],
+        "no match": [
+            DrugVerificationRequest(product_name=f"unknown drug {i}", nafdac_reg_no=f"X0-{i}") for i in range(size)
+        ],
+    }
+
+
+def main():
+    workload = build_workload()
+    rows = {}
+    for case, requests in workload.items():
+        rows[f"legacy / {case}"] = measure(legacy_verify_drug, requests)
+        rows[f"indexed / {case}"] = measure(verify_drug, requests)
+    print_table(f"verify_drug over {len(drug_db)} records", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Fuzzy /verify-drug lookups: trigram shortlist + RapidFuzz rescoring vs. brute-force process.extract.
+
+    python -m benchmarks.bench_verify_fuzzy
+"""
+import random
+
+from rapidfuzz import fuzz, process
+
+from app.core.drug_registry import normalize_name
+from app.routers.verify import drug_db, drug_registry
+from benchmarks.timing import measure, print_table
+
+
+def misspell(text: str, rng: random.Random) -> str:
+    """Drop, swap or duplicate one character, or swap spaces for dashes, the way users mistype names."""
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 2)
+    edit = rng.choice(["drop", "swap", "double", "dash"])
+    if edit == "drop":
+        return text[:i] + text[i + 1:]
+    if edit == "swap":
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if edit == "double":
+        return text[:i] + text[i] + text[i:]
+    return text.replace(" ", "-")
+
+
+def main():
+    rng = random.Random(11)
+    sample = rng.sample(drug_db, 300)
+    names = [misspell(d["product_name"], rng) for d in sample]
+    reg_nos = [d["nafdac_reg_no"].replace("-", " ") for d in sample]
+    all_names = [normalize_name(d["product_name"]) for d in drug_db]
+
+    drug_registry.search("warm up")
+    rows = {
+        "brute force / name": measure(
+            lambda q: process.extract(normalize_name(q), all_names, scorer=fuzz.WRatio, limit=5), names
+        ),
+        "trigram / name": measure(lambda q: drug_registry.search(q), names),
+        "trigram / reg no": measure(lambda q: drug_registry.search(reg_no=q), reg_nos),
+        "trigram / name + reg no": measure(lambda q: drug_registry.search(*q), list(zip(names, reg_nos))),
+    }
+    print_table(f"fuzzy verification over {len(drug_db)} records", rows)
+
+    found = sum(
+        1 for d, q in zip(sample, names)
+        if any(m["nafdac_reg_no"] == d["nafdac_reg_no"] or m["product_name"] == d["product_name"]
+               for m, _ in drug_registry.search(q))
+    )
+    print(f"\nmisspelled names whose record is in the top 5: {found}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
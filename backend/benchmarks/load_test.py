@@ -0,0 +1,321 @@
+"""
+Load test of the public endpoints at realistic data sizes, fully offline and reproducible.
+
+The app is driven in-process through httpx.ASGITransport (no network, no server), with:
+- Firestore replaced by an in-memory collection holding --reports synthetic reports, which
+  the report aggregate listens to and the write-behind queue commits into;
+- the NAFDAC registry expanded --registry-factor times and swapped in via reload_registry;
+- Overpass replaced by a fake server that makes up places in every box it is asked about.
+
+Each endpoint gets --requests requests from --concurrency concurrent clients; the results
+(throughput, p50/p95/p99, errors, dataset and setup timings, git commit) are printed as a
+table on stderr and as JSON on stdout (or to --output), so runs can be diffed:
+
+    python -m benchmarks.load_test --reports 100000 --output before.json
+    python -m benchmarks.load_test --reports 100000 --output after.json
+    python -m benchmarks.load_test --compare before.json after.json
+
+1M reports need several GB of memory and a minute or two of setup.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from app.core import db, ml
+from app.core.drug_registry import DATA_FILE, get_registry, reload_registry
+from app.core.memory_store import InMemoryCollection
+from app.core.overpass import OverpassClient
+from app.core.report_aggregate import report_aggregate
+from app.core.report_queue import ReportQueue
+from app.core.ttl_cache import TTLCache
+from app.main import app
+from app.routers import nearby
+from benchmarks.symptom_corpus import symptom_inputs
+from benchmarks.synthetic import STATES, expanded_registry, fake_overpass_app, jitter, synthetic_reports, typo
+from benchmarks.timing import summarize
+
+ENDPOINTS = ("verify-drug", "predict-risk", "get-flagged", "submit-report", "get-nearby")
+# Latency percentiles are compared on these; throughput separately
+COMPARED_STATS = ("p50_us", "p95_us", "p99_us")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# === Setup ===
+
+def setup(args, workdir: Path) -> dict:
+    """Point the app at the synthetic data; returns dataset sizes and setup timings."""
+    timings = {}
+
+    start = time.perf_counter()
+    registry_path = workdir / "verified_drugs.json"
+    expanded_registry(DATA_FILE, registry_path, args.registry_factor, args.seed)
+    registry = reload_registry(registry_path, registry_path.with_suffix(".snapshot"))
+    timings["registry_s"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    drug_names = [drug["product_name"] for drug in registry.drugs[:2000]]
+    collection = InMemoryCollection(dict(synthetic_reports(args.reports, drug_names, args.seed)))
+    timings["reports_s"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    db.reports_collection = collection
+    report_aggregate.attach(collection)
+    timings["aggregate_s"] = round(time.perf_counter() - start, 3)
+
+    def commit(items):
+        for doc_id, report in items:
+            collection.set(doc_id, report)
+
+    db.report_queue = ReportQueue(str(workdir / "report_queue.sqlite3"), commit=commit)
+    db.report_queue.start()
+
+    overpass = fake_overpass_app(per_km2=args.places_per_km2, latency=args.overpass_latency_ms / 1000)
+    nearby.offline_index = None
+    nearby.tile_cache = TTLCache(nearby.NEARBY_MAX_TILES, nearby.NEARBY_TILE_TTL)
+    nearby.overpass_client = OverpassClient(
+        urls=["http://overpass/api/interpreter"], transport=httpx.ASGITransport(app=overpass)
+    )
+
+    return {
+        "dataset": {
+            "reports": args.reports,
+            "pharmacies": len(report_aggregate.pharmacies),
+            "registry_records": len(registry),
+            "risk_keywords": len(ml.risk_map),
+        },
+        "setup_seconds": timings,
+        "overpass": overpass,
+    }
+
+
+async def teardown():
+    db.report_queue.stop()
+    report_aggregate.detach()
+    await nearby.overpass_client.aclose()
+
+
+# === Request mixes ===
+# Each returns (method, url, httpx request kwargs) for one request, drawn from rng.
+
+def verify_drug_requests(rng):
+    drugs = get_registry().drugs
+
+    def make():
+        drug = rng.choice(drugs)
+        roll = rng.random()
+        if roll < 0.6:
+            body = {"product_name": drug["product_name"], "nafdac_reg_no": drug["nafdac_reg_no"]}
+        elif roll < 0.8:
+            body = {"product_name": typo(rng, drug["product_name"])}
+        elif roll < 0.9:
+            body = {"nafdac_reg_no": drug["nafdac_reg_no"]}
+        else:
+            body = {"product_name": f"Unlisted {rng.randrange(10 ** 6)}"}
+        return "POST", "/verify-drug", {"json": body}
+    return make
+
+
+def predict_risk_requests(rng, count: int):
+    texts = symptom_inputs(ml.risk_map.keys(), count=max(count // 2, 1), seed=rng.randrange(10 ** 6))
+    # About half repeat an earlier text, as common complaints do
+    return lambda: ("POST", "/predict-risk", {"json": {"symptoms": rng.choice(texts)}})
+
+
+def get_flagged_requests(rng):
+    flagged = [p["pharmacy"] for p in report_aggregate.snapshot()[0]] or ["none"]
+
+    def make():
+        params = {"include_reports": "false", "page": rng.choice((1, 1, 1, 2, 3))}
+        roll = rng.random()
+        if roll < 0.3:
+            params["state"] = rng.choice(STATES)[0]
+        elif roll < 0.45:
+            params["pharmacy"] = rng.choice(flagged)
+        elif roll < 0.55:
+            params["sort_by"] = "pharmacy"
+        return "GET", "/get-flagged", {"params": params}
+    return make
+
+
+def submit_report_requests(rng, drug_names):
+    reports = synthetic_reports(10 ** 7, drug_names, seed=rng.randrange(10 ** 6))
+
+    def make():
+        _, report = next(reports)
+        form = {key: str(value) for key, value in report.items() if value is not None and key != "timestamp"}
+        return "POST", "/submit-report", {"data": form}
+    return make
+
+
+def get_nearby_requests(rng):
+    def make():
+        _, _, center = rng.choice(STATES)
+        lat, lng = jitter(rng, center, 10)
+        params = {"lat": lat, "lng": lng, "radius": rng.choice((500, 1000, 3000, 5000)), "limit": 50}
+        return "GET", "/get-nearby", {"params": params}
+    return make
+
+
+def request_mixes(args) -> dict:
+    rng = random.Random(args.seed)
+    drug_names = [drug["product_name"] for drug in get_registry().drugs[:2000]]
+    return {
+        "verify-drug": verify_drug_requests(rng),
+        "predict-risk": predict_risk_requests(rng, args.requests),
+        "get-flagged": get_flagged_requests(rng),
+        "submit-report": submit_report_requests(rng, drug_names),
+        "get-nearby": get_nearby_requests(rng),
+    }
+
+
+# === Load ===
+
+def failed(response: httpx.Response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # /submit-report answers 200 with status "error" when saving fails
+    return response.request.url.path == "/submit-report" and response.json().get("status") == "error"
+
+
+async def run_endpoint(client, make, requests: int, concurrency: int) -> dict:
+    calls = iter([make() for _ in range(requests)])
+    samples = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in calls:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+            errors += failed(response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        **summarize(samples),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+    }
+
+
+async def run_load(args) -> dict:
+    mixes = request_mixes(args)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+        for name in args.endpoints:
+            await run_endpoint(client, mixes[name], args.warmup, args.concurrency)
+            results[name] = await run_endpoint(client, mixes[name], args.requests, args.concurrency)
+            print(f"  {name}: {results[name]['throughput_rps']} req/s", file=sys.stderr)
+    await teardown()
+    return results
+
+
+# === Output ===
+
+def print_results(results: dict, file=sys.stderr):
+    print(f"\n{'endpoint':<16}{'req/s':>10}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}{'errors':>8}", file=file)
+    for name, stats in results.items():
+        print(
+            f"{name:<16}{stats['throughput_rps']:>10}{stats['p50_us'] / 1000:>11.2f}"
+            f"{stats['p95_us'] / 1000:>11.2f}{stats['p99_us'] / 1000:>11.2f}{stats['errors']:>8}",
+            file=file,
+        )
+
+
+def compare(before_path: str, after_path: str, threshold: float) -> int:
+    """Print per-endpoint changes between two result files; returns how many got worse than threshold percent."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    if before.get("config") != after.get("config"):
+        print("warning: the runs used different settings; numbers may not be comparable")
+
+    regressions = 0
+    print(f"{'endpoint':<16}{'stat':<16}{'before':>12}{'after':>12}{'change':>10}")
+    for name in after["endpoints"]:
+        if name not in before["endpoints"]:
+            continue
+        old, new = before["endpoints"][name], after["endpoints"][name]
+        for stat in COMPARED_STATS + ("throughput_rps",):
+            change = (new[stat] - old[stat]) / old[stat] * 100 if old[stat] else 0.0
+            # Latency going up or throughput going down is worse
+            worse = change > threshold if stat != "throughput_rps" else change < -threshold
+            regressions += worse
+            print(f"{name:<16}{stat:<16}{old[stat]:>12}{new[stat]:>12}{change:>+9.1f}%{'  !' if worse else ''}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=100_000, help="synthetic reports in the in-memory store")
+    parser.add_argument("--registry-factor", type=int, default=5, help="copies of the NAFDAC registry")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per endpoint")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--overpass-latency-ms", type=float, default=50, help="fake Overpass response time")
+    parser.add_argument("--places-per-km2", type=float, default=5, help="fake Overpass place density")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change --compare counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"setting up {args.reports} reports, registry x{args.registry_factor}...", file=sys.stderr)
+        info = setup(args, Path(workdir))
+        endpoints = asyncio.run(run_load(args))
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold")}
+    result = {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "dataset": info["dataset"],
+        "setup_seconds": info["setup_seconds"],
+        "overpass_queries": info["overpass"].state.queries,
+        "endpoints": endpoints,
+    }
+    print_results(endpoints)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Synthetic but realistic free-text symptom descriptions, built from the keyword risk map.
+"""
+import random
+
+TEMPLATES = [
+    "{a}",
+    "{a} and {b}",
+    "I have {a}",
+    "I have had {a} and {b} since yesterday",
+    "my child has {a}, {b} and is not eating",
+    "{a} for three days, also {b}",
+    "severe {a} at night",
+    "feeling weak with {a} and {b} after eating",
+    "my mother complains of {a}. she also has {b} and {c}",
+    "I think it is {a} because I have {b}",
+    "no {a} but I have {b} and a little {c} in the morning",
+    "please help, {a} {b} {c}",
+]
+
+FILLER = ["body pains", "tired", "since last week", "on and off", "very bad", "after work"]
+
+
+def symptom_inputs(keywords, count: int = 1000, seed: int = 3):
+    """count free-text inputs mentioning one to three of the given keywords."""
+    rng = random.Random(seed)
+    keywords = list(keywords)
+    inputs = []
+    for _ in range(count):
+        a, b, c = rng.sample(keywords, 3)
+        text = rng.choice(TEMPLATES).format(a=a, b=b, c=c)
+        if rng.random() < 0.3:
+            text = f"{text} {rng.choice(FILLER)}"
+        inputs.append(text.capitalize() if rng.random() < 0.5 else text)
+    return inputs
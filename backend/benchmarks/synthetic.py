@@ -0,0 +1,167 @@
+"""
+Seeded synthetic datasets for the load test: pharmacy reports, an expanded NAFDAC registry,
+and a fake Overpass server that makes up places inside whatever boxes it is asked about.
+
+Everything is derived from the seed, so two runs (or two commits) see the same data.
+"""
+import asyncio
+import json
+import random
+import re
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+
+# Report locations: (state, LGAs, (lat, lng) of the state's main city)
+STATES = [
+    ("lagos", ["ikeja", "surulere", "eti-osa", "alimosho", "kosofe", "mushin"], (6.5244, 3.3792)),
+    ("fct", ["abuja municipal", "bwari", "gwagwalada", "kuje"], (9.0765, 7.3986)),
+    ("kano", ["kano municipal", "nassarawa", "fagge", "tarauni"], (12.0022, 8.5920)),
+    ("rivers", ["port harcourt", "obio/akpor", "eleme"], (4.8156, 7.0498)),
+    ("oyo", ["ibadan north", "ibadan south-west", "ogbomosho north"], (7.3775, 3.9470)),
+    ("enugu", ["enugu north", "enugu south", "nsukka"], (6.4584, 7.5464)),
+    ("kaduna", ["kaduna north", "kaduna south", "zaria"], (10.5105, 7.4165)),
+    ("anambra", ["onitsha north", "awka south", "nnewi north"], (6.2104, 7.0720)),
+]
+
+PHARMACY_WORDS = ["health", "plus", "care", "med", "life", "hope", "alpha", "city", "family", "royal", "unity", "grace"]
+PHARMACY_SUFFIXES = ["pharmacy", "pharmacy ltd", "chemist", "pharmaceuticals", "drug store"]
+DESCRIPTIONS = [
+    "Tablets crumble in the pack",
+    "Packaging looks different from the usual one",
+    "No NAFDAC number on the box",
+    "Expired stock sold as new",
+    "Syrup has an unusual colour and smell",
+    "Seal was broken before purchase",
+    "Drug did not work at all",
+]
+REPORT_WINDOW_DAYS = 90
+
+
+def jitter(rng, center, km: float):
+    """A point within about km kilometres of center."""
+    lat, lng = center
+    return round(lat + rng.uniform(-km, km) / 111.0, 6), round(lng + rng.uniform(-km, km) / 111.0, 6)
+
+
+def pharmacies(count: int, seed: int = 11) -> list:
+    """count distinct pharmacies as (name, state, lga, (lat, lng))."""
+    rng = random.Random(seed)
+    result, seen = [], set()
+    for i in range(count):
+        state, lgas, center = rng.choice(STATES)
+        name = f"{rng.choice(PHARMACY_WORDS)}{rng.choice(PHARMACY_WORDS)} {rng.choice(PHARMACY_SUFFIXES)}"
+        if name in seen:
+            name = f"{name} {i}"  # another branch of a common name
+        seen.add(name)
+        result.append((name, state, rng.choice(lgas), jitter(rng, center, 15)))
+    return result
+
+
+def skewed_index(rng, size: int, alpha: float) -> int:
+    """Half the picks follow a Pareto tail (a few items get most of them), half are uniform."""
+    if rng.random() < 0.5:
+        return min(int(rng.paretovariate(alpha)) - 1, size - 1)
+    return rng.randrange(size)
+
+
+def synthetic_reports(count: int, drug_names, seed: int = 7, now: datetime = None):
+    """
+    Yield (doc_id, report) pairs shaped like /submit-report documents, spread over the last
+    REPORT_WINDOW_DAYS. Pharmacies and drugs are skewed (a few get most of the reports), as in
+    real traffic, and about half the reports carry coordinates.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    shops = pharmacies(max(50, count // 20), seed)
+    drug_names = list(drug_names)
+    for i in range(count):
+        name, state, lga, location = shops[skewed_index(rng, len(shops), 1.2)]
+        drug = drug_names[skewed_index(rng, len(drug_names), 1.1)]
+        located = rng.random() < 0.5
+        yield f"synthetic-{i:07d}", {
+            "drug_name": drug.lower(),
+            "nafdac_reg_no": None,
+            "pharmacy_name": name,
+            "description": rng.choice(DESCRIPTIONS),
+            "state": state,
+            "lga": lga,
+            "street_address": None,
+            "latitude": location[0] if located else None,
+            "longitude": location[1] if located else None,
+            "timestamp": (now - timedelta(seconds=rng.uniform(0, REPORT_WINDOW_DAYS * 86400))).isoformat(),
+            "image_url": None,
+        }
+
+
+def expanded_registry(source: Path, target: Path, factor: int, seed: int = 13) -> int:
+    """
+    Write a registry `factor` times the size of `source` to `target`: each copy of a record
+    gets a suffixed product name and registration number, so every index grows with it.
+    Returns the number of records written.
+    """
+    rng = random.Random(seed)
+    with open(source, encoding="utf-8") as f:
+        drugs = json.load(f)
+    expanded = list(drugs)
+    for copy in range(1, factor):
+        for drug in drugs:
+            expanded.append({
+                **drug,
+                "product_name": f"{drug['product_name']} {rng.choice(PHARMACY_WORDS).title()}-{copy}",
+                "nafdac_reg_no": f"{drug.get('nafdac_reg_no') or 'X0-0'}-{copy}",
+            })
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(expanded, f)
+    return len(expanded)
+
+
+def typo(rng, word: str) -> str:
+    """Drop or double one letter, as users do."""
+    if len(word) < 2:
+        return word
+    i = rng.randrange(len(word))
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i] + word[i:]
+
+
+# === Fake Overpass ===
+
+BOX_PATTERN = re.compile(r"\((-?[\d.]+),(-?[\d.]+),(-?[\d.]+),(-?[\d.]+)\);")
+
+
+def places_in_box(south: float, west: float, north: float, east: float, per_km2: float) -> list:
+    """Overpass elements for one box; the same box always gets the same places."""
+    rng = random.Random(zlib.crc32(f"{south:.6f},{west:.6f},{north:.6f},{east:.6f}".encode()))
+    area_km2 = (north - south) * 111.0 * (east - west) * 111.0
+    count = min(2000, int(area_km2 * per_km2 + rng.random()))
+    elements = []
+    for i in range(count):
+        amenity = "pharmacy" if rng.random() < 0.7 else "hospital"
+        tags = {"amenity": amenity, "name": f"{rng.choice(PHARMACY_WORDS).title()} {amenity.title()} {i}"}
+        if rng.random() < 0.5:
+            tags["addr:street"] = f"{rng.randint(1, 200)} {rng.choice(PHARMACY_WORDS).title()} Street"
+        lat, lng = rng.uniform(south, north), rng.uniform(west, east)
+        if rng.random() < 0.3:
+            elements.append({"type": "way", "center": {"lat": lat, "lon": lng}, "tags": tags})
+        else:
+            elements.append({"type": "node", "lat": lat, "lon": lng, "tags": tags})
+    return elements
+
+
+def fake_overpass_app(per_km2: float = 5.0, latency: float = 0.0) -> FastAPI:
+    """An Overpass interpreter answering box queries with places_in_box, after `latency` seconds."""
+    app = FastAPI()
+    app.state.queries = 0
+
+    @app.post("/api/interpreter")
+    async def interpreter(request: Request):
+        form = await request.form()
+        app.state.queries += 1
+        if latency:
+            await asyncio.sleep(latency)
+        boxes = [tuple(map(float, match)) for match in BOX_PATTERN.findall(form["data"])]
+        return {"elements": [element for box in boxes for element in places_in_box(*box, per_km2)]}
+
+    return app
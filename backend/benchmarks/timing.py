@@ -0,0 +1,50 @@
+"""
+Small timing helpers shared by the benchmark scripts.
+
+Run any benchmark from the backend directory, e.g.:
+
+    python -m benchmarks.bench_verify
+"""
+import statistics
+import time
+
+
+def measure(fn, inputs, repeat: int = 1):
+    """
+    Call ``fn`` once per item in ``inputs`` (``repeat`` times over) and return latency stats in microseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    """Reduce a list of latency samples (microseconds) to count/mean/p50/p95/p99."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_us": round(statistics.fmean(ordered), 2) if ordered else 0.0,
+        "p50_us": round(percentile(ordered, 50), 2),
+        "p95_us": round(percentile(ordered, 95), 2),
+        "p99_us": round(percentile(ordered, 99), 2),
+    }
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def print_table(title, rows):
+    """Print ``{label: stats}`` rows as an aligned table."""
+    print(f"\n{title}")
+    print(f"{'case':<28}{'p50 (us)':>12}{'p95 (us)':>12}{'p99 (us)':>12}{'mean (us)':>12}")
+    for label, stats in rows.items():
+        print(f"{label:<28}{stats['p50_us']:>12}{stats['p95_us']:>12}{stats['p99_us']:>12}{stats['mean_us']:>12}")
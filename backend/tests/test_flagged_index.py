@@ -0,0 +1,25 @@
+from app.core.flagged_index import FlaggedIndex
+
+def test_flagged_index_facets_and_sorting():
+    flagged = [
+        {"pharmacy": "HopeMed Ikeja", "state": "Lagos", "lga": "Ikeja", "report_count": 4, "drugs": ["Paracetamol"]},
+        {"pharmacy": "CarePlus", "state": "Lagos", "lga": "Yaba", "report_count": 9, "drugs": ["Amoxicillin", "Lonart"]},
+        {"pharmacy": "Hope Pharmacy", "state": "Oyo", "lga": "Ibadan North", "report_count": 4, "drugs": ["Lonart"]},
+    ]
+    index = FlaggedIndex(flagged)
+
+    def names(**query):
+        page, total = index.query(**query)
+        assert total == len(page)
+        return [item["pharmacy"] for item in page]
+
+    assert names() == ["CarePlus", "HopeMed Ikeja", "Hope Pharmacy"]
+    assert names(sort_by="pharmacy", sort_order="asc") == ["CarePlus", "Hope Pharmacy", "HopeMed Ikeja"]
+    assert names(state=" lagos ") == ["CarePlus", "HopeMed Ikeja"]
+    assert names(state="Lagso") == ["CarePlus", "HopeMed Ikeja"]  # fuzzy fallback
+    assert names(pharmacy="hope") == ["HopeMed Ikeja", "Hope Pharmacy"]
+    assert names(pharmacy="hope", drug="lon") == ["Hope Pharmacy"]
+    assert names(lga="Surulere") == []
+
+    page, total = index.query(start=1, end=2)
+    assert total == 3 and page == [flagged[0]]
@@ -82,6 +82,37 @@ def test_get_flagged_filter_pharmacy(mock_stream_func):
     assert len(flagged) == 1
     assert flagged[0]["pharmacy"] == "HopeMed Ikeja"
 
+@patch("app.core.db.reports_collection.stream", side_effect=mock_stream)
+def test_get_flagged_lean_and_not_modified(mock_stream_func):
+    response = client.get("/get-flagged", params={"include_reports": "false"})
+    assert response.status_code == 200
+    assert "all_reports" not in response.json()
+    assert len(client.get("/get-flagged").json()["all_reports"]) == len(mock_reports)
+
+    etag = response.headers["etag"]
+    cached = client.get("/get-flagged", params={"include_reports": "false"}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    # Different parameters are a different representation
+    other = client.get("/get-flagged", params={"include_reports": "false", "page": 2}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+@patch("app.core.db.reports_collection.stream", side_effect=mock_stream)
+def test_get_reports_feed_cursor(mock_stream_func):
+    first = client.get("/get-flagged/reports", params={"limit": 3}).json()
+    assert first["count"] == 3
+    assert first["has_more"]
+
+    rest = client.get("/get-flagged/reports", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    assert rest["count"] == len(mock_reports) - 3
+    assert not rest["has_more"]
+    assert first["reports"] + rest["reports"] == mock_reports
+
+    # Nothing new after the last cursor; a malformed cursor starts over
+    assert client.get("/get-flagged/reports", params={"cursor": rest["next_cursor"]}).json()["count"] == 0
+    assert client.get("/get-flagged/reports", params={"cursor": "stale.3"}).json()["count"] == len(mock_reports)
+
 @patch("app.core.db.reports_collection.where")
 def test_get_reports_for_pharmacy(mock_where):
     pharmacy_name = "HopeMed Ikeja"
@@ -104,3 +135,123 @@ def test_get_reports_for_pharmacy_not_found(mock_where):
     assert response.status_code == 404
     data = response.json()
     assert data["detail"] == "No reports found for this pharmacy"
+
+@patch("app.core.db.reports_collection.where")
+def test_get_reports_for_pharmacy_pages_and_time_range(mock_where):
+    docs = []
+    for day in range(1, 6):
+        doc = MockDoc({**mock_reports[0], "timestamp": f"2025-03-0{day}T10:00:00"})
+        doc.id = f"d{day}"
+        docs.append(doc)
+    mock_where.return_value.stream = lambda: iter(docs)
+
+    first = client.get("/get-flagged/HopeMed Ikeja/reports", params={"limit": 2}).json()
+    assert [r["timestamp"][:10] for r in first["reports"]] == ["2025-03-05", "2025-03-04"]
+    assert first["report_count"] == 5 and first["has_more"]
+    mock_where.assert_called_with("pharmacy_name", "==", "hopemed ikeja")
+
+    rest = client.get("/get-flagged/HopeMed Ikeja/reports", params={"limit": 5, "cursor": first["next_cursor"]}).json()
+    assert [r["timestamp"][:10] for r in rest["reports"]] == ["2025-03-03", "2025-03-02", "2025-03-01"]
+    assert rest["next_cursor"] is None
+
+    ranged = client.get("/get-flagged/HopeMed Ikeja/reports", params={"since": "2025-03-02", "until": "2025-03-04T00:00:00Z"}).json()
+    assert ranged["report_count"] == 2
+    assert client.get("/get-flagged/HopeMed Ikeja/reports", params={"since": "last week"}).status_code == 400
+
+
+def test_report_aggregate_follows_listener():
+    from app.core.memory_store import InMemoryCollection
+    from app.core.report_aggregate import ReportAggregate
+
+    collection = InMemoryCollection({f"r{i}": report for i, report in enumerate(mock_reports)})
+    aggregate = ReportAggregate()
+    aggregate.attach(collection)
+    assert aggregate.live
+
+    flagged, summary, reports = aggregate.snapshot()
+    assert [p["pharmacy"] for p in flagged] == ["HopeMed Ikeja"]
+    assert summary["total_reports"] == 5
+
+    # A third HealthPlus report flags it too; deleting one unflags the first
+    _, ref = collection.add({**mock_reports[3], "drug_name": "Ampiclox"})
+    collection.delete("r0")
+    flagged, summary, reports = aggregate.snapshot()
+    assert [p["pharmacy"] for p in flagged] == ["HealthPlus"]
+    assert sorted(flagged[0]["drugs"]) == ["Ampiclox", "Paracetamol"]
+    assert summary["total_reports"] == 5
+
+    # Re-applying a report the listener already delivered is a no-op
+    aggregate.upsert(ref.id, collection.documents[ref.id])
+    assert aggregate.snapshot()[1]["total_reports"] == 5
+
+    aggregate.detach()
+    collection.add(mock_reports[0])
+    assert not aggregate.live
+    assert aggregate.snapshot()[1]["total_reports"] == 5
+
+
+def test_heatmap_bins_follow_aggregate():
+    from app.core.geo import geohash_encode
+    from app.core.report_aggregate import ReportAggregate
+
+    aggregate = ReportAggregate()
+    aggregate.reset((f"r{i}", report) for i, report in enumerate(mock_reports))
+    aggregate.upsert("ikeja", {**mock_reports[0], "latitude": 6.6018, "longitude": 3.3515})
+    aggregate.upsert("yaba", {**mock_reports[3], "latitude": 6.5095, "longitude": 3.3711})
+
+    _, states = aggregate.heatmap("state")
+    assert states == [{"state": "lagos", "reports": 7, "flagged_pharmacies": 2}]
+    _, lgas = aggregate.heatmap("lga")
+    assert [(b["lga"], b["reports"]) for b in lgas] == [("ikeja", 4), ("yaba", 3)]
+
+    # Both points share a coarse cell and split at a finer one
+    _, coarse = aggregate.heatmap("geohash", 4)
+    assert [b["reports"] for b in coarse] == [2]
+    _, fine = aggregate.heatmap("geohash", 6)
+    assert len(fine) == 2 and all(b["geohash"].startswith(coarse[0]["geohash"]) for b in fine)
+
+    aggregate.remove("yaba")
+    assert [b["geohash"] for b in aggregate.heatmap("geohash", 6)[1]] == [geohash_encode(6.6018, 3.3515, 6)]
+    assert aggregate.heatmap("lga")[1][1]["reports"] == 2
+
+@patch("app.core.db.reports_collection.stream", side_effect=mock_stream)
+def test_get_heatmap(mock_stream_func):
+    data = client.get("/get-flagged/heatmap", params={"level": "lga"}).json()
+    assert [(b["lga"], b["reports"]) for b in data["bins"]] == [("ikeja", 3), ("yaba", 2)]
+    assert data["total_reports"] == len(mock_reports)
+    assert data["located_reports"] == 0
+
+    assert client.get("/get-flagged/heatmap", params={"level": "geohash"}).json()["bins"] == []
+    assert client.get("/get-flagged/heatmap", params={"level": "country"}).status_code == 422
+
+
+submitted_report = {
+    "drug_name": "Paracetamol",
+    "pharmacy_name": "HopeMed Ikeja",
+    "description": "Tablets crumble",
+    "state": "Lagos",
+    "lga": "Ikeja",
+}
+
+def memory_commit(collection):
+    def commit(items):
+        for doc_id, report in items:
+            collection.set(doc_id, report)
+    return commit
+
+def test_submit_report_updates_aggregate(tmp_path):
+    from app.core.memory_store import InMemoryCollection
+    from app.core.report_aggregate import ReportAggregate
+    from app.core.report_queue import ReportQueue
+
+    collection = InMemoryCollection()
+    aggregate = ReportAggregate()
+    queue = ReportQueue(str(tmp_path / "queue.sqlite3"), commit=memory_commit(collection))
+    with patch("app.core.db.report_queue", queue), patch("app.routers.report.report_aggregate", aggregate):
+        response = client.post("/submit-report", data=submitted_report)
+        assert response.json()["status"] == "success"
+        queue.stop()
+
+    [doc_id] = collection.documents
+    assert aggregate.reports[doc_id]["pharmacy_name"] == "hopemed ikeja"
+    assert queue.stats()["flushed"] == 1
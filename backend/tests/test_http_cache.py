@@ -0,0 +1,58 @@
+import gzip
+import json
+import secrets
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core import http_cache
+from app.core.http_cache import BodyCache, cached_json_response
+
+reports = [{"id": i, "description": f"report number {i}"} for i in range(200)]
+
+app = FastAPI()
+
+@app.get("/page/{page}")
+async def page(request: Request, page: int, include_reports: bool = True):
+    def build():
+        return {"page": page, "items": [page] * 3}
+    splice = ("all_reports", "reports-v1", lambda: reports) if include_reports else None
+    return cached_json_response(request, f"page-{page}-{include_reports}", build, splice=splice)
+
+client = TestClient(app)
+
+def test_spliced_part_is_cached_once_and_gzip_decodes(monkeypatch):
+    cache = BodyCache(max_bytes=10 ** 6)
+    monkeypatch.setattr(http_cache, "body_cache", cache)
+
+    for page in (1, 2, 3):
+        response = client.get(f"/page/{page}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == {"page": page, "items": [page] * 3, "all_reports": reports}
+        raw = client.get(f"/page/{page}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in raw.headers
+        assert json.loads(raw.content) == response.json()
+
+    # The reports are stored once, not once per page
+    assert sum(1 for etag in cache.entries if etag == "reports-v1") == 1
+    assert cache.size < 2 * len(cache.entries["reports-v1"].raw) + 3000
+    assert client.get("/page/1", params={"include_reports": "false"}).json() == {"page": 1, "items": [1, 1, 1]}
+
+def test_gzip_join_is_one_valid_member():
+    pieces = (b'{"a":' + b"1" * 5000, b',"b":' + b"x" * 3000, b"}")
+    body = http_cache.gzip_join(pieces, [http_cache.deflate_segment(p) for p in pieces])
+    assert gzip.decompress(body) == b"".join(pieces)
+
+def test_body_cache_bounded_by_bytes():
+    cache = BodyCache(max_bytes=4500)
+    for i in range(10):
+        cache.get_or_build(f"e{i}", lambda: secrets.token_hex(500))
+    assert cache.size <= 4500
+    assert list(cache.entries) == [f"e{i}" for i in range(6, 10)]
+
+    # Compressed variants count too, and evict older bodies
+    cache.encode(cache.entries["e9"], "gzip")
+    assert cache.size <= 4500 and "e6" not in cache.entries
+
+    # A body bigger than the whole cache is still served, just not kept
+    big = cache.get_or_build("big", lambda: "y" * 10000)
+    assert len(big.raw) > 10000 and "big" not in cache.entries
+    assert cache.size == sum(entry.size for entry in cache.entries.values())
@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+from starlette.datastructures import UploadFile
+from app.core.image_store import save_upload, ImageTooLarge, CHUNK_SIZE
+
+def test_save_upload_dedups_and_limits_size(tmp_path):
+    photo = b"\xff\xd8\xff\xe0" + bytes(range(256)) * (CHUNK_SIZE // 100)
+    upload_dir = str(tmp_path)
+
+    first = asyncio.run(save_upload(UploadFile(io.BytesIO(photo), filename="pack.jpeg"), upload_dir))
+    second = asyncio.run(save_upload(UploadFile(io.BytesIO(photo), filename="same-pack.JPG"), upload_dir))
+    assert first == second
+    assert first.endswith(".jpg")
+    with open(first, "rb") as f:
+        assert f.read() == photo
+
+    with pytest.raises(ImageTooLarge):
+        asyncio.run(save_upload(UploadFile(io.BytesIO(photo), filename="big.jpg"), upload_dir, max_bytes=CHUNK_SIZE))
+
+    stored = [name for _, _, files in os.walk(upload_dir) for name in files]
+    assert stored == [os.path.basename(first)]
+
+def test_processed_image_is_stripped_thumbnailed_and_named_by_content(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    from app.core import image_store
+
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    exif[0x8825] = {2: (6.0, 31.0, 0.0)}  # GPSInfo: latitude
+    photo = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 30, 30)).save(photo, "JPEG", exif=exif)
+    upload_dir = str(tmp_path)
+
+    try:
+        path = asyncio.run(save_upload(UploadFile(io.BytesIO(photo.getvalue()), filename="pack.jpg"), upload_dir))
+        again = asyncio.run(save_upload(UploadFile(io.BytesIO(photo.getvalue()), filename="pack.jpg"), upload_dir))
+    finally:
+        image_store.shutdown_processing()
+    assert again == path
+
+    with open(path, "rb") as f:
+        stored = f.read()
+    digest = hashlib.sha256(stored).hexdigest()
+    assert os.path.basename(path) == digest + ".jpg"
+    with Image.open(path) as image:
+        assert image.size == (800, 600)
+        assert not image.getexif()
+
+    with Image.open(os.path.join(upload_dir, "thumbs", digest + ".jpg")) as thumbnail:
+        assert max(thumbnail.size) <= max(image_store.THUMBNAIL_SIZE)
+    stored_files = [name for _, _, files in os.walk(upload_dir) for name in files]
+    assert sorted(stored_files) == sorted([digest + ".jpg"] * 2)
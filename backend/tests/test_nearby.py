@@ -0,0 +1,129 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.main import app
+from app.core.overpass import OverpassClient, OverpassError
+from app.core.ttl_cache import TTLCache
+
+client = TestClient(app)
+
+fake_elements = [
+    {"type": "node", "lat": 6.601, "lon": 3.351, "tags": {"amenity": "hospital", "name": "Ikeja General"}},
+    {"type": "way", "center": {"lat": 6.602, "lon": 3.352},
+     "tags": {"amenity": "pharmacy", "name": "HopeMed", "addr:street": "Allen Avenue", "addr:city": "Ikeja"}},
+    {"type": "node", "tags": {"amenity": "pharmacy", "name": "No location"}},
+]
+
+# Local fake Overpass: "down" fails, "slow" answers late, anything else answers at once
+fake_overpass = FastAPI()
+fake_queries = []
+
+@fake_overpass.post("/api/interpreter")
+async def interpreter(request: Request):
+    form = await request.form()
+    fake_queries.append((request.url.hostname, form["data"]))
+    if request.url.hostname == "down":
+        return Response(status_code=429)
+    if request.url.hostname == "slow":
+        await asyncio.sleep(1)
+    return {"elements": fake_elements}
+
+def fake_client(*hosts, hedge_delay=0.05):
+    return OverpassClient(
+        urls=[f"http://{host}/api/interpreter" for host in hosts],
+        hedge_delay=hedge_delay,
+        transport=httpx.ASGITransport(app=fake_overpass),
+    )
+
+def test_get_nearby_combined_query_with_fallback():
+    fake_queries.clear()
+    with patch("app.routers.nearby.overpass_client", fake_client("down", "mirror")), \
+            patch("app.routers.nearby.tile_cache", TTLCache(100, 60)):
+        response = client.get("/get-nearby", params={"lat": 6.6, "lng": 3.35, "radius": 1000})
+    assert response.status_code == 200
+    places = response.json()
+    # Nearest first, with distances filled in
+    assert [(p["name"], p["type"]) for p in places] == [("Ikeja General", "Hospital"), ("HopeMed", "Pharmacy")]
+    assert [p["distance_meters"] for p in places] == [157, 313]
+    assert places[1]["address"] == "Allen Avenue, Ikeja"
+
+    # One query per endpoint, covering both amenity types
+    assert [host for host, _ in fake_queries] == ["down", "mirror"]
+    assert '"amenity"~"^(pharmacy|hospital)$"' in fake_queries[0][1]
+
+def test_get_nearby_reuses_cached_tiles():
+    fake_queries.clear()
+    with patch("app.routers.nearby.overpass_client", fake_client("mirror")), \
+            patch("app.routers.nearby.tile_cache", TTLCache(100, 60)) as tiles:
+        first = client.get("/get-nearby", params={"lat": 6.6, "lng": 3.35, "radius": 1000}).json()
+        assert len(fake_queries) == 1
+
+        # A nearby, smaller search is answered from the cached cells
+        nearer = client.get("/get-nearby", params={"lat": 6.6005, "lng": 3.3505, "radius": 200, "limit": 1}).json()
+        assert len(fake_queries) == 1
+        assert tiles.hits > 0
+
+    assert [p["name"] for p in first] == ["Ikeja General", "HopeMed"]
+    assert [p["name"] for p in nearer] == ["Ikeja General"]
+
+def test_get_nearby_wide_radius_uses_one_around_query():
+    from app.routers.nearby import tile_cover, MAX_TILES_PER_QUERY
+
+    assert len(tile_cover(6.6, 3.35, 40000)) <= MAX_TILES_PER_QUERY
+    assert tile_cover(6.6, 3.35, 50000) is None  # would need continent-sized cells
+
+    fake_queries.clear()
+    with patch("app.routers.nearby.overpass_client", fake_client("mirror")), \
+            patch("app.routers.nearby.tile_cache", TTLCache(100, 60)) as tiles:
+        places = client.get("/get-nearby", params={"lat": 6.6, "lng": 3.35, "radius": 50000}).json()
+        assert len(tiles) == 0
+    assert [p["name"] for p in places] == ["Ikeja General", "HopeMed"]
+    [(_, query)] = fake_queries
+    assert "(around:50000,6.6,3.35)" in query
+
+def test_overpass_hedges_slow_endpoint_and_reports_failure():
+    fake_queries.clear()
+    elements = asyncio.run(fake_client("slow", "mirror").amenities_around(6.6, 3.35, 1000, ["pharmacy"]))
+    assert len(elements) == len(fake_elements)
+    assert [host for host, _ in fake_queries] == ["slow", "mirror"]
+
+    with patch("app.routers.nearby.overpass_client", fake_client("down", "down")), \
+            patch("app.routers.nearby.tile_cache", TTLCache(100, 60)):
+        response = client.get("/get-nearby", params={"lat": 6.6, "lng": 3.35})
+    assert response.status_code == 500
+
+    with pytest.raises(OverpassError):
+        asyncio.run(fake_client("down").query("[out:json];"))
+
+def test_offline_index_answers_without_overpass(tmp_path):
+    from app.core.poi_index import PoiIndex, elements_from_geojson
+    from app.routers.nearby import element_to_place
+
+    extract = tmp_path / "extract.geojson"
+    extract.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [3.351, 6.601]},
+         "properties": {"amenity": "hospital", "name": "Ikeja General"}},
+        {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[[3.351, 6.601], [3.353, 6.601], [3.353, 6.603], [3.351, 6.603]]]},
+         "properties": {"tags": {"amenity": "pharmacy", "name": "HopeMed", "addr:street": "Allen Avenue"}}},
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [7.49, 9.06]},
+         "properties": {"amenity": "pharmacy", "name": "Abuja Pharmacy"}},
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [3.35, 6.6]},
+         "properties": {"amenity": "school", "name": "Not a POI"}},
+    ]}))
+    PoiIndex(elements_from_geojson(extract)).save(tmp_path / "poi.npz")
+    index = PoiIndex.load(tmp_path / "poi.npz", shape=element_to_place)
+    assert len(index) == 3
+
+    fake_queries.clear()
+    with patch("app.routers.nearby.offline_index", index):
+        places = client.get("/get-nearby", params={"lat": 6.6, "lng": 3.35, "radius": 1000}).json()
+        nearest = client.get("/get-nearby/nearest", params={"lat": 6.6, "lng": 3.35, "k": 3}).json()
+    assert fake_queries == []
+
+    assert [(p["name"], p["distance_meters"]) for p in places] == [("Ikeja General", 157), ("HopeMed", 313)]
+    assert places[1]["address"] == "Allen Avenue"
+    assert [p["name"] for p in nearest] == ["Ikeja General", "HopeMed", "Abuja Pharmacy"]
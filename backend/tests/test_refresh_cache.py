@@ -0,0 +1,33 @@
+import asyncio
+from app.core.refresh_cache import RefreshCache
+
+def test_refresh_cache_single_flight_and_stale_while_revalidate():
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    async def scenario():
+        refresh_cache = RefreshCache(refresh, ttl=60, stale_ttl=60)
+        # Cold start: ten concurrent callers share one refresh
+        await asyncio.gather(*(refresh_cache.ensure() for _ in range(10)))
+        assert len(calls) == 1 and refresh_cache.coalesced == 9
+        await refresh_cache.ensure()
+        assert refresh_cache.hits == 1
+
+        # Stale: served at once while a single background refresh runs
+        refresh_cache.refreshed_at -= 90
+        await asyncio.gather(*(refresh_cache.ensure() for _ in range(5)))
+        assert refresh_cache.stale_hits == 5 and len(calls) == 2
+        await asyncio.sleep(0.1)
+        assert refresh_cache.age < 1
+
+        # Expired past the stale window: callers wait again
+        refresh_cache.refreshed_at -= 500
+        await refresh_cache.ensure()
+        assert len(calls) == 3 and refresh_cache.misses == 11
+        return refresh_cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["background_refreshes"] == 1 and stats["failed_refreshes"] == 0
@@ -0,0 +1,79 @@
+import pytest
+from app.core.memory_store import InMemoryCollection
+from app.core.report_aggregate import ReportAggregate
+
+reports = [
+    (f"doc-{i}", {
+        "pharmacy_name": "HopeMed Ikeja" if i % 2 else "HealthPlus",
+        "state": "Lagos",
+        "drug_name": "Coartem",
+        "timestamp": f"2026-03-0{1 + i % 3}T10:00:00",
+    })
+    for i in range(7)
+]
+
+def test_digest_and_feed_order_do_not_depend_on_the_process():
+    synced, followed = ReportAggregate(), ReportAggregate()
+    synced.reset(reports)
+    for doc_id, report in reversed(reports):
+        followed.upsert(doc_id, report)
+    assert synced.digest == followed.digest
+    assert synced.report_list() == followed.report_list()
+
+    # A cursor handed out by one process pages the other, and survives a re-sync
+    page, cursor, has_more = synced.feed(None, 3)
+    assert has_more and cursor == ("2026-03-01T10:00:00", "doc-6")
+    synced.reset(reports)
+    assert followed.feed(cursor, 10)[0] == synced.feed(cursor, 10)[0]
+    assert page + followed.feed(cursor, 10)[0] == [report for _, report in sorted(reports, key=lambda r: (r[1]["timestamp"], r[0]))]
+
+def test_digest_follows_changes_and_removals():
+    aggregate = ReportAggregate()
+    aggregate.reset(reports)
+    before = aggregate.digest
+    aggregate.upsert("doc-9", {**reports[0][1], "timestamp": "2026-03-09T10:00:00"})
+    assert aggregate.digest != before
+    assert aggregate.feed(("2026-03-03T10:00:00", "doc-5"), 10)[0][-1]["timestamp"] == "2026-03-09T10:00:00"
+    aggregate.remove("doc-9")
+    assert aggregate.digest == before
+    assert len(aggregate.feed(None, 100)[0]) == len(reports)
+
+def test_unchanged_upsert_is_not_a_new_version():
+    aggregate = ReportAggregate()
+    aggregate.reset(reports)
+    version = aggregate.version
+    aggregate.upsert("doc-3", dict(reports[3][1]))
+    assert aggregate.version == version
+    aggregate.upsert("doc-3", {**reports[3][1], "drug_name": "Ampiclox"})
+    assert aggregate.version == version + 1
+
+def test_flagged_list_only_changes_with_a_flagged_pharmacy():
+    aggregate = ReportAggregate()
+    aggregate.reset(reports)
+    _, flagged, _ = aggregate.versioned_snapshot()
+    assert sorted(p["pharmacy"] for p in flagged) == ["HealthPlus", "HopeMed Ikeja"]
+
+    # A report for an unflagged pharmacy leaves the flagged list as it was
+    aggregate.upsert("doc-20", {"pharmacy_name": "CityMed", "drug_name": "Coartem"})
+    assert aggregate.versioned_snapshot()[1] is flagged
+
+    aggregate.remove("doc-1")
+    changed = aggregate.versioned_snapshot()[1]
+    assert [p["pharmacy"] for p in changed] == ["HealthPlus"]
+
+def test_listener_that_stops_falls_back_to_polling():
+    collection = InMemoryCollection(dict(reports))
+    aggregate = ReportAggregate()
+    watch = aggregate.attach(collection)
+    assert aggregate.live and len(aggregate.reports) == len(reports)
+
+    watch.unsubscribe()  # the stream ended without the aggregate detaching
+    assert not aggregate.live
+
+    # A change the aggregate cannot apply also takes it off the listener
+    aggregate.attach(collection)
+    assert aggregate.live
+    aggregate.apply_changes = None
+    with pytest.raises(TypeError):
+        collection.set("doc-30", reports[0][1])
+    assert not aggregate.live
@@ -0,0 +1,89 @@
+import os
+import pytest
+from app.core.memory_store import InMemoryCollection
+from app.core.report_queue import REPORT_QUEUE_PATH, ReportQueue, ReportQueueFull
+
+submitted_report = {
+    "drug_name": "Paracetamol",
+    "pharmacy_name": "HopeMed Ikeja",
+    "description": "Tablets crumble",
+    "state": "Lagos",
+    "lga": "Ikeja",
+}
+
+def memory_commit(collection):
+    def commit(items):
+        for doc_id, report in items:
+            collection.set(doc_id, report)
+    return commit
+
+def test_report_queue_batches_retries_and_backpressure(tmp_path):
+    collection = InMemoryCollection()
+    sink = memory_commit(collection)
+    batches = []
+    def flaky_commit(items):
+        batches.append(len(items))
+        if len(batches) == 1:
+            raise RuntimeError("deadline exceeded")
+        sink(items)
+
+    path = str(tmp_path / "queue.sqlite3")
+    queue = ReportQueue(path, commit=flaky_commit, batch_size=4, max_depth=10)
+    queue.start = lambda: None  # flush by hand
+    doc_ids = [queue.enqueue({**submitted_report, "n": i}) for i in range(10)]
+    with pytest.raises(ReportQueueFull):
+        queue.enqueue(submitted_report)
+
+    # The log survives a restart
+    queue = ReportQueue(path, commit=flaky_commit, batch_size=4)
+    assert queue.depth == 10
+    with pytest.raises(RuntimeError):
+        queue.flush_batch()
+    assert queue.drain() == 0
+    assert batches == [4, 4, 4, 2]
+    assert list(collection.documents) == doc_ids
+    assert [collection.documents[d]["n"] for d in doc_ids] == list(range(10))
+
+def test_report_queue_processes_sharing_a_log_commit_each_report_once(tmp_path):
+    collection = InMemoryCollection()
+    sink = memory_commit(collection)
+    committed = []
+    path = str(tmp_path / "queue.sqlite3")
+    first = ReportQueue(path, commit=lambda items: (committed.extend(d for d, _ in items), sink(items)), batch_size=3)
+    second = ReportQueue(path, commit=lambda items: (committed.extend(d for d, _ in items), sink(items)), batch_size=3)
+    first.start = second.start = lambda: None
+    doc_ids = [(first, second)[i % 2].enqueue({**submitted_report, "n": i}) for i in range(8)]
+    assert first.depth == second.depth == 8
+
+    # A claimed batch is skipped by the other process until it is committed
+    claimed = first._claim()
+    assert second.flush_batch() == 3
+    first.conn.executemany("UPDATE pending SET claimed_by = NULL, claimed_until = NULL WHERE seq = ?",
+                           [(row[0],) for row in claimed])
+    assert first.drain() == 0 and second.depth == 0
+    assert sorted(committed) == sorted(doc_ids)
+
+def test_report_queue_dead_letters_a_report_that_always_fails(tmp_path):
+    collection = InMemoryCollection()
+    sink = memory_commit(collection)
+    def strict_commit(items):
+        if any(report["n"] == 2 for _, report in items):
+            raise ValueError("document exceeds the maximum size")
+        sink(items)
+
+    queue = ReportQueue(str(tmp_path / "queue.sqlite3"), commit=strict_commit, batch_size=4, max_attempts=2)
+    queue.start = lambda: None
+    doc_ids = [queue.enqueue({**submitted_report, "n": i}) for i in range(6)]
+    assert queue.drain() == 0
+
+    # Only the bad report is set aside; the rest of its batch still gets written
+    assert sorted(collection.documents) == sorted(doc_ids[:2] + doc_ids[3:])
+    stats = queue.stats()
+    assert stats["dead_letters"] == 1 and stats["depth"] == 0
+    assert queue.conn.execute("SELECT doc_id, attempts FROM dead_letter").fetchall() == [(doc_ids[2], 3)]
+
+def test_report_queue_default_path_is_under_backend_data():
+    if "REPORT_QUEUE_PATH" in os.environ:
+        pytest.skip("REPORT_QUEUE_PATH is set")
+    backend_data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "data")
+    assert os.path.dirname(REPORT_QUEUE_PATH) == backend_data
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from app.core.report_trends import ReportTrends
+
+base_report = {
+    "pharmacy_name": "HopeMed Ikeja",
+    "state": "Lagos",
+    "lga": "Ikeja",
+    "street_address": "123 Hope St",
+    "drug_name": "Coartem"
+}
+
+def test_report_trends_roll_and_surge():
+    now = datetime(2025, 3, 10, 12)
+    clock = [now.timestamp()]
+    trends = ReportTrends(clock=lambda: clock[0])
+
+    def report(drug, hours_ago):
+        return {**base_report, "drug_name": drug, "timestamp": (now - timedelta(hours=hours_ago)).isoformat()}
+
+    # Coartem: one report a day for the past week; Lonart: five in the last few hours
+    for day in range(1, 8):
+        trends.add(report("Coartem", 24 * day))
+    recent = [report("Lonart", hours) for hours in range(5)]
+    for r in recent:
+        trends.add(r)
+    trends.add(report("Coartem", 2))
+
+    top, surges = trends.top("drug", "24h")
+    assert [(item["drug"], item["count"]) for item in top] == [("lonart", 5), ("coartem", 1)]
+    assert [item["drug"] for item in surges] == ["lonart"]
+    assert top[1]["baseline_count"] == 7 and not top[1]["surge"]
+    assert trends.top("lga", "7d")[0] == [{"state": "lagos", "lga": "ikeja", "count": 12,
+                                           "baseline_count": 1, "expected": 0.25, "ratio": 48.0, "surge": True}]
+
+    trends.remove(recent[0])
+    assert trends.top("drug", "24h")[0][0]["count"] == 4
+
+    # A day later the burst has left the 24h window but is still in the 7d one
+    clock[0] += 24 * 3600
+    assert trends.top("drug", "24h")[0] == []
+    assert dict((item["drug"], item["count"]) for item in trends.top("drug", "7d")[0]) == {"lonart": 4, "coartem": 6}
+
+def test_report_trends_remove_future_dated_report_after_clock_moves():
+    now = datetime(2025, 3, 10, 12)
+    clock = [now.timestamp()]
+    trends = ReportTrends(clock=lambda: clock[0])
+    # A phone with its clock three hours ahead: counted as now
+    future = {**base_report, "timestamp": (now + timedelta(hours=3)).isoformat()}
+    trends.add(future)
+    assert trends.top("drug", "24h")[0][0]["count"] == 1
+
+    clock[0] += 2 * 3600
+    trends.remove(future)
+    assert trends.top("drug", "24h")[0] == []
+    assert trends.top("drug", "30d")[0] == []
+    assert not trends.counters["drug"].clamped
@@ -0,0 +1,144 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import ml
+from app.core.keyword_matcher import KeywordMatcher
+from app.core.drug_registry import IngredientIndex
+
+client = TestClient(app)
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["pain", "chest pain", "chest", "he", "she"])
+    assert matcher.find_all("she has chest pain") == {"she", "he", "chest", "chest pain", "pain"}
+    assert matcher.find_all("nothing here") == {"he"}
+    assert matcher.find_all("") == set()
+
+def test_keyword_matcher_agrees_with_substring_scan():
+    inputs = ["I have fever and headache", "chest pain since yesterday", "Malaria, vomiting", "fine"]
+    for text in inputs:
+        lowered = text.lower()
+        assert ml.keyword_matcher.find_all(lowered) == {k for k in ml.risk_map if k in lowered}
+
+def test_ingredient_index_substring_lookup():
+    index = IngredientIndex([
+        {"product_name": "Coartem", "ingredients": ["Artemether", "Lumefantrine"]},
+        {"product_name": "Artesun", "ingredients": ["Artesunate"]},
+        {"product_name": "Drops", "i ngredients": ["Atropine Sulfate"]},
+    ])
+    assert index.products_containing("arte") == {"Coartem", "Artesun"}
+    assert index.products_containing("lumefantrine") == {"Coartem"}
+    assert index.products_containing("sulfate") == {"Drops"}
+    assert index.products_containing("me") == {"Coartem"}
+    assert not index.has_ingredient_containing("paracetamol")
+
+def test_extract_keywords_exact_match():
+    assert {"fever", "headache"} <= set(ml.extract_keywords("I have Fever and headache"))
+
+def test_predict_risk_endpoint():
+    response = client.post("/predict-risk", json={"symptoms": "fever and headache"})
+    assert response.status_code == 200
+    data = response.json()
+    assert "fever" in data["matched_keywords"]
+    assert data["risk"] in ("Low", "Moderate", "High")
+
+def test_diagnose_scores_all_symptoms_at_once():
+    from app.core.symptom_matcher import match_symptoms
+
+    matched = match_symptoms(["Headache", "feverr", "chest  pain", "zzzz"])
+    assert [m and m["symptom_keyword"] for m in matched] == ["headache", "fever", "chest pain", None]
+
+    response = client.post("/diagnose", json={"symptoms": ["headache", "chest pain", "zzzz"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["score"] == 90 and data["result"] == "High"
+    assert [m["matched_symptom"] for m in data["matched_symptoms"]] == ["headache", "chest pain"]
+    assert data["unmatched_symptoms"] == ["zzzz"]
+    assert any(d["name"].lower() == "paracetamol" for d in data["suggested_drugs"])
+    assert client.post("/diagnose", json={"symptoms": []}).status_code == 422
+
+def test_calculate_risk_is_memoized_per_normalized_input(monkeypatch):
+    from app.core.ttl_cache import TTLCache
+
+    monkeypatch.setattr(ml, "risk_cache", TTLCache(max_entries=2, ttl=60))
+    first = ml.calculate_risk("Fever,  HEADACHE!")
+    assert ml.calculate_risk("fever headache") is first
+    assert "fever" in first["matched_keywords"] and "headache" in first["matched_keywords"]
+    assert ml.risk_cache.stats()["hits"] == 1
+
+    # New risk map or registry data: earlier results are not served
+    monkeypatch.setattr(ml.risk_data, "generation", ("changed", "data"))
+    assert ml.calculate_risk("fever headache") is not first
+    ml.calculate_risk("malaria")
+    assert ml.risk_cache.stats()["evictions"] == 1
+
+def test_close_keywords_match_difflib():
+    from difflib import get_close_matches
+
+    queries = ["feverr", "hedache", "chst pain", "diarhea", "malria and vomitting", "insomina", "xyz", "breathing"]
+    for cutoff, n in ((0.6, 3), (0.7, 1)):
+        expected = [get_close_matches(q, ml.risk_map.keys(), n=n, cutoff=cutoff) for q in queries]
+        assert ml.close_keywords(queries, n=n, cutoff=cutoff) == expected
+    assert "diarrhea" in ml.extract_keywords("bad diarhea")
+
+def test_data_reload_swaps_risk_data(tmp_path, monkeypatch):
+    import shutil
+    from app.core.data_reload import DataReloader, file_signature
+
+    risk_csv = tmp_path / "keyword_risk_map.csv"
+    shutil.copy(ml.RISK_DATA_PATH, risk_csv)
+    monkeypatch.setattr(ml, "RISK_DATA_PATH", str(risk_csv))
+    monkeypatch.setattr(ml, "risk_data", ml.risk_data)  # restored after the test
+    old = ml.risk_data
+
+    reloader = DataReloader(interval=0)
+    reloader.sources = {"risk_map": risk_csv}
+    reloader.signatures = {"risk_map": file_signature(risk_csv)}
+    assert reloader.reload() == []
+
+    with open(risk_csv, "a") as f:
+        f.write('qqxyz,95,"Coartem"\n')
+    assert reloader.reload() == ["risk_map"]
+    assert ml.risk_data is not old and "qqxyz" not in old.risk_map
+    assert ml.calculate_risk("qqxyz")["risk_score"] == 95
+    assert ml.risk_data.generation != old.generation
+
+def test_admin_reload_swaps_registry(monkeypatch):
+    from app.routers import admin, verify
+    from app.core import drug_registry, symptom_matcher
+    from app.core.drug_registry import get_registry
+
+    # Everything the reload swaps is put back afterwards
+    monkeypatch.setattr(drug_registry, "_registry", get_registry())
+    monkeypatch.setattr(ml, "risk_data", ml.risk_data)
+    monkeypatch.setattr(verify, "drug_registry", verify.drug_registry)
+    monkeypatch.setattr(verify, "drug_db", verify.drug_db)
+    monkeypatch.setattr(symptom_matcher, "symptom_table", symptom_matcher.symptom_table)
+    assert client.post("/admin/reload-data").status_code == 403
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload-data", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    old = get_registry()
+    response = client.post("/admin/reload-data", params={"force": "true"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert "registry" in response.json()["reloaded"]
+    assert get_registry() is not old and verify.drug_registry is get_registry()
+    assert ml.risk_data.drug_registry is get_registry()
+    assert client.post("/verify-drug", json={"product_name": old.drugs[0]["product_name"]}).json()["status"] != "unknown"
+
+def test_stem_table_prebuilt_and_rebuilt_on_change(tmp_path):
+    path = str(tmp_path / "risk.stems.json")
+    assert ml.load_stem_table(["headaches", "fever"], "v1", path) == {"headach": "headaches", "fever": "fever"}
+    with open(path) as f:
+        assert json.load(f)["source_digest"] == "v1"
+    # Same digest: served from the file without stemming
+    assert ml.load_stem_table(["ignored"], "v1", path) == {"headach": "headaches", "fever": "fever"}
+    assert ml.load_stem_table(["vomiting"], "v2", path) == {"vomit": "vomiting"}
+
+def test_stem_table_written_atomically(tmp_path, monkeypatch):
+    path = str(tmp_path / "risk.stems.json")
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(ml.os, "replace", fail)
+    assert ml.load_stem_table(["fever"], "v1", path) == {"fever": "fever"}
+    # Neither a partial table nor a stray temp file is left behind
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+def test_app_import_skips_heavy_dependencies():
+    # No FIREBASE_KEY: importing the app must not touch Firebase, pandas or nltk
+    env = {k: v for k, v in os.environ.items() if k != "FIREBASE_KEY"}
+    budget = float(os.getenv("STARTUP_BUDGET_SECONDS", "3"))
+    code = (
+        "import sys, time; start = time.perf_counter(); import app.main; "
+        "print(time.perf_counter() - start); "
+        "print(','.join(m for m in ('pandas', 'nltk', 'firebase_admin', 'google.cloud.firestore') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+        env=env, capture_output=True, text=True, check=True,
+    )
+    seconds, loaded = result.stdout.splitlines()
+    assert loaded == ""
+    assert float(seconds) < budget
@@ -0,0 +1,161 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.drug_registry import DrugRegistry, read_snapshot, write_snapshot
+
+client = TestClient(app)
+
+sample_drugs = [
+    {"product_name": "Artheget EZ", "nafdac_reg_no": "A4-6238", "dosage_form": "Tablet",
+     "ingredients": ["Artemether", "Lumefantrine"], "strengths": ["80 mg", "480 mg"], "status": "verified"},
+    {"product_name": "Artheget EZ", "nafdac_reg_no": "A4-9999", "dosage_form": "Tablet",
+     "ingredients": ["Artemether"], "strengths": ["80 mg"], "status": "verified"},
+]
+
+def test_registry_indexes_return_first_record():
+    registry = DrugRegistry.from_dicts(sample_drugs)
+    assert registry.find_by_name("  artheget ez ").nafdac_reg_no == "A4-6238"
+    assert registry.find_by_reg_no("A4-9999") is registry.drugs[1]
+    assert registry.find_exact("ARTHEGET EZ", "a4-9999") is registry.drugs[1]
+    assert registry.find_exact("Artheget EZ", None) is None
+    assert registry.find_by_name("") is None
+
+def test_registry_snapshot_round_trip(tmp_path):
+    registry = DrugRegistry.from_dicts(sample_drugs + [{"product_name": "Drops", "i ngredients": ["Atropine"]}])
+    path = tmp_path / "drugs.snapshot"
+    write_snapshot(registry, b"x" * 32, path)
+
+    loaded = read_snapshot(path, b"x" * 32)
+    assert [d.to_dict() for d in loaded.drugs] == [d.to_dict() for d in registry.drugs]
+    assert loaded.drugs[2].ingredients == ("Atropine",)
+    assert loaded.drugs[2].dosage_form is None
+    assert read_snapshot(path, b"y" * 32) is None
+
+def test_registry_snapshot_concurrent_writers(tmp_path):
+    import threading
+    registry = DrugRegistry.from_dicts(sample_drugs)
+    path = tmp_path / "drugs.snapshot"
+    # Workers rebuilding at the same moment each write their own temp file
+    writers = [threading.Thread(target=write_snapshot, args=(registry, b"x" * 32, path)) for _ in range(8)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert len(read_snapshot(path, b"x" * 32).drugs) == len(sample_drugs)
+    assert [p.name for p in tmp_path.iterdir()] == ["drugs.snapshot"]
+
+def test_load_registry_skips_hashing_and_writing_for_an_unchanged_source(tmp_path, monkeypatch):
+    import os
+    from app.core import drug_registry
+    json_path, snapshot_path = tmp_path / "drugs.json", tmp_path / "drugs.snapshot"
+    json_path.write_text(json.dumps(sample_drugs))
+    digest = drug_registry.load_registry(json_path, snapshot_path).digest
+    written = snapshot_path.stat().st_mtime_ns
+
+    def no_hashing(path):
+        raise AssertionError("source hashed although its size and mtime are unchanged")
+    with monkeypatch.context() as patched:
+        patched.setattr(drug_registry, "source_digest", no_hashing)
+        assert drug_registry.load_registry(json_path, snapshot_path).digest == digest
+
+    # Touched but identical: hashed once, snapshot left alone
+    os.utime(json_path, ns=(written + 10 ** 9, written + 10 ** 9))
+    assert len(drug_registry.load_registry(json_path, snapshot_path)) == len(sample_drugs)
+    assert snapshot_path.stat().st_mtime_ns == written
+
+    json_path.write_text(json.dumps(sample_drugs[:1]))
+    assert len(drug_registry.load_registry(json_path, snapshot_path)) == 1
+    assert len(read_snapshot(snapshot_path).drugs) == 1
+
+def test_verify_full_match():
+    response = client.post("/verify-drug", json={"product_name": "artheget ez", "nafdac_reg_no": "a4-6238"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "verified"
+    assert data["match_score"] == 100
+    assert data["nafdac_reg_no"] == "A4-6238"
+
+def test_verify_name_only():
+    response = client.post("/verify-drug", json={"product_name": "Artheget EZ"})
+    data = response.json()
+    assert data["status"] == "partial_match"
+    assert data["match_score"] == 70
+
+def test_verify_reg_no_only():
+    response = client.post("/verify-drug", json={"product_name": "Something Else", "nafdac_reg_no": "A4-6238"})
+    data = response.json()
+    assert data["status"] == "conflict_warning"
+    assert data["product_name"] == "Artheget EZ"
+
+def test_verify_unknown():
+    response = client.post("/verify-drug", json={"product_name": "Not A Real Drug"})
+    assert response.json()["status"] == "unknown"
+
+def test_verify_fuzzy_tolerates_typos():
+    response = client.post("/verify-drug/fuzzy", json={"product_name": "Artheget-EZ"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "partial_match"
+    assert data["candidates"][0]["product_name"] == "Artheget EZ"
+    assert data["candidates"][0]["match_score"] == 100
+    scores = [c["match_score"] for c in data["candidates"]]
+    assert scores == sorted(scores, reverse=True)
+
+def test_verify_fuzzy_reg_no_spacing():
+    response = client.post("/verify-drug/fuzzy", json={"nafdac_reg_no": "A4 6238"}, params={"limit": 1})
+    candidates = response.json()["candidates"]
+    assert len(candidates) == 1
+    assert candidates[0]["nafdac_reg_no"] == "A4-6238"
+
+def test_verify_fuzzy_no_match():
+    response = client.post("/verify-drug/fuzzy", json={"product_name": "zzqx"}, params={"min_score": 95})
+    data = response.json()
+    assert data["status"] == "unknown"
+    assert data["candidates"] == []
+
+batch_items = [
+    {"product_name": "artheget ez", "nafdac_reg_no": "a4-6238"},
+    {"product_name": "Artheget EZ"},
+    {"product_name": "Something Else", "nafdac_reg_no": "A4-6238"},
+    {"product_name": "Not A Real Drug"},
+    {"product_name": "artheget ez", "nafdac_reg_no": "a4-6238"},
+]
+
+def test_verify_batch_json_matches_single_endpoint():
+    response = client.post("/verify-drug/batch", json=batch_items)
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    expected = [client.post("/verify-drug", json=item).json() for item in batch_items]
+    assert results == expected
+
+def test_verify_batch_ndjson_keeps_order_and_reports_bad_lines():
+    body = "\n".join(json.dumps(item) for item in batch_items[:2]) + "\nnot json\n" + json.dumps(batch_items[3])
+    response = client.post("/verify-drug/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    statuses = [json.loads(line)["status"] for line in response.text.splitlines()]
+    assert statuses == ["verified", "partial_match", "unknown", "unknown"]
+
+def test_verify_batch_rejects_invalid_json():
+    response = client.post("/verify-drug/batch", json=[{"product_name": 5}])
+    assert response.status_code == 422
+
+def test_verify_batch_caps_body_and_line_size(monkeypatch):
+    from app.routers import verify
+
+    monkeypatch.setattr(verify, "MAX_BATCH_BYTES", 4096)
+    ndjson = {"Content-Type": "application/x-ndjson"}
+    line = (json.dumps(batch_items[0]) + "\n").encode()
+    assert client.post("/verify-drug/batch", json=batch_items * 40).status_code == 413
+
+    # Without a Content-Length the cap applies while the body streams in
+    def chunks(count):
+        for _ in range(count):
+            yield line
+    assert client.post("/verify-drug/batch", content=chunks(100), headers=ndjson).status_code == 413
+    assert client.post("/verify-drug/batch", content=chunks(5), headers=ndjson).status_code == 200
+
+    monkeypatch.setattr(verify, "MAX_NDJSON_LINE_BYTES", 256)
+    long_line = json.dumps({**batch_items[0], "product_name": "x" * 300})
+    response = client.post("/verify-drug/batch", content=long_line, headers=ndjson)
+    assert response.status_code == 413
+    assert "Line 1" in response.json()["detail"]
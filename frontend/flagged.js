@@ -170,6 +170,8 @@ document.addEventListener('DOMContentLoaded', function() {
         params.append('sort_order', currentSearchParams.sort_order);
         params.append('page', currentPage);
         params.append('limit', currentSearchParams.limit);
+        // The flagged view only needs the current page, not every raw report
+        if (currentView === 'flagged') params.append('include_reports', 'false');
 
         // Fetch data from API with search parameters
         fetch(`https://lyre-4m8l.onrender.com/get-flagged?${params.toString()}`)